@@ -0,0 +1,89 @@
+"""Benchmark des filtres de dates : fonctions réelles avec et sans l'index idx_sales_facts_day.
+
+Génère une base synthétique au dernier schéma (benchmarks/synthetic.py) puis mesure
+à froid les fonctions qui lisent les ventes par plages de jours semi-ouvertes
+[début, fin[ : YTD, ventes du mois, YTD brut, grille de saisie et dernières ventes.
+Les mêmes appels sont ensuite mesurés sur la même base une fois l'index supprimé ;
+le plan de chaque requête est affiché des deux côtés.
+
+Usage :
+    python benchmarks/bench_date_filters.py --years 5 --repeat 50
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.run_benchmarks import measure  # noqa: E402
+from benchmarks.synthetic import generate_database  # noqa: E402
+from pilotage.cache import bump_data_version  # noqa: E402
+from pilotage.db import get_db_writer  # noqa: E402
+from pilotage.metrics import calculate_ytd  # noqa: E402
+from pilotage.storage import get_all_sales_ytd, get_recent_sales, get_sales_data, get_sales_grid, get_zones  # noqa: E402
+from pilotage.tracing import start_trace  # noqa: E402
+
+INDEX = 'idx_sales_facts_day'
+
+def benchmark_cases(today):
+    """Fonctions mesurées : nom -> appel sans argument"""
+    zones = get_zones()
+    zone = zones[0]
+    year, month = today.year, today.month
+    return {
+        'calculate_ytd': lambda: calculate_ytd(zone, today),
+        'get_sales_data': lambda: get_sales_data(zone, year, month),
+        'get_all_sales_ytd': lambda: get_all_sales_ytd(zone, year, today),
+        'get_sales_grid_30d': lambda: get_sales_grid(zones, today - timedelta(days=30), today),
+        'get_recent_sales': lambda: get_recent_sales(20),
+    }
+
+def query_plans(conn, func):
+    """Plans des requêtes sur les ventes exécutées par un appel à froid"""
+    bump_data_version()
+    with start_trace('plan') as trace:
+        func()
+    statements = dict.fromkeys(event['name'] for event in trace.events
+                               if event['kind'] == 'sql' and 'sales' in event['name'])
+    # Paramètres liés à NULL : le plan est choisi à la préparation, pas selon les valeurs
+    return [' ; '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, [None] * sql.count('?')))
+            for sql in statements]
+
+def run_cases(path, today, repeat):
+    conn = sqlite3.connect(path)
+    try:
+        return {name: (measure(func, repeat, cold=True)['median_ms'], query_plans(conn, func))
+                for name, func in benchmark_cases(today).items()}
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=5, help="années d'historique générées")
+    parser.add_argument('--repeat', type=int, default=20, help='mesures par fonction')
+    args = parser.parse_args()
+
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.db'
+        row_count = generate_database(path, args.years, today.date())
+        print(f"{row_count:,} lignes de ventes ({args.years} ans x {len(get_zones())} zones)\n")
+
+        with_index = run_cases(path, today, args.repeat)
+        with get_db_writer() as conn:
+            conn.execute(f'DROP INDEX {INDEX}')
+        without_index = run_cases(path, today, args.repeat)
+
+    print(f"{'fonction':<22}{'avec (ms)':>12}{'sans (ms)':>12}{'gain':>8}")
+    for name, (indexed_ms, indexed_plans) in with_index.items():
+        plain_ms, plain_plans = without_index[name]
+        print(f"{name:<22}{indexed_ms:>12.3f}{plain_ms:>12.3f}{plain_ms / indexed_ms:>7.1f}x")
+        for indexed_plan, plain_plan in zip(indexed_plans, plain_plans):
+            print(f"{'':<4}avec : {indexed_plan}")
+            print(f"{'':<4}sans : {plain_plan}")
+
+if __name__ == '__main__':
+    main()
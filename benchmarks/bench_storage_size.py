@@ -0,0 +1,147 @@
+"""Taille de la base avant/après migration : ventes texte d'origine contre ventes encodées.
+
+Génère une base au schéma d'origine (table sales avec zone et date en texte),
+la copie puis la migre au dernier schéma, et compare la taille des fichiers
+(après VACUUM) objet par objet, ainsi que le chargement d'une année de ventes.
+
+Usage :
+    python benchmarks/bench_storage_size.py --years 4
+"""
+import argparse
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pilotage.db import (  # noqa: E402
+    DEFAULT_ZONE_TREE, configure_database, get_db_connection, read_sales_frame, to_day_numbers,
+)
+from pilotage.migrations import migrate  # noqa: E402
+
+ZONES = [name for name, _, kind, _, _ in DEFAULT_ZONE_TREE if kind == 'zone']
+
+# Schéma d'origine (avant les migrations versionnées)
+BASELINE_SCHEMA = [
+    '''CREATE TABLE sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        date TEXT NOT NULL,
+        volume INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(zone, date)
+    )''',
+    '''CREATE TABLE monthly_targets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        target INTEGER NOT NULL,
+        UNIQUE(zone, year, month)
+    )''',
+    '''CREATE TABLE ytd_init (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        january_volume INTEGER NOT NULL,
+        UNIQUE(zone, year)
+    )''',
+    '''CREATE TABLE custom_holidays (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        description TEXT,
+        UNIQUE(date)
+    )''',
+]
+
+def build_baseline(path, years, end):
+    """Base au schéma d'origine avec des ventes quotidiennes (jours ouvrés) ; retourne le nombre de ventes"""
+    conn = sqlite3.connect(path)
+    for ddl in BASELINE_SCHEMA:
+        conn.execute(ddl)
+    rng = random.Random(42)
+    pace = {zone: rng.randint(5, 40) for zone in ZONES}
+    rows = []
+    current = date(end.year - years + 1, 1, 1)
+    while current <= end:
+        if current.weekday() < 5:
+            rows.extend((zone, current.isoformat(), max(0, int(rng.gauss(pace[zone], pace[zone] / 3))))
+                        for zone in ZONES)
+        current += timedelta(days=1)
+    conn.executemany('INSERT INTO sales (zone, date, volume) VALUES (?, ?, ?)', rows)
+    conn.executemany('INSERT INTO monthly_targets (zone, year, month, target) VALUES (?, ?, ?, ?)',
+                     [(zone, year, month, pace[zone] * 21) for year in range(end.year - years + 1, end.year + 1)
+                      for month in range(1, 13) for zone in ZONES])
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+    return len(rows)
+
+def object_sizes(path):
+    """Octets par table ou index (dbstat), du plus gros au plus petit"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC').fetchall()
+    finally:
+        conn.close()
+
+def time_load(func, repeat):
+    """Temps médian (ms) d'un chargement"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=4, help="années d'historique générées")
+    parser.add_argument('--repeat', type=int, default=20, help='répétitions des chargements')
+    args = parser.parse_args()
+
+    today = date.today()
+    year_start, year_end = f'{today.year}-01-01', f'{today.year + 1}-01-01'
+    with tempfile.TemporaryDirectory() as tmp:
+        before, after = Path(tmp) / 'baseline.db', Path(tmp) / 'migrated.db'
+        row_count = build_baseline(before, args.years, today)
+        shutil.copy(before, after)
+        configure_database(path=str(after))
+        migrate()
+
+        def load_text():
+            conn = sqlite3.connect(before)
+            try:
+                frame = pd.read_sql_query('SELECT zone, date, volume FROM sales WHERE date >= ? AND date < ?',
+                                          conn, params=(year_start, year_end))
+                frame['date'] = pd.to_datetime(frame['date'])
+            finally:
+                conn.close()
+            return frame
+
+        def load_encoded():
+            with get_db_connection() as conn:
+                return read_sales_frame(conn, 'SELECT zone_id, day, volume FROM sales_facts WHERE day >= ? AND day < ?',
+                                        (int(to_day_numbers(year_start)), int(to_day_numbers(year_end))))
+
+        text_ms, encoded_ms = time_load(load_text, args.repeat), time_load(load_encoded, args.repeat)
+        # Fermeture du pool : le WAL est reversé dans le fichier avant la mesure
+        configure_database(path=str(Path(tmp) / 'unused.db'))
+
+        print(f"{row_count:,} lignes de ventes ({args.years} ans x {len(ZONES)} zones)\n")
+        for label, path in (("schéma d'origine", before), ('après migration', after)):
+            print(f"{label:<20}{path.stat().st_size / 1024:>10.0f} Kio")
+            for name, size in object_sizes(path):
+                if size >= 8192:
+                    print(f"    {name:<36}{size / 1024:>8.0f} Kio")
+        print(f"\nchargement d'une année  texte {text_ms:.2f} ms  encodé {encoded_ms:.2f} ms")
+
+if __name__ == '__main__':
+    main()
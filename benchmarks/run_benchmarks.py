@@ -0,0 +1,130 @@
+"""Benchmarks des chemins critiques du dashboard sur des bases synthétiques.
+
+Pour chaque échelle (années d'historique), génère une base puis mesure les
+calculs du dashboard à froid (cache des lectures invalidé avant chaque appel)
+et à chaud. Les résultats sont écrits en JSON pour comparer les commits.
+
+Usage :
+    python benchmarks/run_benchmarks.py --scales 1 5 10 --output bench.json
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.synthetic import generate_database  # noqa: E402
+from pilotage.cache import bump_data_version  # noqa: E402
+from pilotage.db import DB_CONFIG, configure_database  # noqa: E402
+from pilotage.forecast import forecast_month_end  # noqa: E402
+from pilotage.metrics import (  # noqa: E402
+    calculate_run_rate,
+    calculate_weekly_data,
+    calculate_ytd,
+    compute_dashboard,
+    get_group_consolidation,
+)
+from pilotage.periods import get_period_performance  # noqa: E402
+from pilotage.simulation import simulate_attainment  # noqa: E402
+from pilotage.storage import get_zones  # noqa: E402
+from pilotage.trends import get_daily_trend, get_monthly_trend  # noqa: E402
+
+def benchmark_cases(today):
+    """Fonctions mesurées : nom -> appel sans argument"""
+    zone = get_zones()[0]
+    year, month = today.year, today.month
+    return {
+        'get_group_consolidation': lambda: get_group_consolidation(year, month, today),
+        'calculate_ytd': lambda: calculate_ytd(zone, today),
+        'calculate_weekly_data': lambda: calculate_weekly_data(zone, year, month),
+        'calculate_run_rate': lambda: calculate_run_rate(zone, year, month, today),
+        'dashboard_render': lambda: compute_dashboard(zone, today),
+        'daily_trend_3y': lambda: get_daily_trend([zone], today.replace(year=year - 3), today),
+        'iso_weeks_all_zones_1y': lambda: get_period_performance(get_zones(), today.replace(year=year - 1), today,
+                                                                 'iso_week'),
+        'monthly_trend': lambda: get_monthly_trend(get_zones(), year - 1, year),
+        'forecast_one_zone': lambda: forecast_month_end(year, month, today, zones=[zone]),
+        'forecast_all_zones': lambda: forecast_month_end(year, month, today),
+        'what_if_20k_trials': lambda: simulate_attainment(today, shocks={zone: 0.9}, seed=0),
+    }
+
+def measure(func, repeat, cold):
+    """Temps (ms) de `repeat` appels ; à froid, le cache est invalidé avant chaque appel"""
+    func()  # préchauffage (connexions, imports, calendriers)
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            bump_data_version()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parents[1], check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(scales, repeat):
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in scales:
+            path = Path(tmp) / f'bench_{years}y.db'
+            rows = generate_database(path, years, today.date())
+            for name, func in benchmark_cases(today).items():
+                for cold in (True, False):
+                    results.append({
+                        'scale_years': years,
+                        'sales_rows': rows,
+                        'function': name,
+                        'cache': 'cold' if cold else 'warm',
+                        **measure(func, repeat, cold),
+                    })
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'backend': DB_CONFIG['backend'],
+        'repeat': repeat,
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 5, 10], help="années d'historique")
+    parser.add_argument('--repeat', type=int, default=20, help='mesures par fonction')
+    parser.add_argument('--backend', help='moteur de SalesRepository (défaut : PILOTAGE_BACKEND ou sqlite)')
+    parser.add_argument('--output', help='fichier JSON de sortie (défaut : sortie standard)')
+    args = parser.parse_args()
+    if args.backend:
+        configure_database(backend=args.backend)
+
+    report = run(args.scales, args.repeat)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+        for row in report['results']:
+            print(f"{row['scale_years']:>3} ans  {row['function']:<26}{row['cache']:<6}"
+                  f"{row['median_ms']:>9.3f} ms")
+    else:
+        print(payload)
+
+if __name__ == '__main__':
+    main()
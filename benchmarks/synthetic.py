@@ -0,0 +1,72 @@
+"""Générateur de bases commercial_tracking.db synthétiques pour les benchmarks.
+
+Produit N années de ventes quotidiennes (jours ouvrés) pour toutes les zones
+de get_zones(), avec objectifs mensuels, janviers manuels et quelques jours
+fériés personnalisés.
+
+Usage :
+    python benchmarks/synthetic.py bench.db --years 5
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pilotage.db import configure_database, get_db_writer, init_database  # noqa: E402
+from pilotage.repository import upsert_sales_rows  # noqa: E402
+from pilotage.storage import get_zones  # noqa: E402
+
+def generate_database(path, years, end_date=None, seed=42):
+    """Crée (ou écrase) une base synthétique ; retourne le nombre de lignes de ventes"""
+    end_date = end_date or date.today()
+    path = Path(path)
+    for suffix in ('', '-wal', '-shm'):
+        Path(f'{path}{suffix}').unlink(missing_ok=True)
+
+    configure_database(path=str(path))
+    init_database()
+
+    rng = random.Random(seed)
+    zones = get_zones()
+    first_year = end_date.year - years + 1
+    # Rythme propre à chaque zone pour des séries réalistes
+    pace = {zone: rng.randint(5, 40) for zone in zones}
+
+    sales, targets, ytd_init, holidays = [], [], [], []
+    for year in range(first_year, end_date.year + 1):
+        for month in range(1, 13):
+            for zone in zones:
+                targets.append((zone, year, month, pace[zone] * 21))
+        for zone in zones:
+            ytd_init.append((zone, year, pace[zone] * rng.randint(18, 23)))
+        holidays.append((date(year, 8, rng.randint(1, 14)).isoformat(), 'Fermeture annuelle'))
+
+    current = date(first_year, 1, 1)
+    while current <= end_date:
+        if current.weekday() < 5:
+            day = current.isoformat()
+            for zone in zones:
+                sales.append((zone, day, max(0, int(rng.gauss(pace[zone], pace[zone] / 3)))))
+        current += timedelta(days=1)
+
+    with get_db_writer() as conn:
+        conn.executemany('INSERT INTO ytd_init (zone, year, january_volume) VALUES (?, ?, ?)', ytd_init)
+        conn.executemany('INSERT INTO monthly_targets (zone, year, month, target) VALUES (?, ?, ?, ?)', targets)
+        conn.executemany('INSERT OR IGNORE INTO custom_holidays (date, description) VALUES (?, ?)', holidays)
+        upsert_sales_rows(conn, sales)
+    return len(sales)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='fichier SQLite à générer')
+    parser.add_argument('--years', type=int, default=3, help="années d'historique")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rows = generate_database(args.path, args.years, seed=args.seed)
+    print(f"{rows:,} lignes de ventes générées dans {args.path}")
+
+if __name__ == '__main__':
+    main()
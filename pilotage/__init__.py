@@ -0,0 +1,80 @@
+"""Cœur de calcul et de stockage du Pilotage Commercial, sans dépendance à Streamlit.
+
+Les sous-modules (et pandas/numpy) ne sont importés qu'au premier accès à
+l'un des noms exportés ci-dessous, pour un démarrage rapide des scripts.
+"""
+import importlib
+
+_EXPORTS = {
+    'db': [
+        'DB_CONFIG', 'ConnectionManager', 'get_connection_manager', 'get_db_connection',
+        'get_db_writer', 'configure_database', 'init_database', 'rebuild_sales_cumulative',
+        'get_month_bounds', 'get_year_bounds', 'DEFAULT_ZONE_TREE', 'to_day_numbers', 'get_zone_ids',
+        'read_sales_frame',
+    ],
+    'migrations': [
+        'MIGRATIONS', 'migration', 'build_index_online', 'get_schema_version', 'get_migration_status',
+        'migrate', 'ensure_schema',
+    ],
+    'holidays': [
+        'FIXED_HOLIDAYS', 'EASTER_HOLIDAYS', 'COUNTRIES', 'DEFAULT_COUNTRY', 'list_public_holidays',
+        'get_easter_date', 'get_public_holidays', 'WorkingDayCalendar',
+        'WorkingDayBitmaps', 'HolidayCache', 'get_holiday_cache', 'get_working_day_calendar',
+        'get_working_day_calendar_between', 'get_working_day_bitmaps', 'is_working_in_zones',
+        'count_zone_working_days', 'get_working_days_in_month', 'add_custom_holiday',
+        'get_custom_holidays_table',
+    ],
+    'storage': [
+        'get_zone_tree', 'get_zones', 'get_filiales', 'get_concessions', 'get_consolidated_zones',
+        'add_zone', 'set_zone_country', 'save_sale', 'get_sales_grid', 'diff_sales_grid',
+        'save_sales_grid', 'save_monthly_target', 'save_ytd_init', 'get_sales_data',
+        'get_all_sales_ytd', 'get_monthly_target', 'get_ytd_init', 'get_recent_sales',
+        'get_all_targets',
+    ],
+    'metrics': [
+        'calculate_ytd', 'calculate_weekly_data', 'calculate_run_rate',
+        'get_zone_rollups', 'get_zones_overview', 'get_group_consolidation',
+        'compute_zone_dashboard', 'compute_dashboard',
+    ],
+    'periods': ['PERIODS', 'bucket_starts', 'bucket_ends', 'bucket_labels', 'get_period_performance'],
+    'trends': ['get_daily_trend', 'get_monthly_trend'],
+    'forecast': ['forecast_month_end', 'forecast_group_month_end'],
+    'simulation': ['get_daily_history', 'get_annual_targets', 'bootstrap_totals', 'simulate_attainment'],
+    'snapshots': [
+        'compute_snapshot', 'get_latest_snapshot', 'get_dashboard_snapshot', 'SnapshotWorker',
+        'start_snapshot_worker',
+    ],
+    'archive': [
+        'get_archived_years', 'read_partition_summary', 'get_archived_monthly_totals',
+        'get_archived_daily', 'get_archived_targets', 'archive_year',
+    ],
+    'repository': [
+        'SalesRepository', 'SQLiteRepository', 'BACKENDS', 'create_repository',
+        'get_repository', 'upsert_sales_rows', 'delete_sales_rows',
+    ],
+    'alerts': [
+        'CRITICAL_PACE_RATIO', 'ALERT_CONFIG', 'pace_level', 'pace_message', 'compute_pace', 'AlertSink',
+        'FileSink', 'SmtpSink', 'WebhookSink', 'MemorySink', 'configured_sinks', 'AlertEngine',
+        'start_alert_engine',
+    ],
+    'importer': ['import_sales_file'],
+    'cache': [
+        'QueryCache', 'get_query_cache', 'bump_data_version', 'add_change_listener', 'notify_changes',
+        'cached_query',
+    ],
+    'tracing': ['Trace', 'current_trace', 'start_trace', 'append_trace', 'traced'],
+}
+
+_LOCATIONS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_LOCATIONS)
+
+def __getattr__(name):
+    if name not in _LOCATIONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LOCATIONS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return __all__
@@ -0,0 +1,301 @@
+"""Alertes de run-rate réévaluées après chaque écriture, avec état persistant et canaux de diffusion.
+
+Après chaque vente, objectif ou jour férié enregistré, les zones et le mois touchés
+sont mis en file ; un thread de fond les réévalue (mois en cours, comme le dashboard)
+et diffuse les alertes sans retarder l'écriture. Une alerte ne part qu'au
+franchissement d'un seuil, jamais deux fois pour le même niveau.
+"""
+import calendar
+import json
+import os
+import smtplib
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.message import EmailMessage
+
+from .cache import add_change_listener
+from .db import get_db_writer
+from .holidays import get_working_day_calendar
+from .metrics import calculate_run_rate
+from .snapshots import today
+from .storage import get_sales_data, get_zones
+from .tracing import traced
+
+# Run-rate nécessaire au-delà de 120 % de la moyenne réalisée : écart critique
+CRITICAL_PACE_RATIO = 1.2
+LEVELS = ('ok', 'warning', 'critical')
+
+# Canaux de diffusion, configurés par variables d'environnement (vide = canal inactif)
+ALERT_CONFIG = {
+    'file': os.environ.get('PILOTAGE_ALERT_FILE', ''),
+    'webhook_url': os.environ.get('PILOTAGE_ALERT_WEBHOOK_URL', ''),
+    'smtp_host': os.environ.get('PILOTAGE_ALERT_SMTP_HOST', ''),
+    'smtp_port': int(os.environ.get('PILOTAGE_ALERT_SMTP_PORT', 587)),
+    'smtp_user': os.environ.get('PILOTAGE_ALERT_SMTP_USER', ''),
+    'smtp_password': os.environ.get('PILOTAGE_ALERT_SMTP_PASSWORD', ''),
+    'smtp_sender': os.environ.get('PILOTAGE_ALERT_SMTP_SENDER', ''),
+    'smtp_recipients': os.environ.get('PILOTAGE_ALERT_SMTP_RECIPIENTS', ''),  # adresses séparées par des virgules
+}
+
+# ==================== SEUILS ====================
+
+def pace_level(run_rate, average):
+    """Niveau d'alerte : run-rate nécessaire comparé à la moyenne quotidienne réalisée"""
+    if run_rate > average * CRITICAL_PACE_RATIO:
+        return 'critical'
+    if run_rate > average:
+        return 'warning'
+    return 'ok'
+
+def pace_message(level, run_rate, average):
+    """Message affiché (dashboard) et diffusé (alertes) pour un niveau"""
+    if level == 'critical':
+        excess = f" est {(run_rate / average - 1) * 100:.0f}%" if average > 0 else " est"
+        return (f"🚨 ATTENTION : Le run-rate nécessaire ({run_rate:.1f}){excess} supérieur "
+                f"à votre moyenne actuelle ({average:.1f})")
+    if level == 'warning':
+        return f"⚠️ Le run-rate nécessaire ({run_rate:.1f}) est supérieur à votre moyenne ({average:.1f})"
+    return f"✅ Objectif atteignable : continuez au rythme actuel de {average:.1f} ventes/jour"
+
+@traced
+def compute_pace(zone, current_date):
+    """Run-rate, moyenne et niveau de la zone pour le mois de `current_date`.
+
+    None tant qu'aucun jour ouvré n'est passé (pas de moyenne) alors qu'il reste un objectif à tenir.
+    """
+    year, month = current_date.year, current_date.month
+    working_calendar = get_working_day_calendar(year, zone)
+    last_date = datetime(year, month, calendar.monthrange(year, month)[1])
+    working_days_passed = (len(working_calendar.working_days_in_month(year, month))
+                           - int(working_calendar.count(current_date, last_date)))
+    realized = int(get_sales_data(zone, year, month)['volume'].sum())
+    run_rate = calculate_run_rate(zone, year, month, current_date)
+
+    average = realized / working_days_passed if working_days_passed > 0 else 0.0
+    if run_rate <= 0:
+        return {'run_rate': 0.0, 'average': average, 'level': 'ok'}
+    if working_days_passed == 0:
+        return None
+    return {'run_rate': float(run_rate), 'average': average, 'level': pace_level(run_rate, average)}
+
+# ==================== CANAUX ====================
+
+class AlertSink(ABC):
+    """Canal de diffusion des alertes"""
+
+    @abstractmethod
+    def send(self, alert):
+        """Diffuse `alert` (zone, year, month, level, previous_level, run_rate, average, message, at)"""
+
+class FileSink(AlertSink):
+    """Ajoute chaque alerte en JSON, une ligne par alerte"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as output:
+            output.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+class SmtpSink(AlertSink):
+    """Envoie chaque alerte par e-mail"""
+
+    def __init__(self, host, port, sender, recipients, user=None, password=None, starttls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, alert):
+        message = EmailMessage()
+        message['Subject'] = f"[Pilotage] {alert['zone']} {alert['month']:02d}/{alert['year']} : {alert['level']}"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content(alert['message'])
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+
+class WebhookSink(AlertSink):
+    """Poste chaque alerte en JSON sur une URL"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class MemorySink(AlertSink):
+    """Garde les alertes en mémoire (essais, diagnostic)"""
+
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alert):
+        self.alerts.append(alert)
+
+def configured_sinks(config=None):
+    """Canaux actifs d'après ALERT_CONFIG"""
+    config = config or ALERT_CONFIG
+    sinks = []
+    if config['file']:
+        sinks.append(FileSink(config['file']))
+    if config['webhook_url']:
+        sinks.append(WebhookSink(config['webhook_url']))
+    if config['smtp_host']:
+        recipients = [address.strip() for address in config['smtp_recipients'].split(',') if address.strip()]
+        sinks.append(SmtpSink(config['smtp_host'], config['smtp_port'], config['smtp_sender'], recipients,
+                              config['smtp_user'] or None, config['smtp_password'] or None))
+    return sinks
+
+# ==================== MOTEUR ====================
+
+class AlertEngine:
+    """Réévalue en tâche de fond les zones et mois touchés par les écritures et diffuse les changements de niveau"""
+
+    def __init__(self, sinks, clock=today):
+        self.sinks = list(sinks)
+        self.clock = clock
+        self.sent = 0
+        self.last_error = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def on_changes(self, changes):
+        """Écouteur des écritures ciblées : met les (zone, année, mois) en file et rend la main aussitôt"""
+        with self._lock:
+            self._pending.update(changes)
+            self._idle.clear()
+        self._wakeup.set()
+
+    def start(self):
+        """Démarre le thread d'évaluation s'il ne tourne pas déjà"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='pilotage-alerts', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Arrête le thread après l'évaluation en cours"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait_idle(self, timeout=None):
+        """Attend que la file soit vide et traitée ; False si `timeout` expire avant"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            with self._lock:
+                self._wakeup.clear()
+                changes, self._pending = self._pending, set()
+            try:
+                if changes:
+                    self.evaluate_changes(changes)
+            except Exception as e:  # base verrouillée, calendrier... : la prochaine écriture réévaluera
+                self.last_error = e
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+
+    def evaluate_changes(self, changes):
+        """Alertes émises pour les (zone, année, mois) touchés ; zone None = toutes les zones"""
+        current_date = self.clock()
+        zones = set()
+        for zone, year, month in changes:
+            if (year, month) == (current_date.year, current_date.month):
+                zones.update(get_zones() if zone is None else [zone])
+        alerts = []
+        for zone in sorted(zones):
+            alert = self.evaluate(zone, current_date)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
+
+    def evaluate(self, zone, current_date):
+        """Compare le niveau de la zone au dernier niveau notifié ; diffuse et retourne l'alerte s'il change"""
+        pace = compute_pace(zone, current_date)
+        if pace is None:
+            return None
+        year, month = current_date.year, current_date.month
+
+        # Lecture et mise à jour sous verrou d'écriture : un franchissement n'est notifié qu'une fois.
+        # État de suivi : aucune lecture en cache n'en dépend, la version des données ne change pas.
+        with get_db_writer(bump=False) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT level FROM alert_state WHERE zone = ? AND year = ? AND month = ?',
+                               (zone, year, month)).fetchone()
+            previous_level = row[0] if row else 'ok'
+            if pace['level'] == previous_level:
+                return None
+            changed_at = datetime.now().isoformat(timespec='seconds')
+            conn.execute('''
+                INSERT INTO alert_state (zone, year, month, level, run_rate, average, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(zone, year, month) DO UPDATE SET
+                    level=excluded.level, run_rate=excluded.run_rate,
+                    average=excluded.average, changed_at=excluded.changed_at
+            ''', (zone, year, month, pace['level'], pace['run_rate'], pace['average'], changed_at))
+
+        alert = {
+            'zone': zone,
+            'year': year,
+            'month': month,
+            'level': pace['level'],
+            'previous_level': previous_level,
+            'run_rate': round(pace['run_rate'], 2),
+            'average': round(pace['average'], 2),
+            'message': f"{zone} ({month:02d}/{year}) : {pace_message(pace['level'], pace['run_rate'], pace['average'])}",
+            'at': changed_at,
+        }
+        self.deliver(alert)
+        return alert
+
+    def deliver(self, alert):
+        """Envoie l'alerte à chaque canal ; un canal en panne n'empêche pas les autres"""
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+                self.sent += 1
+            except Exception as e:  # SMTP, réseau, disque...
+                self.last_error = e
+
+_alert_engine = None
+_alert_engine_lock = threading.Lock()
+
+def start_alert_engine(sinks=None):
+    """Branche (une fois par processus) le moteur d'alertes sur les écritures, démarre son thread et le retourne"""
+    global _alert_engine
+    if _alert_engine is None:
+        with _alert_engine_lock:
+            if _alert_engine is None:
+                _alert_engine = AlertEngine(configured_sinks() if sinks is None else sinks)
+                add_change_listener(_alert_engine.on_changes)
+    _alert_engine.start()
+    return _alert_engine
@@ -0,0 +1,211 @@
+"""Archive Parquet des années closes, partitionnée par année et par zone, fusionnée en lecture avec la base.
+
+Chaque partition year=AAAA/zone=ZONE porte dans ses métadonnées de pied de fichier
+les agrégats de l'année (total, mois par mois, janvier manuel, YTD) : les vues
+mensuelles et YoY ne lisent jamais les lignes archivées.
+"""
+import json
+import os
+from datetime import date
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from .cache import bump_data_version, cached_query
+from .db import DB_CONFIG, get_db_connection, get_db_writer, get_year_bounds, read_sales_frame, to_day_numbers
+from .tracing import traced
+
+METADATA_KEY = b'pilotage'
+PARTITION_FILE = 'part-0.parquet'
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("L'archive Parquet nécessite le paquet pyarrow") from e
+    return pa, pq
+
+def get_archive_root():
+    """Dossier racine de l'archive : DB_CONFIG['archive_path'], sinon <base>.archive à côté du fichier SQLite.
+
+    Sans dossier explicite, chaque base a sa propre archive : deux bases ne fusionnent
+    jamais les mêmes partitions en lecture.
+    """
+    return Path(DB_CONFIG['archive_path'] or f"{DB_CONFIG['path']}.archive")
+
+def partition_path(year, zone):
+    """Fichier de la partition des ventes d'une zone pour une année"""
+    return get_archive_root() / 'sales' / f'year={year}' / f'zone={quote(zone, safe="")}' / PARTITION_FILE
+
+def targets_path(year):
+    """Fichier des objectifs mensuels archivés d'une année"""
+    return get_archive_root() / 'targets' / f'year={year}' / PARTITION_FILE
+
+@cached_query
+def get_archived_years():
+    """Années présentes dans l'archive (lecture du seul arbre de dossiers)"""
+    sales_root = get_archive_root() / 'sales'
+    if not sales_root.is_dir():
+        return []
+    return sorted(int(path.name.split('=', 1)[1]) for path in sales_root.glob('year=*') if path.is_dir())
+
+def get_archived_zones(year):
+    """Zones archivées pour une année"""
+    year_root = get_archive_root() / 'sales' / f'year={year}'
+    return sorted(unquote(path.name.split('=', 1)[1]) for path in year_root.glob('zone=*')
+                  if (path / PARTITION_FILE).is_file())
+
+@cached_query
+def read_partition_summary(year, zone):
+    """Agrégats stockés dans le pied de fichier d'une partition (None si absente)"""
+    path = partition_path(year, zone)
+    if not path.is_file():
+        return None
+    _, pq = _pyarrow()
+    metadata = pq.read_metadata(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY])
+
+def _archived_years_between(start_year, end_year):
+    return [year for year in get_archived_years() if start_year <= year <= end_year]
+
+@traced
+@cached_query
+def get_archived_monthly_totals(zones, start_year, end_year):
+    """Volumes mensuels archivés (zone, year, month, volume), lus dans les pieds de fichiers"""
+    rows = []
+    for year in _archived_years_between(start_year, end_year):
+        for zone in zones:
+            summary = read_partition_summary(year, zone)
+            if summary is not None:
+                rows.extend((zone, year, int(month), volume) for month, volume in summary['monthly'].items())
+    return pd.DataFrame(rows, columns=['zone', 'year', 'month', 'volume'])
+
+@traced
+@cached_query
+def get_archived_daily(zones, start_date, end_date):
+    """Ventes quotidiennes archivées (zone, date, volume) sur [start_date, end_date[, partitions utiles seulement"""
+    start, end = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+    frames = []
+    for year in _archived_years_between(start_date.year, end_date.year):
+        for zone in zones:
+            path = partition_path(year, zone)
+            if not path.is_file():
+                continue
+            _, pq = _pyarrow()
+            table = pq.read_table(path, columns=['date', 'volume'],
+                                  filters=[('date', '>=', start), ('date', '<', end)])
+            frame = table.to_pandas()
+            frame.insert(0, 'zone', zone)
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame({'zone': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]'),
+                             'volume': pd.Series(dtype='int64')})
+    # Même typage que les ventes en base : dates en datetime64
+    daily = pd.concat(frames, ignore_index=True)
+    daily['date'] = pd.to_datetime(daily['date'], format='%Y-%m-%d')
+    return daily
+
+@cached_query
+def get_archived_targets():
+    """Objectifs mensuels archivés (zone, year, month, target)"""
+    frames = []
+    for year in get_archived_years():
+        path = targets_path(year)
+        if path.is_file():
+            _, pq = _pyarrow()
+            frame = pq.read_table(path).to_pandas()
+            frame.insert(1, 'year', year)
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['zone', 'year', 'month', 'target'])
+    return pd.concat(frames, ignore_index=True)[['zone', 'year', 'month', 'target']]
+
+def _write_table(frame, path, metadata=None):
+    """Écrit un fichier Parquet de façon atomique (fichier temporaire puis renommage)"""
+    pa, pq = _pyarrow()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               METADATA_KEY: json.dumps(metadata).encode('utf-8')})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.tmp')
+    pq.write_table(table, temporary, compression='zstd')
+    os.replace(temporary, path)
+
+def _partition_summary(zone, year, rows, january_manual):
+    monthly = rows.groupby(rows['date'].str[5:7].astype(int))['volume'].sum()
+    from_february = int(monthly[monthly.index >= 2].sum())
+    return {
+        'zone': zone,
+        'year': year,
+        'rows': len(rows),
+        'first_date': rows['date'].min() if len(rows) else None,
+        'last_date': rows['date'].max() if len(rows) else None,
+        'total': int(monthly.sum()),
+        'monthly': {str(month): int(volume) for month, volume in monthly.items()},
+        'january_manual': january_manual,
+        'ytd': (january_manual or 0) + from_february,
+    }
+
+@traced
+def archive_year(year, vacuum=False):
+    """Déplace les ventes, objectifs et janviers manuels d'une année close vers l'archive Parquet.
+
+    Les fichiers sont écrits avant la suppression en base ; relancer la commande
+    après une interruption fusionne les lignes sans doublon.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"L'année {year} n'est pas close")
+    _pyarrow()
+    year_start, year_end = get_year_bounds(year)
+
+    with get_db_connection() as conn:
+        sales = read_sales_frame(conn, '''
+            SELECT zone_id, day, volume FROM sales_facts
+            WHERE day >= ? AND day < ?
+        ''', (int(to_day_numbers(year_start)), int(to_day_numbers(year_end))))
+        targets = pd.read_sql_query('''
+            SELECT zone, month, target FROM monthly_targets WHERE year = ?
+        ''', conn, params=(year,))
+        january = dict(conn.execute('SELECT zone, january_volume FROM ytd_init WHERE year = ?', (year,)).fetchall())
+
+    # Fusion avec une archive existante : les lignes de la base priment
+    archived_zones = get_archived_zones(year) if year in get_archived_years() else []
+    if archived_zones:
+        previous = get_archived_daily(archived_zones, pd.Timestamp(year_start), pd.Timestamp(year_end))
+        sales = pd.concat([previous, sales]).drop_duplicates(['zone', 'date'], keep='last')
+        for zone in archived_zones:
+            january.setdefault(zone, read_partition_summary(year, zone)['january_manual'])
+        if targets_path(year).is_file():
+            _, pq = _pyarrow()
+            previous_targets = pq.read_table(targets_path(year)).to_pandas()
+            targets = pd.concat([previous_targets, targets]).drop_duplicates(['zone', 'month'], keep='last')
+
+    # Les partitions gardent des dates ISO (filtres Parquet sur chaînes)
+    sales = sales.sort_values(['zone', 'date'])
+    sales['date'] = np.datetime_as_string(sales['date'].to_numpy().astype('datetime64[D]'))
+    for zone in sorted(set(sales['zone']) | set(january)):
+        rows = sales.loc[sales['zone'] == zone, ['date', 'volume']].astype({'volume': 'int64'})
+        _write_table(rows, partition_path(year, zone), _partition_summary(zone, year, rows, january.get(zone)))
+    if not targets.empty:
+        _write_table(targets.sort_values(['zone', 'month']).astype({'month': 'int64', 'target': 'int64'}),
+                     targets_path(year))
+
+    # Cumuls supprimés d'abord : les triggers de suppression des ventes n'ont plus rien à mettre à jour
+    with get_db_writer() as conn:
+        conn.execute('DELETE FROM sales_cumulative WHERE date >= ? AND date < ?', (year_start, year_end))
+        deleted = conn.execute('DELETE FROM sales_facts WHERE day >= ? AND day < ?',
+                               (int(to_day_numbers(year_start)), int(to_day_numbers(year_end)))).rowcount
+        conn.execute('DELETE FROM monthly_targets WHERE year = ?', (year,))
+        conn.execute('DELETE FROM ytd_init WHERE year = ?', (year,))
+    if vacuum:
+        with get_db_writer() as conn:
+            conn.execute('VACUUM')
+    # Les lectures fusionnées doivent voir la nouvelle archive même sans suppression en base
+    bump_data_version()
+
+    return {'year': year, 'rows': len(sales), 'deleted': deleted, 'zones': sales['zone'].nunique(),
+            'targets': len(targets)}
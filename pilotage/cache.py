@@ -0,0 +1,159 @@
+"""Cache des lectures partagé par le processus, invalidé par un compteur de version des données.
+
+Les écritures signalent aussi les mois touchés par zone (notify_changes) aux traitements incrémentaux.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+# Délai minimal entre deux sondes des écritures externes (s)
+PROBE_INTERVAL = 0.5
+
+class QueryCache:
+    """Résultats de lecture indexés par (fonction, arguments, version des données)"""
+
+    def __init__(self, maxsize=1024, probe_interval=PROBE_INTERVAL):
+        self.maxsize = maxsize
+        self.probe_interval = probe_interval
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._probe = None
+        self._probe_token = None
+        self._probe_checked = float('-inf')
+        self._listeners = []
+
+    def add_listener(self, callback, external_only=False):
+        """Appelle `callback()` après chaque invalidation (`external_only` : hors écritures de ce processus)"""
+        self._listeners.append((callback, external_only))
+
+    def set_version_probe(self, probe):
+        """Enregistre une sonde des écritures externes (autres processus, CLI...)"""
+        self._probe = probe
+
+    def _check_probe(self):
+        # Une sonde par intervalle au plus : une écriture externe est vue avec ce délai.
+        # Relevé et mise à jour du jeton sous verrou : deux threads ne comptent pas deux fois la même écriture.
+        if self._probe is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._probe_checked < self.probe_interval:
+                return
+            self._probe_checked = now
+            token = self._probe()
+            if token == self._probe_token:
+                return
+            self._probe_token = token
+        self.bump()
+
+    def current_version(self):
+        """Version des données, écritures externes comprises"""
+        self._check_probe()
+        return self.version
+
+    def get_or_compute(self, key, compute):
+        """Retourne le résultat en cache pour `key`, ou le calcule et le mémorise"""
+        self._check_probe()
+        with self._lock:
+            version = self.version
+            entry_key = (version,) + key
+            if entry_key in self._entries:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return self._entries[entry_key]
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            # Une écriture survenue pendant le calcul rend le résultat inutilisable
+            if self.version == version:
+                self._entries[entry_key] = result
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return result
+
+    def bump(self, local=False):
+        """Signale une écriture : toutes les entrées deviennent obsolètes.
+
+        `local` : validation de ce processus ; le jeton de la sonde est relu avant
+        l'invalidation pour que la sonde ne la compte pas une seconde fois.
+        """
+        with self._lock:
+            if local and self._probe is not None:
+                self._probe_token = self._probe()
+                self._probe_checked = time.monotonic()
+            self.version += 1
+            self._entries.clear()
+        for callback, external_only in self._listeners:
+            if not (local and external_only):
+                callback()
+
+    def skip_local_write(self, before, after):
+        """Validation de ce processus sans effet sur les lectures en cache : la sonde ne la compte pas.
+
+        `before` / `after` : jetons de la sonde relus avant et après l'écriture ; une écriture
+        externe pas encore vue (jeton connu différent de `before`) reste signalée.
+        """
+        with self._lock:
+            if self._probe_token == before:
+                self._probe_token = after
+
+    def stats(self):
+        """Compteurs de succès/échecs et taille du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+_query_cache = QueryCache()
+
+def get_query_cache():
+    """Cache des lectures partagé par toutes les sessions du processus"""
+    return _query_cache
+
+def bump_data_version(local=False):
+    """Invalide toutes les lectures en cache (`local` : validation de l'écrivain de ce processus)"""
+    _query_cache.bump(local=local)
+
+# Écritures ciblées : mois touchés par zone, pour les traitements incrémentaux (alertes)
+_change_listeners = []
+
+def add_change_listener(callback):
+    """Appelle `callback(changes)` après une écriture validée ; changes : {(zone, année, mois)}, zone None = toutes"""
+    _change_listeners.append(callback)
+
+def notify_changes(changes):
+    """Signale les (zone, année, mois) touchés par une écriture qui vient d'être validée"""
+    changes = set(changes)
+    if changes:
+        for callback in _change_listeners:
+            callback(changes)
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+def cached_query(func):
+    """Mémorise une fonction de lecture jusqu'à la prochaine écriture en base.
+
+    Les DataFrames sont copiés en sortie pour que l'appelant puisse les modifier.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__qualname__, _freeze(args), frozenset((k, _freeze(v)) for k, v in kwargs.items()))
+        result = _query_cache.get_or_compute(key, lambda: func(*args, **kwargs))
+        return result.copy() if hasattr(result, 'copy') else result
+    return wrapper
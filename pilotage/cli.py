@@ -0,0 +1,74 @@
+"""Commandes de maintenance : python -m pilotage <commande>"""
+import argparse
+
+from .db import init_database, rebuild_sales_cumulative
+
+# Attente maximale des alertes après un import (s)
+ALERT_WAIT_SECONDS = 60
+
+def run_migrations(status_only=False):
+    """Applique les migrations en attente (ou les liste seulement) et affiche le résultat"""
+    from .migrations import get_migration_status, migrate
+    
+    if not status_only:
+        applied = migrate()
+        for version, name in applied:
+            print(f"✅ {version:03d} {name}")
+        if not applied:
+            print("✅ Schéma déjà à jour")
+        return
+    for version, name, applied_at in get_migration_status():
+        print(f"{'✅' if applied_at else '⏳'} {version:03d} {name}" + (f" ({applied_at})" if applied_at else " (en attente)"))
+
+def run_cli(argv=None):
+    """Point d'entrée de la ligne de commande"""
+    parser = argparse.ArgumentParser(prog='python -m pilotage', description="Maintenance de la base Pilotage Commercial")
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = commands.add_parser('migrate', help="Applique les migrations de schéma en attente")
+    migrate_parser.add_argument('--status', action='store_true', help="liste les migrations sans rien appliquer")
+    commands.add_parser('rebuild-cumulative', help="Reconstruit la table sales_cumulative (réparation)")
+    import_parser = commands.add_parser('import-sales', help="Importe des ventes depuis un fichier CSV ou XLSX")
+    import_parser.add_argument('file', help="fichier avec les colonnes zone, date, volume")
+    import_parser.add_argument('--chunksize', type=int, default=5000, help="lignes lues par bloc")
+    archive_parser = commands.add_parser('archive-year', help="Déplace une année close vers l'archive Parquet")
+    archive_parser.add_argument('year', type=int, help="année à archiver")
+    archive_parser.add_argument('--vacuum', action='store_true', help="compacte la base après suppression")
+    commands.add_parser('check-alerts', help="Réévalue les alertes de run-rate du mois en cours (toutes les zones)")
+    args = parser.parse_args(argv)
+    
+    if args.command == 'migrate':
+        return run_migrations(args.status)
+    
+    init_database()
+    if args.command == 'rebuild-cumulative':
+        count = rebuild_sales_cumulative()
+        print(f"✅ {count} lignes cumulées reconstruites")
+    elif args.command == 'import-sales':
+        from .alerts import start_alert_engine
+        from .importer import import_sales_file
+        
+        engine = start_alert_engine()
+        with open(args.file, 'rb') as source:
+            report = import_sales_file(source, args.file, args.chunksize)
+        # Thread de fond : les alertes du mois importé partent avant la fin du processus
+        engine.wait_idle(ALERT_WAIT_SECONDS)
+        print(f"✅ {report['imported']} lignes importées en {report['seconds']:.2f} s "
+              f"({report['rows_per_second']:,.0f} lignes/s)")
+        if not report['rejected'].empty:
+            print(f"⚠️ {len(report['rejected'])} lignes rejetées :")
+            print(report['rejected'].to_string())
+    elif args.command == 'archive-year':
+        from .archive import archive_year
+        
+        report = archive_year(args.year, vacuum=args.vacuum)
+        print(f"✅ {report['year']} archivée : {report['rows']} ventes sur {report['zones']} zones, "
+              f"{report['targets']} objectifs ({report['deleted']} lignes supprimées de la base)")
+    elif args.command == 'check-alerts':
+        from .alerts import start_alert_engine
+        
+        engine = start_alert_engine()
+        current_date = engine.clock()
+        alerts = engine.evaluate_changes([(None, current_date.year, current_date.month)])
+        for alert in alerts:
+            print(alert['message'])
+        print(f"✅ {len(alerts)} alerte(s) émise(s)")
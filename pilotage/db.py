@@ -0,0 +1,347 @@
+"""Stockage SQLite : configuration, pool de connexions, schéma, ventes encodées et cumuls matérialisés"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .cache import bump_data_version, get_query_cache
+from .tracing import TracedConnection
+
+# Paramètres SQLite, surchargeables par variables d'environnement
+DB_CONFIG = {
+    'path': os.environ.get('PILOTAGE_DB_PATH', 'commercial_tracking.db'),
+    'journal_mode': os.environ.get('PILOTAGE_DB_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('PILOTAGE_DB_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('PILOTAGE_DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('PILOTAGE_DB_CACHE_SIZE', -64000)),  # négatif = Kio
+    'busy_timeout': int(os.environ.get('PILOTAGE_DB_BUSY_TIMEOUT', 5000)),  # ms
+    'read_pool_size': int(os.environ.get('PILOTAGE_DB_READ_POOL_SIZE', 8)),
+    'archive_path': os.environ.get('PILOTAGE_ARCHIVE_PATH'),  # années closes (Parquet) ; défaut : <base>.archive
+    'backend': os.environ.get('PILOTAGE_BACKEND', 'sqlite'),  # moteur de SalesRepository (voir repository.BACKENDS)
+}
+
+class ConnectionManager:
+    """Pool de connexions SQLite : lecteurs réutilisés par thread, un seul écrivain sérialisé"""
+
+    def __init__(self, config):
+        self.config = dict(config)
+        self._readers = queue.LifoQueue(maxsize=self.config['read_pool_size'])
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+
+    def _connect(self, factory=TracedConnection):
+        conn = sqlite3.connect(
+            self.config['path'],
+            timeout=self.config['busy_timeout'] / 1000,
+            check_same_thread=False,
+            factory=factory,
+        )
+        conn.execute(f"PRAGMA journal_mode={self.config['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous={self.config['synchronous']}")
+        conn.execute(f"PRAGMA mmap_size={int(self.config['mmap_size'])}")
+        conn.execute(f"PRAGMA cache_size={int(self.config['cache_size'])}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.config['busy_timeout'])}")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Prête une connexion de lecture au thread appelant le temps du bloc"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Ferme toutes les connexions du pool"""
+        with self._write_lock, self._watcher_lock:
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+            for conn in (self._writer, self._watcher):
+                if conn is not None:
+                    conn.close()
+            self._writer = self._watcher = None
+
+    def data_version(self):
+        """Compteur SQLite modifié à chaque validation faite par une autre connexion"""
+        with self._watcher_lock:
+            if self._watcher is None:
+                # Sonde non instrumentée : elle précède chaque lecture en cache
+                self._watcher = self._connect(factory=sqlite3.Connection)
+            return self._watcher.execute('PRAGMA data_version').fetchone()[0]
+
+    @contextmanager
+    def writer(self, bump=True):
+        """Donne l'accès exclusif à la connexion d'écriture, validée en fin de bloc.
+
+        `bump` False : écriture de suivi (état des alertes...) qu'aucune lecture en cache ne lit,
+        la version des données n'est pas changée.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            changes_before = self._writer.total_changes
+            token_before = None if bump else self.data_version()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+            if self._writer.total_changes != changes_before:
+                # Encore sous le verrou : la sonde ne reprend pas cette validation pour une écriture externe
+                if bump:
+                    bump_data_version(local=True)
+                else:
+                    get_query_cache().skip_local_write(token_before, self.data_version())
+
+_connection_manager = None
+_connection_manager_lock = threading.Lock()
+
+def get_connection_manager():
+    """Gestionnaire de connexions partagé par tout le processus"""
+    global _connection_manager
+    if _connection_manager is None:
+        with _connection_manager_lock:
+            if _connection_manager is None:
+                _connection_manager = ConnectionManager(DB_CONFIG)
+                # Les écritures d'autres processus invalident aussi le cache des lectures
+                get_query_cache().set_version_probe(_connection_manager.data_version)
+    return _connection_manager
+
+# Cumuls quotidiens par zone : ytd = janvier manuel + ventes depuis février, mtd = ventes du mois.
+# Les triggers ne recalculent que la ligne touchée et les lignes postérieures de la même année.
+
+def day_number_sql(expression):
+    """Expression SQL : date ISO -> jours depuis le 1970-01-01"""
+    return f"CAST(julianday({expression}) - 2440587.5 AS INTEGER)"
+
+def iso_date_sql(expression):
+    """Expression SQL : jours depuis le 1970-01-01 -> date ISO"""
+    return f"date({expression} * 86400, 'unixepoch')"
+
+def fact_columns_sql(row):
+    """Expressions SQL (zone, date ISO, volume) de la ligne `row` (OLD/NEW) de sales_facts"""
+    return (f'(SELECT name FROM zones WHERE id = {row}.zone_id)', iso_date_sql(f'{row}.day'), f'{row}.volume')
+
+def zone_id_sql(name):
+    """Expression SQL : nom -> identifiant de la zone de saisie (NULL si inconnue)"""
+    return f"(SELECT id FROM zones WHERE name = {name} AND kind = 'zone')"
+
+def cumulative_remove_sql(row):
+    """Retire la vente `row` (OLD/NEW de sales_facts) des cumuls"""
+    zone, day, volume = fact_columns_sql(row)
+    return f'''
+        UPDATE sales_cumulative
+        SET ytd = ytd - CASE WHEN {day} >= date({day}, 'start of year', '+1 month')
+                             THEN {volume} ELSE 0 END,
+            mtd = mtd - CASE WHEN date < date({day}, 'start of month', '+1 month')
+                             THEN {volume} ELSE 0 END
+        WHERE zone = {zone}
+        AND date > {day}
+        AND date < date({day}, 'start of year', '+1 year');
+        DELETE FROM sales_cumulative WHERE zone = {zone} AND date = {day};
+    '''
+
+def cumulative_add_sql(row):
+    """Ajoute la vente `row` (OLD/NEW de sales_facts) aux cumuls"""
+    zone, day, volume = fact_columns_sql(row)
+    return f'''
+        UPDATE sales_cumulative
+        SET ytd = ytd + CASE WHEN {day} >= date({day}, 'start of year', '+1 month')
+                             THEN {volume} ELSE 0 END,
+            mtd = mtd + CASE WHEN date < date({day}, 'start of month', '+1 month')
+                             THEN {volume} ELSE 0 END
+        WHERE zone = {zone}
+        AND date > {day}
+        AND date < date({day}, 'start of year', '+1 year');
+        INSERT INTO sales_cumulative (zone, date, ytd, mtd)
+        VALUES (
+            {zone},
+            {day},
+            COALESCE(
+                (SELECT ytd FROM sales_cumulative
+                 WHERE zone = {zone}
+                 AND date >= date({day}, 'start of year') AND date < {day}
+                 ORDER BY date DESC LIMIT 1),
+                (SELECT january_volume FROM ytd_init
+                 WHERE zone = {zone} AND year = CAST(strftime('%Y', {day}) AS INTEGER)),
+                0
+            ) + CASE WHEN {day} >= date({day}, 'start of year', '+1 month')
+                     THEN {volume} ELSE 0 END,
+            COALESCE(
+                (SELECT mtd FROM sales_cumulative
+                 WHERE zone = {zone}
+                 AND date >= date({day}, 'start of month') AND date < {day}
+                 ORDER BY date DESC LIMIT 1),
+                0
+            ) + {volume}
+        );
+    '''
+
+def ytd_init_shift_sql(row, sign):
+    """Répercute le janvier manuel `row` (OLD/NEW) sur les cumuls YTD de son année"""
+    return f'''
+        UPDATE sales_cumulative
+        SET ytd = ytd {sign} {row}.january_volume
+        WHERE zone = {row}.zone
+        AND date >= printf('%04d-01-01', {row}.year)
+        AND date < printf('%04d-01-01', {row}.year + 1);
+    '''
+
+CUMULATIVE_TRIGGERS = {
+    'trg_sales_cumulative_insert':
+        f'AFTER INSERT ON sales_facts BEGIN {cumulative_add_sql("NEW")} END',
+    'trg_sales_cumulative_update':
+        f'AFTER UPDATE OF zone_id, day, volume ON sales_facts BEGIN '
+        f'{cumulative_remove_sql("OLD")} {cumulative_add_sql("NEW")} END',
+    'trg_sales_cumulative_delete':
+        f'AFTER DELETE ON sales_facts BEGIN {cumulative_remove_sql("OLD")} END',
+    'trg_ytd_init_cumulative_insert':
+        f'AFTER INSERT ON ytd_init BEGIN {ytd_init_shift_sql("NEW", "+")} END',
+    'trg_ytd_init_cumulative_update':
+        f'AFTER UPDATE OF zone, year, january_volume ON ytd_init BEGIN '
+        f'{ytd_init_shift_sql("OLD", "-")} {ytd_init_shift_sql("NEW", "+")} END',
+    'trg_ytd_init_cumulative_delete':
+        f'AFTER DELETE ON ytd_init BEGIN {ytd_init_shift_sql("OLD", "-")} END',
+}
+
+# Écritures sur la vue de compatibilité `sales` (zone, date ISO, volume), reportées sur sales_facts.
+# Les ventes se saisissent sur les zones de type 'zone' de l'arborescence.
+SALES_VIEW_TRIGGERS = {
+    'trg_sales_view_insert': f'''INSTEAD OF INSERT ON sales BEGIN
+        SELECT RAISE(ABORT, 'Zone inconnue') WHERE {zone_id_sql('NEW.zone')} IS NULL;
+        INSERT INTO sales_facts (zone_id, day, volume)
+        VALUES ({zone_id_sql('NEW.zone')}, {day_number_sql('NEW.date')}, NEW.volume);
+    END''',
+    'trg_sales_view_update': f'''INSTEAD OF UPDATE ON sales BEGIN
+        SELECT RAISE(ABORT, 'Zone inconnue') WHERE {zone_id_sql('NEW.zone')} IS NULL;
+        UPDATE sales_facts
+        SET zone_id = {zone_id_sql('NEW.zone')},
+            day = {day_number_sql('NEW.date')},
+            volume = NEW.volume
+        WHERE zone_id = (SELECT id FROM zones WHERE name = OLD.zone) AND day = {day_number_sql('OLD.date')};
+    END''',
+    'trg_sales_view_delete': f'''INSTEAD OF DELETE ON sales BEGIN
+        DELETE FROM sales_facts
+        WHERE zone_id = (SELECT id FROM zones WHERE name = OLD.zone) AND day = {day_number_sql('OLD.date')};
+    END''',
+}
+
+# Vue de compatibilité : colonnes de l'ancienne table sales, en lecture comme en écriture
+SALES_VIEW_SQL = f'''
+    CREATE VIEW IF NOT EXISTS sales AS
+    SELECT z.name as zone, {iso_date_sql('f.day')} as date, f.volume
+    FROM sales_facts f
+    JOIN zones z ON z.id = f.zone_id
+'''
+
+# Arborescence initiale des zones : (nom, parent, type, consolidé dans le parent, pays des jours fériés).
+# Le pays d'une zone se change dans la configuration (set_zone_country).
+# Les ventes, objectifs et YTD sont saisis sur les feuilles de type 'zone'.
+DEFAULT_ZONE_TREE = [
+    ('Groupe', None, 'group', True, None),
+    ('Filiales', 'Groupe', 'filiale', True, None),
+    ('Concessions', 'Groupe', 'concession', False, None),
+    ('BEFR', 'Filiales', 'zone', True, 'BE'),
+    ('BENL', 'Filiales', 'zone', True, 'BE'),
+    ('France', 'Filiales', 'zone', True, 'FR'),
+    ('Espagne', 'Filiales', 'zone', False, 'ES'),  # Espagne exclue de la consolidation groupe
+    ('Sud-Rhône', 'Concessions', 'zone', True, 'FR'),
+    ('Hauts-de-France', 'Concessions', 'zone', True, 'FR'),
+    ('Luxembourg', 'Concessions', 'zone', True, 'LU'),
+]
+
+def configure_database(**settings):
+    """Modifie DB_CONFIG (chemin, pragmas...) et repart d'un pool de connexions neuf"""
+    global _connection_manager
+    with _connection_manager_lock:
+        if _connection_manager is not None:
+            _connection_manager.close()
+            _connection_manager = None
+        DB_CONFIG.update(settings)
+    bump_data_version()
+
+def init_database():
+    """Met la base au dernier schéma (migrations en attente, voir migrations.py)"""
+    from .migrations import migrate
+    return migrate()
+
+def rebuild_cumulative_rows(cursor):
+    """Recalcule entièrement sales_cumulative dans la transaction du curseur"""
+    cursor.execute('DELETE FROM sales_cumulative')
+    cursor.execute('''
+        INSERT INTO sales_cumulative (zone, date, ytd, mtd)
+        SELECT s.zone,
+               s.date,
+               COALESCE(y.january_volume, 0) + SUM(
+                   CASE WHEN s.date >= date(s.date, 'start of year', '+1 month') THEN s.volume ELSE 0 END
+               ) OVER (PARTITION BY s.zone, substr(s.date, 1, 4) ORDER BY s.date),
+               SUM(s.volume) OVER (PARTITION BY s.zone, substr(s.date, 1, 7) ORDER BY s.date)
+        FROM sales s
+        LEFT JOIN ytd_init y
+        ON y.zone = s.zone AND y.year = CAST(substr(s.date, 1, 4) AS INTEGER)
+    ''')
+    return cursor.rowcount
+
+def rebuild_sales_cumulative():
+    """Reconstruit les cumuls (réparation uniquement, les triggers les tiennent à jour)"""
+    with get_db_writer() as conn:
+        return rebuild_cumulative_rows(conn.cursor())
+
+def get_db_connection():
+    """Retourne une connexion de lecture du pool (à utiliser avec `with`)"""
+    return get_connection_manager().reader()
+
+def get_db_writer(bump=True):
+    """Retourne la connexion d'écriture partagée (à utiliser avec `with`) ; `bump` False : caches conservés"""
+    return get_connection_manager().writer(bump)
+
+def get_month_bounds(year, month):
+    """Retourne les bornes [début, fin) d'un mois au format des dates stockées"""
+    start = f'{year}-{month:02d}-01'
+    end = f'{year + 1}-01-01' if month == 12 else f'{year}-{month + 1:02d}-01'
+    return start, end
+
+def get_year_bounds(year):
+    """Retourne les bornes [début, fin) d'une année au format des dates stockées"""
+    return f'{year}-01-01', f'{year + 1}-01-01'
+
+def to_day_numbers(dates):
+    """Dates (ISO, datetime ou datetime64) -> jours depuis le 1970-01-01 (int64)"""
+    return np.asarray(dates, dtype='datetime64[D]').astype('int64')
+
+def get_zone_ids(conn, names):
+    """Identifiants des zones de saisie {nom: id} (table zones) ; les noms inconnus sont absents"""
+    return dict(conn.execute('''
+        SELECT name, id FROM zones WHERE kind = 'zone' AND name IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(dict.fromkeys(names))),)).fetchall())
+
+def read_sales_frame(conn, query, params=()):
+    """Ventes (zone, date datetime64, volume int64) lues par `query` en colonnes typées, sans analyse de chaînes.
+
+    `query` retourne les colonnes zone_id, day et volume de sales_facts.
+    """
+    rows = np.fromiter(conn.execute(query, params), dtype=[('zone_id', 'int64'), ('day', 'int64'), ('volume', 'int64')])
+    names = dict(conn.execute('SELECT id, name FROM zones').fetchall())
+    lookup = np.array([names.get(zone_id) for zone_id in range(max(names, default=0) + 1)], dtype=object)
+    return pd.DataFrame({
+        'zone': lookup[rows['zone_id']],
+        'date': rows['day'].astype('datetime64[D]').astype('datetime64[ns]'),
+        'volume': rows['volume'],
+    })
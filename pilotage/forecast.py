@@ -0,0 +1,177 @@
+"""Prévision de fin de mois de toutes les zones à la fois (rythme actuel et profils historiques)"""
+import numpy as np
+import pandas as pd
+
+from .archive import get_archived_daily
+from .cache import cached_query
+from .db import get_db_connection
+from .holidays import is_working_in_zones
+from .metrics import get_zones_overview
+from .storage import get_consolidated_zones, get_zones
+from .tracing import traced
+
+# Mois d'historique servant à construire les profils intra-mois
+HISTORY_MONTHS = 36
+# En dessous, un mois historique est trop peu avancé pour extrapoler la part réalisée
+MIN_PROFILE_SHARE = 0.05
+# Nombre minimum de mois comparables pour utiliser le profil plutôt que le rythme
+MIN_HISTORY_MONTHS = 3
+
+def _forecast_arrays(zones, year, month, current_date):
+    """Matrices zone x mois : ventes du mois en cours et projections issues de chaque mois historique"""
+    current_month = np.datetime64(f'{year}-{month:02d}', 'M')
+    history_start = current_month - HISTORY_MONTHS
+    n_zones, n_months = len(zones), HISTORY_MONTHS + 1
+    all_months = history_start + np.arange(n_months)
+    month_starts = all_months.astype('datetime64[D]')
+
+    # Jours ouvrés de chaque zone (bitmaps) sur tout l'historique et le mois en cours
+    days = np.arange(month_starts[0], (all_months[-1] + 1).astype('datetime64[D]'))
+    working = is_working_in_zones(zones, days).astype('int64')
+    month_offsets = (month_starts - days[0]).astype('int64')
+    month_working_days = np.add.reduceat(working, month_offsets, axis=1)
+    total_working_days = month_working_days[:, -1]
+    today = int((np.datetime64(current_date.date(), 'D') - days[0]).astype('int64'))
+    passed = np.clip(working[:, month_offsets[-1]:max(today, month_offsets[-1])].sum(axis=1), 0, total_working_days)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(total_working_days > 0, passed / total_working_days, 1.0)
+
+    # Date limite de chaque zone et mois : lendemain du dernier jour ouvré compris dans la même
+    # fraction de jours ouvrés (les jours non ouvrés suivent le jour ouvré suivant)
+    elapsed = np.ceil(fraction[:, None] * month_working_days).astype('int64')
+    cumulative = np.cumsum(working, axis=1)
+    before_month = np.where(month_offsets > 0, cumulative[:, np.maximum(month_offsets - 1, 0)], 0)
+    # Cumuls décalés par zone pour un seul searchsorted sur toutes les lignes
+    shift = (np.arange(n_zones) * (len(days) + 1))[:, None]
+    last_elapsed = np.searchsorted((cumulative + shift).ravel(), (before_month + elapsed + shift).ravel())
+    last_elapsed = last_elapsed.reshape(n_zones, n_months) - np.arange(n_zones)[:, None] * len(days)
+    cutoffs = np.where(elapsed > 0, days[0] + last_elapsed + 1, month_starts)
+
+    # Une seule requête pour toutes les zones : historique + mois en cours, lus dans les
+    # cumuls mensuels (mtd) tenus par les triggers, deux recherches indexées par zone et par mois
+    months = pd.DataFrame({
+        'zone': np.repeat(zones, n_months),
+        'month': np.tile(all_months.astype(str), n_zones),
+        'start': np.tile(month_starts.astype(str), n_zones),
+        'end': np.tile((all_months + 1).astype('datetime64[D]').astype(str), n_zones),
+        'cutoff': cutoffs.ravel().astype(str),
+    })
+    with get_db_connection() as conn:
+        totals = pd.read_sql_query('''
+            WITH months AS MATERIALIZED (
+                SELECT json_extract(value, '$.zone') as zone,
+                       json_extract(value, '$.month') as month,
+                       json_extract(value, '$.start') as start,
+                       json_extract(value, '$.end') as end,
+                       json_extract(value, '$.cutoff') as cutoff
+                FROM json_each(:months)
+            )
+            SELECT m.zone, m.month,
+                   COALESCE((SELECT mtd FROM sales_cumulative
+                             WHERE zone = m.zone AND date >= m.start AND date < m.end
+                             ORDER BY date DESC LIMIT 1), 0) as total,
+                   COALESCE((SELECT mtd FROM sales_cumulative
+                             WHERE zone = m.zone AND date >= m.start AND date < m.cutoff
+                             ORDER BY date DESC LIMIT 1), 0) as reached
+            FROM months m
+        ''', conn, params={'months': months.to_json(orient='records')})
+
+    flat = (pd.Index(zones).get_indexer(totals['zone']) * n_months
+            + pd.Index(all_months.astype(str)).get_indexer(totals['month']))
+    month_totals = np.bincount(flat, weights=totals['total'], minlength=n_zones * n_months).reshape(n_zones, n_months)
+    reached = np.bincount(flat, weights=totals['reached'], minlength=n_zones * n_months).reshape(n_zones, n_months)
+
+    # Mois des années closes : lignes lues dans les seules partitions Parquet utiles
+    archived = get_archived_daily(zones, month_starts[0].item(), (all_months[-1] + 1).astype('datetime64[D]').item())
+    if not archived.empty:
+        archived_days = archived['date'].to_numpy().astype('datetime64[D]')
+        month_pos = (archived_days.astype('datetime64[M]') - history_start).astype('int64')
+        archived_flat = pd.Index(zones).get_indexer(archived['zone']) * n_months + month_pos
+        volumes = archived['volume'].to_numpy(dtype='float64')
+        early = archived_days < cutoffs[pd.Index(zones).get_indexer(archived['zone']), month_pos]
+        month_totals += np.bincount(archived_flat, weights=volumes, minlength=n_zones * n_months).reshape(n_zones, n_months)
+        reached += np.bincount(archived_flat[early], weights=volumes[early],
+                               minlength=n_zones * n_months).reshape(n_zones, n_months)
+
+    realized = month_totals[:, -1]
+    history, history_reached = month_totals[:, :-1], reached[:, :-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = history_reached / history
+    valid = (history > 0) & (share >= MIN_PROFILE_SHARE)
+    samples = np.where(valid, realized[:, None] / np.where(valid, share, 1.0), np.nan)
+    # Mois terminé : le réalisé ; mois pas commencé : les totaux historiques
+    samples = np.where((passed == 0)[:, None], np.where(history > 0, history, np.nan), samples)
+    samples = np.where((passed >= total_working_days)[:, None], realized[:, None], samples)
+    # Le mois ne peut pas finir sous le réalisé déjà saisi
+    samples = np.where(np.isnan(samples), np.nan, np.maximum(samples, realized[:, None]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pace = np.where(passed > 0, realized + realized / passed * (total_working_days - passed), np.nan)
+
+    return {
+        'realized': realized,
+        'samples': samples,
+        'pace': pace,
+        'passed': passed,
+        'total_working_days': total_working_days,
+    }
+
+def _summarize(realized, samples, target, pace):
+    """Prévision, bandes P10/P50/P90 et probabilité d'atteinte (vecteurs par ligne)"""
+    n_samples = np.sum(~np.isnan(samples), axis=1)
+    enough = n_samples >= MIN_HISTORY_MONTHS
+
+    bands = np.full((3, len(realized)), np.nan)
+    if enough.any():
+        bands[:, enough] = np.nanpercentile(samples[enough], [10, 50, 90], axis=1)
+
+    forecast = np.where(enough, bands[1], pace)
+    forecast = np.where(np.isnan(forecast), realized, forecast)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probability = np.sum(samples >= target[:, None], axis=1) / n_samples
+    probability = np.where(enough & (target > 0), probability, np.nan)
+
+    return {
+        'pace_forecast': pace,
+        'forecast': forecast,
+        'p10': bands[0],
+        'p50': bands[1],
+        'p90': bands[2],
+        'attainment_probability': probability,
+        'history_months': n_samples,
+    }
+
+@traced
+@cached_query
+def forecast_month_end(year, month, current_date, zones=None):
+    """Prévision de fin de mois par zone : rythme par jour ouvré et profils intra-mois historiques"""
+    if zones is None:
+        zones = get_zones()
+    zones = list(zones)
+
+    arrays = _forecast_arrays(zones, year, month, current_date)
+    target = get_zones_overview(year, month, current_date, zones=zones)['target'].to_numpy(dtype='float64')
+    summary = _summarize(arrays['realized'], arrays['samples'], target, arrays['pace'])
+
+    forecast = pd.DataFrame({'realized': arrays['realized'], 'target': target, **summary}, index=pd.Index(zones, name='zone'))
+    forecast['working_days_passed'] = arrays['passed']
+    forecast['working_days_total'] = arrays['total_working_days']
+    return forecast
+
+@traced
+@cached_query
+def forecast_group_month_end(year, month, current_date):
+    """Prévision de fin de mois de la consolidation groupe (projections additionnées mois par mois)"""
+    zones = get_consolidated_zones()
+    arrays = _forecast_arrays(zones, year, month, current_date)
+    target = get_zones_overview(year, month, current_date, zones=zones)['target'].to_numpy(dtype='float64')
+
+    # Une projection groupe par mois historique, si toutes les zones en ont une ;
+    # rythme groupe : somme des rythmes des zones (chacune selon son calendrier)
+    summary = _summarize(arrays['realized'].sum(keepdims=True), arrays['samples'].sum(axis=0, keepdims=True),
+                         target.sum(keepdims=True), arrays['pace'].sum(keepdims=True))
+    return {
+        'realized': float(arrays['realized'].sum()),
+        'target': float(target.sum()),
+        **{name: float(values[0]) for name, values in summary.items()},
+    }
@@ -0,0 +1,313 @@
+"""Jours fériés par pays et par zone, calendriers et bitmaps des jours ouvrables"""
+import calendar
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .cache import cached_query, get_query_cache, notify_changes
+from .db import get_db_connection
+from .repository import get_repository
+
+def get_easter_date(year):
+    """Calcule le dimanche de Pâques grégorien (algorithme de Meeus/Jones/Butcher)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime(year, month, day + 1)
+
+# Jours fériés fixes (mois, jour, nom) de chaque pays
+FIXED_HOLIDAYS = {
+    'BE': [
+        (1, 1, "Nouvel An"),
+        (5, 1, "Fête du Travail"),
+        (7, 21, "Fête Nationale"),
+        (8, 15, "Assomption"),
+        (11, 1, "Toussaint"),
+        (11, 11, "Armistice"),
+        (12, 25, "Noël"),
+        (12, 26, "Lendemain de Noël"),
+    ],
+    'FR': [
+        (1, 1, "Nouvel An"),
+        (5, 1, "Fête du Travail"),
+        (5, 8, "Victoire 1945"),
+        (7, 14, "Fête Nationale"),
+        (8, 15, "Assomption"),
+        (11, 1, "Toussaint"),
+        (11, 11, "Armistice"),
+        (12, 25, "Noël"),
+    ],
+    'ES': [
+        (1, 1, "Nouvel An"),
+        (1, 6, "Épiphanie"),
+        (5, 1, "Fête du Travail"),
+        (8, 15, "Assomption"),
+        (10, 12, "Fête Nationale"),
+        (11, 1, "Toussaint"),
+        (12, 6, "Jour de la Constitution"),
+        (12, 8, "Immaculée Conception"),
+        (12, 25, "Noël"),
+    ],
+    'LU': [
+        (1, 1, "Nouvel An"),
+        (5, 1, "Fête du Travail"),
+        (5, 9, "Journée de l'Europe"),
+        (6, 23, "Fête Nationale"),
+        (8, 15, "Assomption"),
+        (11, 1, "Toussaint"),
+        (12, 25, "Noël"),
+        (12, 26, "Saint-Étienne"),
+    ],
+}
+
+# Jours fériés mobiles : (décalage en jours depuis le dimanche de Pâques, nom)
+EASTER_HOLIDAYS = {
+    'BE': [(1, "Lundi de Pâques"), (39, "Ascension"), (50, "Lundi de Pentecôte")],
+    'FR': [(1, "Lundi de Pâques"), (39, "Ascension"), (50, "Lundi de Pentecôte")],
+    'ES': [(-2, "Vendredi saint")],
+    'LU': [(1, "Lundi de Pâques"), (39, "Ascension"), (50, "Lundi de Pentecôte")],
+}
+
+COUNTRIES = {'BE': 'Belgique', 'FR': 'France', 'ES': 'Espagne', 'LU': 'Luxembourg'}
+# Calendrier des zones sans pays renseigné
+DEFAULT_COUNTRY = 'BE'
+
+def list_public_holidays(year, country=DEFAULT_COUNTRY):
+    """Jours fériés publics d'un pays (BE, FR, ES, LU) pour une année : [(date, nom)] par date"""
+    if country not in COUNTRIES:
+        raise ValueError(f"Pays inconnu : {country} (choix : {', '.join(COUNTRIES)})")
+    
+    easter = get_easter_date(year)
+    holidays = [(datetime(year, month, day), name) for month, day, name in FIXED_HOLIDAYS[country]]
+    holidays.extend((easter + timedelta(days=offset), name) for offset, name in EASTER_HOLIDAYS[country])
+    return sorted(holidays)
+
+def get_public_holidays(year, country=DEFAULT_COUNTRY):
+    """Retourne les jours fériés publics d'un pays (BE, FR, ES, LU) pour une année"""
+    return {day for day, _ in list_public_holidays(year, country)}
+
+def to_days(dates):
+    """Convertit une date ou un tableau de dates en datetime64[D] (heure ignorée)"""
+    if isinstance(dates, (pd.Series, pd.Index)):
+        return pd.to_datetime(dates).values.astype('datetime64[D]')
+    return np.asarray(dates, dtype='datetime64[D]')
+
+class WorkingDayCalendar:
+    """Moteur de jours ouvrables vectorisé (lundi-vendredi hors jours fériés)"""
+
+    def __init__(self, holidays):
+        holiday_days = pd.DatetimeIndex(list(holidays)).values.astype('datetime64[D]')
+        self.busdaycal = np.busdaycalendar(weekmask='1111100', holidays=holiday_days)
+
+    def is_working(self, dates):
+        """Indique pour chaque date si elle est ouvrable"""
+        return np.is_busday(to_days(dates), busdaycal=self.busdaycal)
+
+    def count(self, start_dates, end_dates):
+        """Compte les jours ouvrables entre deux dates incluses (0 si fin < début)"""
+        start = to_days(start_dates)
+        end = to_days(end_dates) + np.timedelta64(1, 'D')
+        return np.maximum(np.busday_count(start, end, busdaycal=self.busdaycal), 0)
+
+    def working_days_in_month(self, year, month):
+        """Retourne les jours ouvrables d'un mois (datetime64[D])"""
+        first_day = np.datetime64(f'{year}-{month:02d}-01', 'D')
+        days = np.arange(first_day, first_day + np.timedelta64(calendar.monthrange(year, month)[1], 'D'))
+        return days[self.is_working(days)]
+
+    def per_month(self, year):
+        """Nombre de jours ouvrables de chaque mois de l'année (tableau de 12)"""
+        month_starts = np.arange(f'{year}-01', f'{year + 1}-01', dtype='datetime64[M]')
+        return np.busday_count(month_starts.astype('datetime64[D]'),
+                               (month_starts + 1).astype('datetime64[D]'),
+                               busdaycal=self.busdaycal)
+
+    def per_week_of_month(self, year, month):
+        """Nombre de jours ouvrables de chaque semaine W-1, W-2... du mois"""
+        last_day_num = calendar.monthrange(year, month)[1]
+        week_starts = np.datetime64(f'{year}-{month:02d}-01', 'D') + np.arange(0, last_day_num, 7)
+        week_ends = np.minimum(week_starts + 7, week_starts[0] + last_day_num)
+        return np.busday_count(week_starts, week_ends, busdaycal=self.busdaycal)
+
+# Nombre de bits à 1 de chaque valeur d'octet
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype('int64')
+
+class WorkingDayBitmaps:
+    """Jours ouvrables d'une année pour toutes les zones : une ligne de bits par zone (1 = ouvrable).
+
+    La dernière ligne porte le calendrier par défaut, utilisé pour les zones inconnues.
+    """
+
+    def __init__(self, year, zones, calendars):
+        self.year = year
+        self.zones = pd.Index(zones)
+        self.first_day = np.datetime64(f'{year}-01-01', 'D')
+        self.n_days = int((np.datetime64(f'{year + 1}-01-01', 'D') - self.first_day).astype('int64'))
+        days = self.first_day + np.arange(self.n_days)
+        self.bits = np.packbits([working_calendar.is_working(days) for working_calendar in calendars], axis=1)
+
+    def rows(self, zones):
+        """Ligne de bits de chaque zone"""
+        # get_indexer rend -1 pour une zone inconnue, soit la ligne du calendrier par défaut
+        return self.zones.get_indexer(list(zones))
+
+    def is_working(self, zones, dates):
+        """Matrice zones x dates : jour ouvrable (dates de l'année)"""
+        positions = np.atleast_1d(to_days(dates) - self.first_day).astype('int64')
+        bytes_ = self.bits[self.rows(zones)][:, positions >> 3]
+        return ((bytes_ >> (7 - (positions & 7))) & 1).astype(bool)
+
+    def count(self, zones, start_dates, end_dates):
+        """Matrice zones x plages : jours ouvrables entre deux dates incluses, par popcount"""
+        start = np.atleast_1d(to_days(start_dates) - self.first_day).astype('int64')
+        end = np.atleast_1d(to_days(end_dates) - self.first_day).astype('int64') + 1
+        positions = np.arange(self.n_days)
+        masks = np.packbits((positions >= start[:, None]) & (positions < end[:, None]), axis=1)
+        return _POPCOUNT[self.bits[self.rows(zones)][:, None, :] & masks[None]].sum(axis=2)
+
+class HolidayCache:
+    """Jours fériés, calendriers et bitmaps ouvrables par zone et par année, chargés une fois par processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._custom = None
+        self._countries = None
+        self._holidays = {}
+        self._calendars = {}
+        self._bitmaps = {}
+
+    def _custom_by_zone(self):
+        # Une seule lecture de custom_holidays jusqu'à la prochaine invalidation (zone None : toutes les zones)
+        if self._custom is None:
+            custom = {}
+            rows = get_repository().get_custom_holidays()
+            for day, zone in zip(rows['date'], rows['zone']):
+                timestamp = pd.Timestamp(day)
+                zone = zone if isinstance(zone, str) else None
+                custom.setdefault(zone, {}).setdefault(timestamp.year, set()).add(timestamp)
+            self._custom = {zone: {year: frozenset(days) for year, days in by_year.items()}
+                            for zone, by_year in custom.items()}
+        return self._custom
+
+    def _zone_countries(self):
+        if self._countries is None:
+            with get_db_connection() as conn:
+                self._countries = dict(conn.execute(
+                    "SELECT name, country FROM zones WHERE kind = 'zone'").fetchall())
+        return self._countries
+
+    def country(self, zone):
+        """Pays dont la zone suit les jours fériés"""
+        with self._lock:
+            return self._zone_countries().get(zone) or DEFAULT_COUNTRY
+
+    def holidays(self, year, zone=None):
+        """Jours fériés publics (pays de la zone) et personnalisés (toutes zones et zone) d'une année"""
+        with self._lock:
+            if (year, zone) not in self._holidays:
+                custom = self._custom_by_zone()
+                country = self._zone_countries().get(zone) or DEFAULT_COUNTRY
+                self._holidays[year, zone] = (frozenset(get_public_holidays(year, country))
+                                              | custom.get(None, {}).get(year, frozenset())
+                                              | custom.get(zone, {}).get(year, frozenset()))
+            return self._holidays[year, zone]
+
+    def calendar(self, year, zone=None):
+        """Calendrier ouvrable d'une zone couvrant l'année et ses voisines"""
+        if (year, zone) not in self._calendars:
+            holidays = self.holidays(year - 1, zone) | self.holidays(year, zone) | self.holidays(year + 1, zone)
+            with self._lock:
+                self._calendars.setdefault((year, zone), WorkingDayCalendar(holidays))
+        return self._calendars[year, zone]
+
+    def bitmaps(self, year):
+        """Bitmaps ouvrables de l'année pour toutes les zones"""
+        if year not in self._bitmaps:
+            with self._lock:
+                zones = sorted(self._zone_countries())
+            calendars = [self.calendar(year, zone) for zone in zones] + [self.calendar(year)]
+            bitmaps = WorkingDayBitmaps(year, zones, calendars)
+            with self._lock:
+                self._bitmaps.setdefault(year, bitmaps)
+        return self._bitmaps[year]
+
+    def invalidate(self):
+        """Oublie les données chargées (après ajout d'un jour férié personnalisé ou d'une zone)"""
+        with self._lock:
+            self._custom = None
+            self._countries = None
+            self._holidays.clear()
+            self._calendars.clear()
+            self._bitmaps.clear()
+
+_holiday_cache = HolidayCache()
+# Dans ce processus, seuls add_custom_holiday, add_zone et les migrations invalident le cache ;
+# les écritures d'un autre processus (ou un changement de base) le rechargent aussi
+get_query_cache().add_listener(_holiday_cache.invalidate, external_only=True)
+
+def get_holiday_cache():
+    """Cache des jours fériés partagé par tout le processus"""
+    return _holiday_cache
+
+def get_working_day_calendar(year, zone=None):
+    """Calendrier ouvrable d'une zone couvrant l'année (et ses voisines) : fériés de son pays + personnalisés"""
+    return get_holiday_cache().calendar(year, zone)
+
+def get_working_day_calendar_between(first_year, last_year, zone=None):
+    """Calendrier ouvrable d'une zone couvrant plusieurs années : fériés de son pays + personnalisés"""
+    if last_year - first_year <= 2:
+        return get_working_day_calendar((first_year + last_year) // 2, zone)
+    cache = get_holiday_cache()
+    return WorkingDayCalendar(frozenset().union(*(cache.holidays(year, zone) for year in range(first_year, last_year + 1))))
+
+def get_working_day_bitmaps(year):
+    """Bitmaps ouvrables de l'année pour toutes les zones"""
+    return get_holiday_cache().bitmaps(year)
+
+def is_working_in_zones(zones, dates):
+    """Matrice zones x dates (bool) : jour ouvrable dans chaque zone"""
+    days = np.atleast_1d(to_days(dates))
+    years = days.astype('datetime64[Y]').astype('int64') + 1970
+    working = np.zeros((len(zones), len(days)), dtype=bool)
+    for year in np.unique(years):
+        in_year = years == year
+        working[:, in_year] = get_working_day_bitmaps(int(year)).is_working(zones, days[in_year])
+    return working
+
+def count_zone_working_days(zones, start_date, end_date):
+    """Jours ouvrables de chaque zone entre deux dates incluses (popcount des bitmaps annuels)"""
+    start, end = to_days(start_date), to_days(end_date)
+    counts = np.zeros(len(zones), dtype='int64')
+    for year in range(start.astype('datetime64[Y]').astype('int64') + 1970,
+                      end.astype('datetime64[Y]').astype('int64') + 1971):
+        bitmaps = get_working_day_bitmaps(year)
+        last_day = bitmaps.first_day + bitmaps.n_days - 1
+        counts += bitmaps.count(zones, max(start, bitmaps.first_day), min(end, last_day))[:, 0]
+    return counts
+
+def get_working_days_in_month(year, month, zone=None):
+    """Retourne la liste des jours ouvrables d'une zone dans un mois"""
+    working_days = get_working_day_calendar(year, zone).working_days_in_month(year, month)
+    return [datetime.combine(day.item(), datetime.min.time()) for day in working_days]
+
+def add_custom_holiday(date, description, zone=None):
+    """Ajoute un jour férié personnalisé, pour une zone ou pour toutes (zone None)"""
+    if not get_repository().add_custom_holiday(date.strftime('%Y-%m-%d'), description, zone):
+        return False
+    get_holiday_cache().invalidate()
+    notify_changes([(zone, date.year, date.month)])
+    return True
+
+@cached_query
+def get_custom_holidays_table():
+    """Liste des jours fériés personnalisés (date, description, zone), du plus récent au plus ancien"""
+    return get_repository().get_custom_holidays()
@@ -0,0 +1,134 @@
+"""Import en masse de ventes depuis des fichiers CSV ou XLSX"""
+import csv
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .cache import notify_changes
+from .db import get_db_writer
+from .repository import upsert_sales_rows
+from .storage import get_zones
+from .tracing import traced
+
+IMPORT_COLUMNS = ['zone', 'date', 'volume']
+IMPORT_CHUNK_SIZE = 5000
+
+def read_sales_chunks(source, filename, chunksize=IMPORT_CHUNK_SIZE):
+    """Lit un fichier CSV ou XLSX de ventes par blocs de `chunksize` lignes (texte brut)"""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        yield from read_excel_chunks(source, chunksize)
+    else:
+        # Séparateur détecté automatiquement (',' ou ';' selon l'export)
+        try:
+            yield from pd.read_csv(source, sep=None, engine='python', dtype=str,
+                                   chunksize=chunksize, skipinitialspace=True)
+        except (csv.Error, pd.errors.EmptyDataError) as e:
+            raise ValueError("Fichier vide ou format non reconnu") from e
+
+def read_excel_chunks(source, chunksize):
+    """Parcourt la première feuille d'un classeur en lecture seule, bloc par bloc"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("L'import Excel nécessite le paquet openpyxl") from e
+    
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, ())]
+        
+        def as_text(cell):
+            if cell is None:
+                return None
+            if isinstance(cell, datetime):
+                return cell.strftime('%Y-%m-%d')
+            return str(cell)
+        
+        chunk = []
+        for row in rows:
+            chunk.append([as_text(cell) for cell in row])
+            if len(chunk) == chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+def validate_sales_chunk(chunk, valid_zones, first_line, seen=None):
+    """Sépare un bloc en lignes valides (zone, date ISO, volume) et lignes rejetées
+    
+    `seen` reçoit les couples (zone, date ISO) déjà importés depuis le début du fichier :
+    une seconde ligne pour le même jour est rejetée plutôt que d'écraser la première.
+    """
+    if seen is None:
+        seen = set()
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in IMPORT_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    
+    chunk = chunk[IMPORT_COLUMNS].copy()
+    # Numéro de ligne dans le fichier (en-tête = ligne 1)
+    chunk.index = pd.RangeIndex(first_line, first_line + len(chunk), name='ligne')
+    
+    zones = chunk['zone'].str.strip()
+    raw_dates = chunk['date'].str.strip()
+    dates = pd.to_datetime(raw_dates, format='%Y-%m-%d', errors='coerce')
+    dates = dates.fillna(pd.to_datetime(raw_dates, format='%d/%m/%Y', errors='coerce'))
+    volumes = pd.to_numeric(chunk['volume'].str.strip().str.replace(',', '.'), errors='coerce')
+    
+    reasons = pd.Series(None, index=chunk.index, dtype=object)
+    reasons[(volumes < 0) | (volumes % 1 != 0)] = "volume invalide"
+    reasons[volumes.isna()] = "volume manquant ou non numérique"
+    reasons[dates.isna()] = "date invalide"
+    reasons[~zones.isin(valid_zones)] = "zone inconnue"
+    
+    # Doublons (même zone, même jour, quel que soit le format de date) après normalisation
+    candidates = reasons.isna()
+    keys = pd.Series(list(zip(zones[candidates], dates[candidates].dt.strftime('%Y-%m-%d'))),
+                     index=chunk.index[candidates], dtype=object)
+    duplicates = keys.duplicated() | keys.isin(seen)
+    reasons[duplicates[duplicates].index] = "doublon dans le fichier"
+    
+    rejected = chunk[reasons.notna()].assign(motif=reasons[reasons.notna()])
+    accepted = reasons.isna()
+    valid = pd.DataFrame({
+        'zone': zones[accepted],
+        'date': dates[accepted].dt.strftime('%Y-%m-%d'),
+        'volume': volumes[accepted].astype('int64'),
+    }).sort_values(['zone', 'date'])
+    seen.update(keys[~duplicates])
+    return valid, rejected
+
+@traced
+def import_sales_file(source, filename, chunksize=IMPORT_CHUNK_SIZE):
+    """Importe un fichier de ventes en une transaction ; retourne le bilan de l'import"""
+    start = time.perf_counter()
+    valid_zones = set(get_zones())
+    imported = 0
+    changes = set()
+    rejected_chunks = []
+    seen = set()
+    next_line = 2
+    
+    with get_db_writer() as conn:
+        for chunk in read_sales_chunks(source, filename, chunksize):
+            valid, rejected = validate_sales_chunk(chunk, valid_zones, next_line, seen)
+            next_line += len(chunk)
+            upsert_sales_rows(conn, valid.itertuples(index=False, name=None))
+            imported += len(valid)
+            changes.update(zip(valid['zone'], valid['date'].str[:4].astype(int), valid['date'].str[5:7].astype(int)))
+            if not rejected.empty:
+                rejected_chunks.append(rejected)
+    
+    elapsed = time.perf_counter() - start
+    notify_changes(changes)
+    rejected = pd.concat(rejected_chunks) if rejected_chunks else pd.DataFrame(columns=IMPORT_COLUMNS + ['motif'])
+    return {
+        'imported': imported,
+        'rejected': rejected,
+        'seconds': elapsed,
+        'rows_per_second': (imported + len(rejected)) / elapsed if elapsed > 0 else 0,
+    }
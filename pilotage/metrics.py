@@ -0,0 +1,214 @@
+"""Indicateurs commerciaux : YTD, performance hebdomadaire, run-rate et consolidation"""
+import calendar
+from datetime import datetime
+
+import pandas as pd
+
+from .cache import cached_query
+from .db import get_db_connection, get_month_bounds, get_year_bounds
+from .holidays import get_working_day_calendar
+from .periods import get_period_performance
+from .storage import get_monthly_target, get_sales_data, get_ytd_init
+from .tracing import traced
+
+@traced
+@cached_query
+def calculate_ytd(zone, current_date):
+    """Calcule le YTD CORRECT : Janvier manuel + toutes les ventes depuis février"""
+    year = current_date.year
+    year_start, _ = get_year_bounds(year)
+    
+    # YTD = Janvier manuel + Cumul depuis février, lu sur la dernière ligne cumulée
+    # (à défaut de vente saisie cette année : janvier manuel seul)
+    with get_db_connection() as conn:
+        result = conn.execute('''
+            SELECT COALESCE(
+                (SELECT ytd FROM sales_cumulative
+                 WHERE zone = ? AND date >= ? AND date <= ?
+                 ORDER BY date DESC LIMIT 1),
+                (SELECT january_volume FROM ytd_init WHERE zone = ? AND year = ?),
+                0
+            )
+        ''', (zone, year_start, current_date.strftime('%Y-%m-%d'), zone, year)).fetchone()
+    
+    return result[0]
+
+@traced
+def calculate_weekly_data(zone, year, month):
+    """Calcule les données par semaine EN JOURS OUVRABLES (toutes les semaines du mois, même sans vente)"""
+    month_end = datetime(year, month, calendar.monthrange(year, month)[1])
+    weekly = get_period_performance([zone], datetime(year, month, 1), month_end, 'week_of_month')
+    
+    targets = weekly['target'].astype(int)
+    return pd.DataFrame({
+        'Semaine': weekly['period'],
+        'Réalisé': weekly['realized'],
+        'Target': targets,
+        'Delta': weekly['realized'] - targets,
+    })
+
+@traced
+def calculate_run_rate(zone, year, month, current_date):
+    """Calcule le run-rate dynamique EN JOURS OUVRABLES"""
+    monthly_target = get_monthly_target(zone, year, month)
+    if monthly_target == 0:
+        return 0
+    
+    sales_df = get_sales_data(zone, year, month)
+    realized = sales_df['volume'].sum() if not sales_df.empty else 0
+    
+    last_day_num = calendar.monthrange(year, month)[1]
+    last_date = datetime(year, month, last_day_num)
+    
+    working_days_remaining = get_working_day_calendar(year, zone).count(current_date, last_date)
+    
+    if working_days_remaining <= 0:
+        return 0
+    
+    remaining_volume = monthly_target - realized
+    run_rate = remaining_volume / working_days_remaining
+    
+    return max(0, run_rate)
+
+@traced
+@cached_query
+def get_zone_rollups(year, month, current_date):
+    """Target, réalisé du mois et YTD de chaque nœud de l'arborescence des zones, en une requête.
+
+    Chaque zone est lue une fois (recherches indexées dans les cumuls), puis additionnée
+    à tous ses ancêtres tant que le chemin est consolidé.
+    """
+    month_start, month_end = get_month_bounds(year, month)
+    year_start, _ = get_year_bounds(year)
+
+    with get_db_connection() as conn:
+        rollups = pd.read_sql_query('''
+            WITH RECURSIVE leaves AS (
+                SELECT z.id,
+                       COALESCE((SELECT target FROM monthly_targets
+                                 WHERE zone = z.name AND year = :year AND month = :month), 0) as target,
+                       COALESCE((SELECT mtd FROM sales_cumulative
+                                 WHERE zone = z.name AND date >= :month_start AND date < :month_end
+                                 ORDER BY date DESC LIMIT 1), 0) as realized,
+                       COALESCE((SELECT january_volume FROM ytd_init
+                                 WHERE zone = z.name AND year = :year), 0) as january_manual,
+                       COALESCE((SELECT ytd FROM sales_cumulative
+                                 WHERE zone = z.name AND date >= :year_start AND date <= :current_date
+                                 ORDER BY date DESC LIMIT 1),
+                                (SELECT january_volume FROM ytd_init
+                                 WHERE zone = z.name AND year = :year), 0) as ytd
+                FROM zones z
+                WHERE z.kind = 'zone'
+            ),
+            ancestors(node_id, leaf_id) AS (
+                SELECT id, id FROM leaves
+                UNION ALL
+                SELECT z.parent_id, a.leaf_id
+                FROM ancestors a
+                JOIN zones z ON z.id = a.node_id
+                WHERE z.parent_id IS NOT NULL AND z.consolidated = 1
+            ),
+            totals AS (
+                SELECT a.node_id as id,
+                       SUM(l.target) as target,
+                       SUM(l.realized) as realized,
+                       SUM(l.january_manual) as january_manual,
+                       SUM(l.ytd) as ytd
+                FROM ancestors a
+                JOIN leaves l ON l.id = a.leaf_id
+                GROUP BY a.node_id
+            ),
+            tree AS (
+                SELECT id, 0 as depth, printf('%06d', position) as sort_key
+                FROM zones WHERE parent_id IS NULL
+                UNION ALL
+                SELECT z.id, t.depth + 1, t.sort_key || '.' || printf('%06d', z.position)
+                FROM zones z
+                JOIN tree t ON z.parent_id = t.id
+            )
+            -- Les regroupements sans zone consolidée restent affichés à 0
+            SELECT z.id, z.name, z.parent_id, z.kind, z.consolidated, t.depth,
+                   COALESCE(n.target, 0) as target,
+                   COALESCE(n.realized, 0) as realized,
+                   COALESCE(n.january_manual, 0) as january_manual,
+                   COALESCE(n.ytd, 0) as ytd
+            FROM tree t
+            JOIN zones z ON z.id = t.id
+            LEFT JOIN totals n ON n.id = t.id
+            ORDER BY t.sort_key
+        ''', conn, params={
+            'year': year,
+            'month': month,
+            'month_start': month_start,
+            'month_end': month_end,
+            'year_start': year_start,
+            'current_date': current_date.strftime('%Y-%m-%d'),
+        })
+
+    rollups['delta'] = rollups['realized'] - rollups['target']
+
+    return rollups
+
+@cached_query
+def get_zones_overview(year, month, current_date, zones=None):
+    """Target, réalisé du mois et YTD par zone (index : zone)"""
+    leaves = get_zone_rollups(year, month, current_date)
+    overview = leaves[leaves['kind'] == 'zone'].set_index('name')
+    overview.index.name = 'zone'
+    if zones is not None:
+        overview = overview.reindex(list(zones), fill_value=0)
+
+    return overview[['target', 'realized', 'delta', 'january_manual', 'ytd']]
+
+@traced
+@cached_query
+def get_group_consolidation(year, month, current_date):
+    """Calcule la consolidation groupe (zones consolidées jusqu'à la racine de l'arborescence)"""
+    rollups = get_zone_rollups(year, month, current_date)
+    group = rollups[rollups['kind'] == 'group'].iloc[0]
+
+    return {
+        'target': int(group['target']),
+        'realized': int(group['realized']),
+        'ytd': int(group['ytd']),
+        'delta': int(group['realized'] - group['target'])
+    }
+
+@traced
+def compute_zone_dashboard(zone, current_date):
+    """Indicateurs du détail par zone de l'onglet Dashboard (mois en cours)"""
+    year, month = current_date.year, current_date.month
+    working_calendar = get_working_day_calendar(year, zone)
+    
+    monthly_target = get_monthly_target(zone, year, month)
+    sales_df = get_sales_data(zone, year, month)
+    monthly_realized = int(sales_df['volume'].sum()) if not sales_df.empty else 0
+    
+    working_days_total = len(working_calendar.working_days_in_month(year, month))
+    last_date = datetime(year, month, calendar.monthrange(year, month)[1])
+    working_days_left = int(working_calendar.count(current_date, last_date))
+    
+    return {
+        'is_working_day': bool(working_calendar.is_working(current_date)),
+        'monthly_target': monthly_target,
+        'monthly_realized': monthly_realized,
+        'monthly_delta': monthly_realized - monthly_target,
+        'ytd': calculate_ytd(zone, current_date),
+        'january_manual': get_ytd_init(zone, year),
+        'run_rate': calculate_run_rate(zone, year, month, current_date),
+        'working_days_total': working_days_total,
+        'working_days_left': working_days_left,
+        'working_days_passed': working_days_total - working_days_left,
+        'weekly': calculate_weekly_data(zone, year, month),
+    }
+
+@traced
+def compute_dashboard(zone, current_date):
+    """Calcule tout l'onglet Dashboard sans affichage (consolidation, zone, vue d'ensemble)"""
+    year, month = current_date.year, current_date.month
+    return {
+        'group': get_group_consolidation(year, month, current_date),
+        'zone': compute_zone_dashboard(zone, current_date),
+        'overview': get_zones_overview(year, month, current_date),
+        'rollups': get_zone_rollups(year, month, current_date),
+    }
@@ -0,0 +1,395 @@
+"""Migrations versionnées du schéma SQLite (python -m pilotage migrate).
+
+Chaque étape est numérotée, idempotente et appliquée dans sa propre transaction avec
+sa ligne de schema_version : une base créée avant le suivi des versions repasse
+toutes les étapes sans rien perdre. L'application ne les lance qu'une fois par
+processus (ensure_schema), pas à chaque rerun.
+"""
+import os
+import re
+import threading
+
+from .db import (
+    CUMULATIVE_TRIGGERS, DB_CONFIG, DEFAULT_ZONE_TREE, SALES_VIEW_SQL, SALES_VIEW_TRIGGERS, day_number_sql,
+    get_db_connection, get_db_writer, rebuild_cumulative_rows,
+)
+from .holidays import get_holiday_cache
+
+MIGRATIONS = []
+
+# Lignes recopiées par transaction lors d'une création d'index en ligne
+ONLINE_INDEX_BATCH_ROWS = int(os.environ.get('PILOTAGE_ONLINE_INDEX_BATCH_ROWS', 50000))
+
+def migration(version, name, online=False):
+    """Ajoute `func(cursor)` aux migrations (ordre des versions).
+
+    La fonction retourne True si des pages ont été libérées (VACUUM en fin de migration).
+    Une étape `online` reçoit None et gère elle-même ses transactions courtes.
+    """
+    def register(func):
+        MIGRATIONS.append((version, name, online, func))
+        MIGRATIONS.sort(key=lambda step: step[0])
+        return func
+    return register
+
+def _table_exists(cursor, name, kind='table'):
+    return cursor.execute('SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?', (kind, name)).fetchone() is not None
+
+def _columns(cursor, table):
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+
+def _add_unknown_zones(cursor, names_sql):
+    """Ajoute hors arborescence (non consolidées) les zones de ventes absentes de la table zones"""
+    cursor.execute(f'''
+        INSERT INTO zones (name, kind, consolidated, position)
+        SELECT name, 'zone', 0,
+               (SELECT COALESCE(MAX(position), -1) FROM zones WHERE parent_id IS NULL)
+               + ROW_NUMBER() OVER (ORDER BY name)
+        FROM ({names_sql})
+        WHERE name NOT IN (SELECT name FROM zones)
+    ''')
+
+def _create_sales_view(cursor):
+    cursor.execute(SALES_VIEW_SQL)
+    for name, body in SALES_VIEW_TRIGGERS.items():
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+# ==================== ÉTAPES ====================
+
+@migration(1, "Objectifs mensuels et janviers manuels")
+def base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_targets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zone TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            target INTEGER NOT NULL,
+            UNIQUE(zone, year, month)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ytd_init (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zone TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            january_volume INTEGER NOT NULL,
+            UNIQUE(zone, year)
+        )
+    ''')
+
+@migration(2, "Arborescence des zones et pays des calendriers")
+def zone_tree(cursor):
+    zones_exist = _table_exists(cursor, 'zones')
+
+    # Arborescence groupe → filiales / concessions → zones
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS zones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            parent_id INTEGER REFERENCES zones(id),
+            kind TEXT NOT NULL,
+            consolidated INTEGER NOT NULL DEFAULT 1,
+            position INTEGER NOT NULL DEFAULT 0,
+            country TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_zones_parent
+        ON zones (parent_id, position)
+    ''')
+
+    if not zones_exist:
+        for position, (name, parent, kind, consolidated, country) in enumerate(DEFAULT_ZONE_TREE):
+            cursor.execute('''
+                INSERT INTO zones (name, parent_id, kind, consolidated, position, country)
+                VALUES (?, (SELECT id FROM zones WHERE name = ?), ?, ?, ?, ?)
+            ''', (name, parent, kind, int(consolidated), position, country))
+
+@migration(3, "Jours fériés personnalisés par zone")
+def zone_holidays(cursor):
+    # Bases antérieures aux jours fériés par zone : UNIQUE(date) remplacé par (date, zone)
+    holiday_columns = _columns(cursor, 'custom_holidays')
+    global_holidays_only = bool(holiday_columns) and 'zone' not in holiday_columns
+    if global_holidays_only:
+        cursor.execute('ALTER TABLE custom_holidays RENAME TO custom_holidays_global')
+
+    # zone NULL : jour férié de toutes les zones
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS custom_holidays (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            description TEXT,
+            zone TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_custom_holidays_date_zone
+        ON custom_holidays (date, COALESCE(zone, ''))
+    ''')
+
+    if global_holidays_only:
+        cursor.execute('''
+            INSERT INTO custom_holidays (id, date, description)
+            SELECT id, date, description FROM custom_holidays_global
+        ''')
+        cursor.execute('DROP TABLE custom_holidays_global')
+
+@migration(4, "Ventes encodées (identifiants de zone, numéros de jour) et vue sales")
+def encoded_sales(cursor):
+    # Bases antérieures aux ventes encodées : l'ancienne table texte est recopiée puis supprimée
+    text_sales = _table_exists(cursor, 'sales')
+    if text_sales:
+        cursor.execute('ALTER TABLE sales RENAME TO sales_text')
+
+    # Ventes encodées : zone -> zones.id, date -> jours depuis le 1970-01-01
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_facts (
+            zone_id INTEGER NOT NULL REFERENCES zones(id),
+            day INTEGER NOT NULL,
+            volume INTEGER NOT NULL,
+            PRIMARY KEY (zone_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+    if text_sales:
+        _add_unknown_zones(cursor, 'SELECT DISTINCT zone as name FROM sales_text')
+        cursor.execute(f'''
+            INSERT INTO sales_facts (zone_id, day, volume)
+            SELECT z.id, {day_number_sql('s.date')}, s.volume
+            FROM sales_text s
+            JOIN zones z ON z.name = s.zone
+        ''')
+        cursor.execute('DROP TABLE sales_text')
+
+    _create_sales_view(cursor)
+
+    # Les pages libérées par l'ancienne table texte sont rendues au système
+    return text_sales
+
+@migration(5, "Cumuls YTD / MTD matérialisés")
+def sales_cumulative(cursor):
+    cumulative_exists = _table_exists(cursor, 'sales_cumulative')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_cumulative (
+            zone TEXT NOT NULL,
+            date TEXT NOT NULL,
+            ytd INTEGER NOT NULL,
+            mtd INTEGER NOT NULL,
+            PRIMARY KEY (zone, date)
+        ) WITHOUT ROWID
+    ''')
+
+    for name, body in CUMULATIVE_TRIGGERS.items():
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+    # Première création : on amorce les cumuls à partir de l'historique existant
+    if not cumulative_exists:
+        rebuild_cumulative_rows(cursor)
+
+@migration(6, "Index couvrant des ventes par jour (construit en ligne)", online=True)
+def sales_facts_day_index(cursor):
+    build_index_online('idx_sales_facts_day', 'sales_facts', ['day', 'zone_id', 'volume'])
+
+@migration(7, "État des alertes de run-rate")
+def alert_state(cursor):
+    # Dernier niveau notifié par zone et mois : une alerte ne part qu'au franchissement d'un seuil
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alert_state (
+            zone TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            level TEXT NOT NULL,
+            run_rate REAL NOT NULL,
+            average REAL NOT NULL,
+            changed_at TEXT NOT NULL,
+            PRIMARY KEY (zone, year, month)
+        ) WITHOUT ROWID
+    ''')
+
+# ==================== INDEX EN LIGNE ====================
+
+def _key_condition(key, op, count):
+    return f"({', '.join(key)}) {op} ({', '.join('?' * count)})"
+
+def build_index_online(index, table, columns, batch_rows=None):
+    """Crée `index` sur `table` sans garder le verrou d'écriture pendant toute la construction.
+
+    Copie fantôme : une table identique portant déjà l'index est remplie par lots de
+    clés primaires (une courte transaction par lot, les autres écritures passent entre
+    deux lots), des triggers y reportent les écritures faites entre-temps, puis les
+    deux tables sont échangées en une transaction. Retourne le nombre de lots copiés
+    (0 si l'index existait ou a été créé directement sur une petite table).
+    """
+    batch_rows = batch_rows or ONLINE_INDEX_BATCH_ROWS
+    shadow = f'{table}_online'
+    mirror_triggers = [f'trg_{shadow}_{event}' for event in ('insert', 'update', 'delete')]
+
+    with get_db_writer() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        if _table_exists(conn, index, kind='index'):
+            return 0
+        # Copie interrompue (arrêt du processus) : on repart de zéro
+        for trigger in mirror_triggers:
+            conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        conn.execute(f'DROP TABLE IF EXISTS {shadow}')
+
+        info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+        names = [row[1] for row in info]
+        key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5] > 0]
+        if not key:
+            raise ValueError(f"{table} : clé primaire requise pour une création d'index en ligne")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                        (table,)).fetchone() is not None:
+            raise ValueError(f"{table} : d'autres index secondaires seraient perdus à l'échange")
+
+        # Petite table : construction directe, le verrou n'est tenu qu'un instant
+        if conn.execute(f'SELECT 1 FROM {table} LIMIT 1 OFFSET ?', (batch_rows,)).fetchone() is None:
+            conn.execute(f"CREATE INDEX {index} ON {table} ({', '.join(columns)})")
+            return 0
+
+        create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        conn.execute(re.sub(rf'^CREATE TABLE "?{table}"?', f'CREATE TABLE {shadow}', create_sql))
+        conn.execute(f"CREATE INDEX {index} ON {shadow} ({', '.join(columns)})")
+
+        column_list = ', '.join(names)
+        new_values = ', '.join(f'NEW.{name}' for name in names)
+        old_key = ' AND '.join(f'{name} = OLD.{name}' for name in key)
+        conn.execute(f'''
+            CREATE TRIGGER {mirror_triggers[0]} AFTER INSERT ON {table} BEGIN
+                INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER {mirror_triggers[1]} AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {old_key};
+                INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER {mirror_triggers[2]} AFTER DELETE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {old_key};
+            END
+        ''')
+
+    # Recopie par plages de clés ]dernière, borne] : chaque lot relit l'état courant de la table
+    key_list = ', '.join(key)
+    last, batches = None, 0
+    while True:
+        with get_db_writer() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            after = f'WHERE {_key_condition(key, ">", len(key))}' if last else ''
+            bound = conn.execute(f'SELECT {key_list} FROM {table} {after} ORDER BY {key_list} LIMIT 1 OFFSET ?',
+                                 (*(last or ()), batch_rows - 1)).fetchone()
+            conditions = ([_key_condition(key, '>', len(key))] if last else []) + (
+                [_key_condition(key, '<=', len(key))] if bound else [])
+            conn.execute(f'''
+                INSERT OR IGNORE INTO {shadow} ({column_list})
+                SELECT {column_list} FROM {table}
+                {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ''', (*(last or ()), *(bound or ())))
+            batches += 1
+        if bound is None:
+            break
+        last = tuple(bound)
+
+    # Échange : les triggers de la table d'origine sont recréés sur la copie renommée.
+    # Renommage « legacy » : les vues qui lisent la table la retrouvent par son nom.
+    with get_db_writer() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        for trigger in mirror_triggers:
+            conn.execute(f'DROP TRIGGER {trigger}')
+        triggers = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))]
+        conn.execute('PRAGMA legacy_alter_table = ON')
+        try:
+            conn.execute(f'DROP TABLE {table}')
+            conn.execute(f'ALTER TABLE {shadow} RENAME TO {table}')
+        finally:
+            conn.execute('PRAGMA legacy_alter_table = OFF')
+        for sql in triggers:
+            conn.execute(sql)
+    return batches
+
+# ==================== EXÉCUTION ====================
+
+def get_schema_version(conn):
+    """Dernière version appliquée (0 pour une base vide ou antérieure au suivi des versions)"""
+    if not _table_exists(conn, 'schema_version'):
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def get_migration_status():
+    """Étapes connues avec leur date d'application (None si en attente)"""
+    with get_db_connection() as conn:
+        applied = dict(conn.execute('SELECT version, applied_at FROM schema_version').fetchall()) \
+            if _table_exists(conn, 'schema_version') else {}
+    return [(version, name, applied.get(version)) for version, name, _, _ in MIGRATIONS]
+
+def _record(conn, version, name):
+    conn.execute('''
+        INSERT INTO schema_version (version, name, applied_at)
+        VALUES (?, ?, datetime('now'))
+    ''', (version, name))
+
+def migrate():
+    """Applique les migrations en attente, dans l'ordre ; retourne [(version, nom)] appliquées.
+
+    Chaque étape est revérifiée sous verrou d'écriture : deux processus lancés en même
+    temps n'appliquent pas deux fois la même version.
+    """
+    with get_db_connection() as conn:
+        current = get_schema_version(conn)
+    pending = [step for step in MIGRATIONS if step[0] > current]
+    if not pending:
+        return []
+
+    with get_db_writer() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        ''')
+
+    applied, vacuum = [], False
+    for version, name, online, func in pending:
+        if online:
+            func(None)
+            with get_db_writer() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                if get_schema_version(conn) < version:
+                    _record(conn, version, name)
+                    applied.append((version, name))
+            continue
+        with get_db_writer() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if get_schema_version(conn) >= version:
+                continue
+            vacuum = bool(func(conn.cursor())) or vacuum
+            _record(conn, version, name)
+            applied.append((version, name))
+
+    if vacuum:
+        with get_db_writer() as conn:
+            conn.execute('VACUUM')
+    # Zones et pays des calendriers ont pu changer
+    get_holiday_cache().invalidate()
+    return applied
+
+_migrated_paths = set()
+_migrated_lock = threading.Lock()
+
+def ensure_schema():
+    """Applique les migrations une fois par processus et par base (appel à chaque rerun sans coût)"""
+    path = os.path.abspath(DB_CONFIG['path'])
+    if path not in _migrated_paths:
+        with _migrated_lock:
+            if path not in _migrated_paths:
+                migrate()
+                _migrated_paths.add(path)
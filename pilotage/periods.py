@@ -0,0 +1,119 @@
+"""Découpage vectorisé en périodes (semaine du mois W-n, semaine ISO, mois, trimestre).
+
+Chaque jour d'un tableau datetime64[D] est associé au premier jour de sa période :
+ce début de période sert de clé de regroupement pour les bincount.
+"""
+import numpy as np
+import pandas as pd
+
+from .archive import get_archived_daily
+from .cache import cached_query
+from .holidays import is_working_in_zones
+from .repository import get_repository
+from .storage import get_all_targets
+from .tracing import traced
+
+PERIODS = ('week_of_month', 'iso_week', 'month', 'quarter')
+
+def _weekday(days):
+    # 1970-01-01 est un jeudi : lundi = 0
+    return (days.astype('int64') + 3) % 7
+
+def bucket_starts(days, period):
+    """Premier jour de la période de chaque date (datetime64[D])"""
+    days = np.asarray(days, dtype='datetime64[D]')
+    month_starts = days.astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'week_of_month':
+        return month_starts + (days - month_starts) // 7 * 7
+    if period == 'iso_week':
+        return days - _weekday(days)
+    if period == 'month':
+        return month_starts
+    if period == 'quarter':
+        months = days.astype('datetime64[M]')
+        return (months - months.astype('int64') % 3).astype('datetime64[D]')
+    raise ValueError(f"Période inconnue : {period} (choix : {', '.join(PERIODS)})")
+
+def bucket_ends(starts, period):
+    """Lendemain du dernier jour de chaque période (borne exclue)"""
+    starts = np.asarray(starts, dtype='datetime64[D]')
+    if period == 'week_of_month':
+        next_month = (starts.astype('datetime64[M]') + 1).astype('datetime64[D]')
+        return np.minimum(starts + 7, next_month)
+    if period == 'iso_week':
+        return starts + 7
+    months = 1 if period == 'month' else 3
+    return (starts.astype('datetime64[M]') + months).astype('datetime64[D]')
+
+def bucket_labels(starts, period):
+    """Libellés des périodes : W-2, 2026-W41, 2026-10, 2026-T4"""
+    starts = pd.DatetimeIndex(np.asarray(starts, dtype='datetime64[D]'))
+    if period == 'week_of_month':
+        return ('W-' + ((starts.day - 1) // 7 + 1).astype(str)).tolist()
+    if period == 'iso_week':
+        iso = starts.isocalendar()
+        return [f'{year}-W{week:02d}' for year, week in zip(iso['year'], iso['week'])]
+    if period == 'month':
+        return starts.strftime('%Y-%m').tolist()
+    return [f'{year}-T{quarter}' for year, quarter in zip(starts.year, starts.quarter)]
+
+@traced
+@cached_query
+def get_period_performance(zones, start_date, end_date, period):
+    """Réalisé, target et delta de chaque période × zone entre deux dates incluses, en un appel.
+
+    Le target d'une période est la part de l'objectif mensuel correspondant à ses jours
+    ouvrés (calendrier de la zone, pas jours saisis) : une période sans vente a quand même un target.
+    """
+    zones = list(zones)
+    days = np.arange(np.datetime64(start_date.date(), 'D'), np.datetime64(end_date.date(), 'D') + 1)
+    starts = bucket_starts(days, period)
+    bucket_keys, day_bucket = np.unique(starts, return_inverse=True)
+    n_zones, n_buckets = len(zones), len(bucket_keys)
+
+    # Jours ouvrés de chaque zone sur les mois entiers touchés, puis sur chaque période (bornée à la plage)
+    months = days.astype('datetime64[M]')
+    month_keys, day_month = np.unique(months, return_inverse=True)
+    month_days = np.arange(month_keys[0].astype('datetime64[D]'), (month_keys[-1] + 1).astype('datetime64[D]'))
+    month_working = is_working_in_zones(zones, month_days).astype('int64')
+    month_working_days = np.add.reduceat(month_working, (month_keys.astype('datetime64[D]') - month_days[0]).astype('int64'),
+                                         axis=1)
+    offset = int((days[0] - month_days[0]).astype('int64'))
+    working = month_working[:, offset:offset + len(days)]
+    flat_days = (np.arange(n_zones)[:, None] * n_buckets + day_bucket).ravel()
+    bucket_working_days = np.bincount(flat_days, weights=working.ravel(), minlength=n_zones * n_buckets).astype('int64')
+
+    # Target journalier : objectif du mois / jours ouvrés du mois, sur chaque jour ouvré
+    targets = get_all_targets()
+    targets = targets[targets['zone'].isin(zones)]
+    target_months = ((targets['year'].to_numpy(dtype='int64') - 1970) * 12
+                     + targets['month'].to_numpy(dtype='int64') - 1).astype('datetime64[M]')
+    month_pos = np.searchsorted(month_keys, target_months)
+    known = (month_pos < len(month_keys)) & (month_keys[np.minimum(month_pos, len(month_keys) - 1)] == target_months)
+    month_targets = np.zeros((n_zones, len(month_keys)))
+    month_targets[pd.Index(zones).get_indexer(targets['zone'][known]), month_pos[known]] = targets['target'][known]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_target = np.where(month_working_days > 0, month_targets / month_working_days, 0.0)[:, day_month] * working
+    bucket_target = np.bincount(flat_days, weights=daily_target.ravel(), minlength=n_zones * n_buckets)
+
+    # Réalisé : ventes en base et archivées, rangées par période en un bincount
+    end = (days[-1] + 1).item()
+    sales = pd.concat([get_repository().get_sales(zones, str(days[0]), str(end)),
+                       get_archived_daily(zones, start_date, pd.Timestamp(end))], ignore_index=True)
+    sale_days = sales['date'].to_numpy().astype('datetime64[D]')
+    sale_bucket = np.searchsorted(bucket_keys, bucket_starts(sale_days, period))
+    flat_sales = pd.Index(zones).get_indexer(sales['zone']) * n_buckets + sale_bucket
+    bucket_realized = np.bincount(flat_sales, weights=sales['volume'].to_numpy(dtype='float64'),
+                                  minlength=n_zones * n_buckets)
+
+    result = pd.DataFrame({
+        'zone': np.repeat(zones, n_buckets),
+        'period': np.tile(bucket_labels(bucket_keys, period), n_zones),
+        'start': np.tile(np.maximum(bucket_keys, days[0]), n_zones),
+        'end': np.tile(np.minimum(bucket_ends(bucket_keys, period), days[-1] + 1) - 1, n_zones),
+        'working_days': bucket_working_days,
+        'realized': bucket_realized.astype('int64'),
+        'target': bucket_target,
+    })
+    result['delta'] = result['realized'] - result['target']
+    return result
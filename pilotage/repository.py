@@ -0,0 +1,339 @@
+"""Accès aux ventes, objectifs et jours fériés derrière une interface commune (SalesRepository).
+
+Le moteur est choisi par DB_CONFIG['backend'] (variable PILOTAGE_BACKEND) parmi BACKENDS
+et ne sert que les opérations de cette interface. Les autres lectures (YTD, consolidation,
+prévisions, simulation, arborescence des zones, archive) interrogent SQLite directement.
+Tout moteur de BACKENDS passe la suite de conformité de tests/test_repository.py.
+"""
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from .db import DB_CONFIG, get_connection_manager, get_zone_ids, read_sales_frame, to_day_numbers
+
+class SalesRepository(ABC):
+    """Opérations sur les ventes, objectifs, janviers manuels et jours fériés personnalisés.
+
+    Les dates passées sont des chaînes ISO (AAAA-MM-JJ) ; les plages [start, end[ sont semi-ouvertes.
+    Les ventes lues ont une colonne date en datetime64.
+    """
+
+    # ---- Ventes ----
+
+    @abstractmethod
+    def save_sales(self, rows, deletions=()):
+        """Upsert des ventes (zone, date, volume) et suppression des clés (zone, date), en une transaction"""
+
+    @abstractmethod
+    def get_sales(self, zones, start, end):
+        """Ventes (zone, date, volume) des zones sur [start, end[, triées par zone et date"""
+
+    @abstractmethod
+    def get_recent_sales(self, limit):
+        """Dernières ventes (zone, date, volume), de la plus récente à la plus ancienne"""
+
+    # ---- Objectifs mensuels ----
+
+    @abstractmethod
+    def save_monthly_target(self, zone, year, month, target):
+        """Enregistre ou remplace l'objectif d'un mois"""
+
+    @abstractmethod
+    def get_monthly_target(self, zone, year, month):
+        """Objectif d'un mois (0 si absent)"""
+
+    @abstractmethod
+    def get_targets(self):
+        """Tous les objectifs (zone, year, month, target), du plus récent au plus ancien"""
+
+    # ---- Janvier manuel (initialisation YTD) ----
+
+    @abstractmethod
+    def save_ytd_init(self, zone, year, january_volume):
+        """Enregistre ou remplace le volume de janvier saisi manuellement"""
+
+    @abstractmethod
+    def get_ytd_init(self, zone, year):
+        """Volume de janvier saisi manuellement (0 si absent)"""
+
+    # ---- Jours fériés personnalisés ----
+
+    @abstractmethod
+    def add_custom_holiday(self, day, description, zone=None):
+        """Ajoute un jour férié personnalisé (zone None : toutes les zones) ; False s'il existe déjà"""
+
+    @abstractmethod
+    def get_custom_holidays(self):
+        """Jours fériés personnalisés (date, description, zone), du plus récent au plus ancien"""
+
+    # ---- Analytique ----
+
+    @abstractmethod
+    def daily_trend(self, zones, warmup_start, start, end, holidays, archived):
+        """Volume par jour ouvré de [warmup_start, end] et moyennes glissantes 7/20 jours ouvrés, à partir de start.
+
+        `archived` : ventes archivées (zone, date, volume) additionnées aux ventes en base.
+        """
+
+    @abstractmethod
+    def monthly_trend(self, zones, start_year, end_year, archived):
+        """Volume mensuel par zone avec MoM et YoY ; `archived` : agrégats (zone, year, month, volume)"""
+
+def upsert_sales_rows(conn, rows):
+    """Upsert groupé de ventes (zone, date ISO, volume), mêmes règles que save_sale"""
+    rows = list(rows)
+    if not rows:
+        return
+    zones, dates, volumes = zip(*rows)
+    zone_ids = get_zone_ids(conn, zones)
+    unknown = sorted(set(zones) - set(zone_ids))
+    if unknown:
+        raise ValueError(f"Zone inconnue : {', '.join(unknown)}")
+    conn.executemany('''
+        INSERT INTO sales_facts (zone_id, day, volume)
+        VALUES (?, ?, ?)
+        ON CONFLICT(zone_id, day) DO UPDATE SET volume=excluded.volume
+        WHERE volume <> excluded.volume
+    ''', zip([zone_ids[zone] for zone in zones], to_day_numbers(dates).tolist(), [int(volume) for volume in volumes]))
+
+def delete_sales_rows(conn, keys):
+    """Suppression groupée de ventes par clé (zone, date ISO) ; les clés absentes sont ignorées"""
+    keys = list(keys)
+    if not keys:
+        return
+    zones, dates = zip(*keys)
+    zone_ids = get_zone_ids(conn, zones)
+    conn.executemany('DELETE FROM sales_facts WHERE zone_id = ? AND day = ?',
+                     [(zone_ids[zone], day) for zone, day in zip(zones, to_day_numbers(dates).tolist())
+                      if zone in zone_ids])
+
+class SQLiteRepository(SalesRepository):
+    """Moteur de référence : tout est lu et écrit dans la base SQLite"""
+
+    def __init__(self, manager=None):
+        self._manager = manager
+
+    @property
+    def manager(self):
+        # Résolu à chaque appel : configure_database() remplace le pool partagé
+        return self._manager or get_connection_manager()
+
+    def save_sales(self, rows, deletions=()):
+        with self.manager.writer() as conn:
+            upsert_sales_rows(conn, rows)
+            delete_sales_rows(conn, deletions)
+
+    def get_sales(self, zones, start, end):
+        with self.manager.reader() as conn:
+            return read_sales_frame(conn, '''
+                SELECT f.zone_id, f.day, f.volume
+                FROM zones z
+                JOIN sales_facts f ON f.zone_id = z.id
+                WHERE z.name IN (SELECT value FROM json_each(?))
+                AND f.day >= ? AND f.day < ?
+                ORDER BY z.name, f.day
+            ''', (json.dumps(list(zones)), int(to_day_numbers(start)), int(to_day_numbers(end))))
+
+    def get_recent_sales(self, limit):
+        with self.manager.reader() as conn:
+            return read_sales_frame(conn, '''
+                SELECT f.zone_id, f.day, f.volume
+                FROM sales_facts f
+                JOIN zones z ON z.id = f.zone_id
+                ORDER BY f.day DESC, z.name
+                LIMIT ?
+            ''', (limit,))
+
+    def save_monthly_target(self, zone, year, month, target):
+        with self.manager.writer() as conn:
+            conn.execute('''
+                INSERT INTO monthly_targets (zone, year, month, target)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(zone, year, month) DO UPDATE SET target=excluded.target
+            ''', (zone, year, month, target))
+
+    def get_monthly_target(self, zone, year, month):
+        with self.manager.reader() as conn:
+            result = conn.execute('''
+                SELECT target FROM monthly_targets
+                WHERE zone = ? AND year = ? AND month = ?
+            ''', (zone, year, month)).fetchone()
+        return result[0] if result else 0
+
+    def get_targets(self):
+        with self.manager.reader() as conn:
+            return pd.read_sql_query('''
+                SELECT zone, year, month, target
+                FROM monthly_targets
+                ORDER BY year DESC, month DESC, zone
+            ''', conn)
+
+    def save_ytd_init(self, zone, year, january_volume):
+        with self.manager.writer() as conn:
+            conn.execute('''
+                INSERT INTO ytd_init (zone, year, january_volume)
+                VALUES (?, ?, ?)
+                ON CONFLICT(zone, year) DO UPDATE SET january_volume=excluded.january_volume
+            ''', (zone, year, january_volume))
+
+    def get_ytd_init(self, zone, year):
+        with self.manager.reader() as conn:
+            result = conn.execute('''
+                SELECT january_volume FROM ytd_init
+                WHERE zone = ? AND year = ?
+            ''', (zone, year)).fetchone()
+        return result[0] if result else 0
+
+    def add_custom_holiday(self, day, description, zone=None):
+        try:
+            with self.manager.writer() as conn:
+                conn.execute('''
+                    INSERT INTO custom_holidays (date, description, zone)
+                    VALUES (?, ?, ?)
+                ''', (day, description, zone))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def get_custom_holidays(self):
+        with self.manager.reader() as conn:
+            return pd.read_sql_query('''
+                SELECT date, description, zone
+                FROM custom_holidays
+                ORDER BY date DESC, zone IS NOT NULL, zone
+            ''', conn)
+
+    def daily_trend(self, zones, warmup_start, start, end, holidays, archived):
+        # Calendrier ouvré généré en SQL sur les numéros de jour : un jour sans vente compte pour 0
+        archived_days = np.column_stack([to_day_numbers(archived['date']), archived['volume'].to_numpy(dtype='int64')])
+        with self.manager.reader() as conn:
+            return pd.read_sql_query('''
+                WITH RECURSIVE days(day) AS (
+                    SELECT :warmup_start
+                    UNION ALL
+                    SELECT day + 1 FROM days WHERE day < :end_day
+                ),
+                working AS (
+                    -- Le 1970-01-01 (jour 0) est un jeudi : (day + 4) % 7 suit strftime('%w')
+                    SELECT day FROM days
+                    WHERE (day + 4) % 7 NOT IN (0, 6)
+                      AND day NOT IN (SELECT value FROM json_each(:holidays))
+                ),
+                daily AS (
+                    SELECT day, SUM(volume) as volume FROM (
+                        SELECT f.day, f.volume
+                        FROM zones z
+                        JOIN sales_facts f ON f.zone_id = z.id
+                        WHERE z.name IN (SELECT value FROM json_each(:zones))
+                          AND f.day >= :warmup_start AND f.day <= :end_day
+                        UNION ALL
+                        SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]')
+                        FROM json_each(:archived)
+                    )
+                    GROUP BY day
+                ),
+                rolling AS (
+                    SELECT w.day,
+                           COALESCE(d.volume, 0) as volume,
+                           AVG(COALESCE(d.volume, 0)) OVER (ORDER BY w.day ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) as avg_7,
+                           AVG(COALESCE(d.volume, 0)) OVER (ORDER BY w.day ROWS BETWEEN 19 PRECEDING AND CURRENT ROW) as avg_20
+                    FROM working w
+                    LEFT JOIN daily d ON d.day = w.day
+                )
+                SELECT date(day * 86400, 'unixepoch') as date, volume, avg_7, avg_20 FROM rolling
+                WHERE day >= :start_day
+                ORDER BY day
+            ''', conn, params={
+                'zones': json.dumps(list(zones)),
+                'holidays': json.dumps(to_day_numbers(list(holidays)).tolist()),
+                'archived': json.dumps(archived_days.tolist()),
+                'warmup_start': int(to_day_numbers(warmup_start)),
+                'start_day': int(to_day_numbers(start)),
+                'end_day': int(to_day_numbers(end)),
+            })
+
+    def monthly_trend(self, zones, start_year, end_year, archived):
+        # L'année précédente est lue pour la comparaison YoY des premiers mois ; chaque
+        # zone x mois est une recherche par plage de jours dans la clé primaire
+        months = np.arange(f'{start_year - 1}-01', f'{end_year + 1}-01', dtype='datetime64[M]')
+        month_index = months.astype('int64')
+        month_bounds = np.column_stack([month_index // 12 + 1970, month_index % 12 + 1,
+                                        months.astype('datetime64[D]').astype('int64'),
+                                        (months + 1).astype('datetime64[D]').astype('int64')])
+        with self.manager.reader() as conn:
+            return pd.read_sql_query('''
+                WITH months AS MATERIALIZED (
+                    SELECT json_extract(value, '$[0]') as year,
+                           json_extract(value, '$[1]') as month,
+                           json_extract(value, '$[2]') as start_day,
+                           json_extract(value, '$[3]') as end_day
+                    FROM json_each(:months)
+                ),
+                live AS (
+                    SELECT z.name as zone, m.year, m.month, SUM(f.volume) as volume
+                    FROM zones z
+                    CROSS JOIN months m
+                    JOIN sales_facts f ON f.zone_id = z.id AND f.day >= m.start_day AND f.day < m.end_day
+                    WHERE z.name IN (SELECT value FROM json_each(:zones))
+                    GROUP BY z.name, m.year, m.month
+                ),
+                monthly AS (
+                    SELECT zone, year, month, SUM(volume) as volume FROM (
+                        SELECT zone, year, month, volume FROM live
+                        UNION ALL
+                        SELECT json_extract(value, '$.zone'), json_extract(value, '$.year'),
+                               json_extract(value, '$.month'), json_extract(value, '$.volume')
+                        FROM json_each(:archived)
+                    )
+                    GROUP BY zone, year, month
+                ),
+                compared AS (
+                    -- Cadres RANGE sur l'indice du mois : un mois sans vente donne NULL, pas le mois d'avant
+                    SELECT zone, year, month, volume,
+                           SUM(volume) OVER (PARTITION BY zone ORDER BY year * 12 + month
+                                             RANGE BETWEEN 1 PRECEDING AND 1 PRECEDING) as previous_month,
+                           SUM(volume) OVER (PARTITION BY zone ORDER BY year * 12 + month
+                                             RANGE BETWEEN 12 PRECEDING AND 12 PRECEDING) as previous_year
+                    FROM monthly
+                )
+                SELECT zone, year, month, volume,
+                       previous_month,
+                       ROUND(100.0 * (volume - previous_month) / NULLIF(previous_month, 0), 1) as mom_pct,
+                       previous_year,
+                       ROUND(100.0 * (volume - previous_year) / NULLIF(previous_year, 0), 1) as yoy_pct
+                FROM compared
+                WHERE year >= :start_year
+                ORDER BY zone, year, month
+            ''', conn, params={
+                'zones': json.dumps(list(zones)),
+                'archived': archived.to_json(orient='records'),
+                'months': json.dumps(month_bounds.tolist()),
+                'start_year': start_year,
+            })
+
+# Nom de configuration (DB_CONFIG['backend']) -> moteur
+BACKENDS = {
+    'sqlite': SQLiteRepository,
+}
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+def create_repository(backend):
+    """Nouvelle instance du moteur `backend` (ValueError si inconnu)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur de données inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+    return BACKENDS[backend]()
+
+def get_repository():
+    """Moteur configuré par DB_CONFIG['backend'], partagé par tout le processus"""
+    backend = DB_CONFIG['backend']
+    if backend not in _repositories:
+        with _repositories_lock:
+            if backend not in _repositories:
+                _repositories[backend] = create_repository(backend)
+    return _repositories[backend]
@@ -0,0 +1,141 @@
+"""Simulation Monte Carlo « what-if » : atteinte des objectifs fin de mois / fin d'année et réallocation"""
+import calendar
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .archive import get_archived_daily
+from .cache import cached_query
+from .db import get_db_connection
+from .holidays import count_zone_working_days, is_working_in_zones
+from .metrics import get_zones_overview
+from .repository import get_repository
+from .storage import get_consolidated_zones, get_zone_tree, get_zones
+from .tracing import traced
+
+# Jours calendaires d'historique rééchantillonnés
+LOOKBACK_DAYS = 365
+DEFAULT_TRIALS = 20000
+
+@cached_query
+def get_daily_history(zones, end_date, lookback_days=LOOKBACK_DAYS):
+    """Matrice zones x jours ouvrés des `lookback_days` jours précédant `end_date` (0 si aucune vente).
+
+    Jours retenus : ouvrés dans toutes les zones, pour qu'un tirage ne compte pas un férié pour 0.
+    """
+    start_date = end_date - timedelta(days=lookback_days)
+    days = np.arange(np.datetime64(start_date.date(), 'D'), np.datetime64(end_date.date(), 'D'))
+    days = days[is_working_in_zones(zones, days).all(axis=0)]
+
+    # Ventes en base (colonnes typées) et années closes (partitions Parquet utiles seulement)
+    rows = pd.concat([get_repository().get_sales(zones, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')),
+                      get_archived_daily(zones, start_date, end_date)], ignore_index=True)
+
+    day_pos = pd.Index(days).get_indexer(rows['date'].to_numpy().astype('datetime64[D]'))
+    zone_pos = pd.Index(list(zones)).get_indexer(rows['zone'])
+    kept = day_pos >= 0  # ventes saisies sur un jour non ouvré ignorées
+    history = np.zeros((len(zones), len(days)))
+    np.add.at(history, (zone_pos[kept], day_pos[kept]), rows['volume'].to_numpy(dtype='float64')[kept])
+    return history
+
+def get_annual_targets(zones, year):
+    """Somme des objectifs mensuels de l'année par zone"""
+    with get_db_connection() as conn:
+        targets = dict(conn.execute('''
+            SELECT zone, SUM(target) FROM monthly_targets
+            WHERE zone IN (SELECT value FROM json_each(?)) AND year = ?
+            GROUP BY zone
+        ''', (json.dumps(list(zones)), year)).fetchall())
+    return np.array([targets.get(zone, 0) for zone in zones], dtype='float64')
+
+def bootstrap_totals(history, n_days, n_trials, rng):
+    """Volumes cumulés de `n_days` jours tirés avec remise (trials x zones).
+
+    Un tirage porte sur un jour historique entier, toutes zones confondues, ce qui
+    conserve la corrélation entre zones pour la consolidation groupe. `n_days` peut
+    varier par zone (calendriers différents) : chaque zone somme les premiers tirages.
+    """
+    n_zones, n_history = history.shape
+    n_days = np.broadcast_to(np.asarray(n_days, dtype='int64'), (n_zones,))
+    totals = np.zeros((n_trials, n_zones))
+    if n_zones == 0 or n_days.max() <= 0 or n_history == 0:
+        return totals
+    draws = rng.integers(0, n_history, size=(n_trials, int(n_days.max())))
+    for n in np.unique(n_days[n_days > 0]):
+        flat = (np.arange(n_trials)[:, None] * n_history + draws[:, :n]).ravel()
+        counts = np.bincount(flat, minlength=n_trials * n_history).reshape(n_trials, n_history)
+        totals[:, n_days == n] = counts @ history[n_days == n].T
+    return totals
+
+def _distribution(volumes, target):
+    """P10/P50/P90 et probabilité d'atteindre l'objectif, par colonne"""
+    p10, p50, p90 = np.percentile(volumes, [10, 50, 90], axis=0)
+    probability = np.where(target > 0, (volumes >= target).mean(axis=0), np.nan)
+    return p10, p50, p90, probability
+
+@traced
+def simulate_attainment(current_date, shocks=None, n_trials=DEFAULT_TRIALS, seed=None, lookback_days=LOOKBACK_DAYS):
+    """Distribution de l'atteinte fin de mois et fin d'année par zone et pour le groupe.
+
+    `shocks` : {zone: multiplicateur} appliqué aux ventes futures (0.9 = glissement de 10 %).
+    """
+    zones = get_zones()
+    year, month = current_date.year, current_date.month
+    rng = np.random.default_rng(seed)
+
+    history = get_daily_history(zones, current_date, lookback_days)
+    multipliers = np.array([(shocks or {}).get(zone, 1.0) for zone in zones])
+
+    # Jours ouvrés restants de chaque zone, aujourd'hui compris (comme le run-rate)
+    month_end = datetime(year, month, calendar.monthrange(year, month)[1])
+    days_left_month = count_zone_working_days(zones, current_date, month_end)
+    days_left_year = count_zone_working_days(zones, current_date, datetime(year, 12, 31))
+
+    month_sim = bootstrap_totals(history, days_left_month, n_trials, rng) * multipliers
+    rest_of_year_sim = bootstrap_totals(history, days_left_year - days_left_month, n_trials, rng) * multipliers
+
+    overview = get_zones_overview(year, month, current_date, zones=zones)
+    month_volumes = overview['realized'].to_numpy() + month_sim
+    year_volumes = overview['ytd'].to_numpy() + month_sim + rest_of_year_sim
+    month_targets = overview['target'].to_numpy(dtype='float64')
+    year_targets = get_annual_targets(zones, year)
+
+    # Consolidation groupe : somme par tirage des zones consolidées
+    group_mask = np.isin(zones, get_consolidated_zones())
+    tree = get_zone_tree()
+    group_name = tree.loc[tree['kind'] == 'group', 'name'].iloc[0]
+    month_volumes = np.column_stack([month_volumes, month_volumes[:, group_mask].sum(axis=1)])
+    year_volumes = np.column_stack([year_volumes, year_volumes[:, group_mask].sum(axis=1)])
+    month_targets = np.append(month_targets, month_targets[group_mask].sum())
+    year_targets = np.append(year_targets, year_targets[group_mask].sum())
+
+    month_p10, month_p50, month_p90, month_probability = _distribution(month_volumes, month_targets)
+    year_p10, year_p50, year_p90, year_probability = _distribution(year_volumes, year_targets)
+
+    # Réallocation du reste à faire de l'année au prorata des volumes futurs attendus
+    remaining_target = np.clip(year_targets[:-1] - overview['ytd'].to_numpy(), 0, None)
+    expected_future = np.median(month_sim + rest_of_year_sim, axis=0)
+    if expected_future.sum() > 0:
+        suggested = remaining_target.sum() * expected_future / expected_future.sum()
+    else:
+        suggested = remaining_target
+    suggested = np.append(suggested, suggested[group_mask].sum())
+    remaining_target = np.append(remaining_target, remaining_target[group_mask].sum())
+
+    return pd.DataFrame({
+        'shock': np.append(multipliers, np.nan),
+        'month_target': month_targets,
+        'month_p10': month_p10,
+        'month_p50': month_p50,
+        'month_p90': month_p90,
+        'month_probability': month_probability,
+        'year_target': year_targets,
+        'year_p10': year_p10,
+        'year_p50': year_p50,
+        'year_p90': year_p90,
+        'year_probability': year_probability,
+        'remaining_target': remaining_target,
+        'suggested_remaining_target': suggested,
+    }, index=pd.Index(zones + [group_name], name='zone'))
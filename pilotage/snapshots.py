@@ -0,0 +1,110 @@
+"""Instantanés du dashboard précalculés par un thread de fond, versionnés par la version des données"""
+import os
+import threading
+from datetime import datetime
+
+from .cache import get_query_cache
+from .metrics import compute_zone_dashboard, get_group_consolidation, get_zone_rollups, get_zones_overview
+from .storage import get_zones
+from .tracing import traced
+
+# Recalcul périodique (s), en plus du recalcul déclenché par chaque écriture
+SNAPSHOT_INTERVAL = float(os.environ.get('PILOTAGE_SNAPSHOT_INTERVAL', 300))
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def today():
+    """Date du jour sans l'heure"""
+    return datetime.combine(datetime.now().date(), datetime.min.time())
+
+@traced
+def compute_snapshot(current_date):
+    """Calcule tout le dashboard (groupe, vue d'ensemble, détail de chaque zone) et le publie"""
+    global _snapshot
+    cache = get_query_cache()
+    version = cache.current_version()
+    year, month = current_date.year, current_date.month
+
+    snapshot = {
+        'version': version,
+        'date': current_date,
+        'group': get_group_consolidation(year, month, current_date),
+        'overview': get_zones_overview(year, month, current_date),
+        'rollups': get_zone_rollups(year, month, current_date),
+        'zones': {zone: compute_zone_dashboard(zone, current_date) for zone in get_zones()},
+    }
+    snapshot['computed_at'] = datetime.now()
+
+    # Une écriture pendant le calcul : l'instantané est rendu mais pas publié
+    with _snapshot_lock:
+        if cache.version == version and (_snapshot is None or _snapshot['computed_at'] < snapshot['computed_at']):
+            _snapshot = snapshot
+    return snapshot
+
+def get_latest_snapshot():
+    """Dernier instantané publié (éventuellement obsolète), ou None"""
+    return _snapshot
+
+def get_dashboard_snapshot(current_date):
+    """Instantané à jour du dashboard (lecture seule) ; recalculé sur place s'il est obsolète"""
+    snapshot = _snapshot
+    if (snapshot is not None and snapshot['date'] == current_date
+            and snapshot['version'] == get_query_cache().current_version()):
+        return snapshot
+    return compute_snapshot(current_date)
+
+class SnapshotWorker:
+    """Thread de fond qui recalcule l'instantané après chaque écriture et toutes les `interval` secondes"""
+
+    def __init__(self, interval=SNAPSHOT_INTERVAL):
+        self.interval = interval
+        self.runs = 0
+        self.last_error = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        get_query_cache().add_listener(self._wakeup.set)
+
+    def start(self):
+        """Démarre le thread s'il ne tourne pas déjà"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='pilotage-snapshots', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Arrête le thread après le calcul en cours"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                compute_snapshot(today())
+                self.runs += 1
+                self.last_error = None
+            except Exception as e:  # base indisponible, verrou... : nouvel essai au prochain réveil
+                self.last_error = e
+            self._wakeup.wait(self.interval)
+
+_snapshot_worker = None
+_snapshot_worker_lock = threading.Lock()
+
+def start_snapshot_worker(interval=SNAPSHOT_INTERVAL):
+    """Démarre (une fois par processus) le thread de précalcul et le retourne"""
+    global _snapshot_worker
+    if _snapshot_worker is None:
+        with _snapshot_worker_lock:
+            if _snapshot_worker is None:
+                _snapshot_worker = SnapshotWorker(interval)
+    _snapshot_worker.start()
+    return _snapshot_worker
@@ -0,0 +1,197 @@
+"""Zones et accès aux ventes, objectifs et initialisations YTD"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .cache import cached_query, notify_changes
+from .db import get_db_connection, get_db_writer, get_month_bounds, get_year_bounds
+from .holidays import COUNTRIES, get_holiday_cache, is_working_in_zones
+from .repository import get_repository
+from .tracing import traced
+
+@cached_query
+def get_zone_tree():
+    """Arborescence des zones dans l'ordre d'affichage.
+
+    `in_group` vaut 1 si le nœud et tous ses ancêtres sont consolidés jusqu'à la racine.
+    """
+    with get_db_connection() as conn:
+        return pd.read_sql_query('''
+            WITH RECURSIVE tree AS (
+                SELECT id, name, parent_id, kind, consolidated, country,
+                       0 as depth, printf('%06d', position) as sort_key, 1 as in_group
+                FROM zones WHERE parent_id IS NULL
+                UNION ALL
+                SELECT z.id, z.name, z.parent_id, z.kind, z.consolidated, z.country,
+                       t.depth + 1, t.sort_key || '.' || printf('%06d', z.position), t.in_group * z.consolidated
+                FROM zones z
+                JOIN tree t ON z.parent_id = t.id
+            )
+            SELECT id, name, parent_id, kind, consolidated, country, depth, in_group
+            FROM tree
+            ORDER BY sort_key
+        ''', conn)
+
+def _leaf_zones(tree, parent_kind=None):
+    leaves = tree[tree['kind'] == 'zone']
+    if parent_kind is not None:
+        parents = tree.loc[tree['kind'] == parent_kind, 'id']
+        leaves = leaves[leaves['parent_id'].isin(parents)]
+    return leaves['name'].tolist()
+
+@cached_query
+def get_zones():
+    """Retourne la liste complète des zones"""
+    return _leaf_zones(get_zone_tree())
+
+@cached_query
+def get_filiales():
+    """Retourne uniquement les filiales"""
+    return _leaf_zones(get_zone_tree(), 'filiale')
+
+@cached_query
+def get_concessions():
+    """Retourne uniquement les concessions"""
+    return _leaf_zones(get_zone_tree(), 'concession')
+
+@cached_query
+def get_consolidated_zones():
+    """Zones comptées dans la consolidation groupe"""
+    tree = get_zone_tree()
+    return tree.loc[(tree['kind'] == 'zone') & (tree['in_group'] == 1), 'name'].tolist()
+
+def add_zone(name, parent, kind='zone', consolidated=True, country=None):
+    """Ajoute une zone (ou un regroupement) sous `parent` ; False si le nom existe déjà.
+
+    `country` : pays dont la zone suit les jours fériés (calendrier par défaut si absent).
+    """
+    if country is not None and country not in COUNTRIES:
+        raise ValueError(f"Pays inconnu : {country} (choix : {', '.join(COUNTRIES)})")
+    try:
+        with get_db_writer() as conn:
+            parent_row = conn.execute('SELECT id FROM zones WHERE name = ?', (parent,)).fetchone()
+            if parent_row is None:
+                raise ValueError(f"Zone parente inconnue : {parent}")
+            conn.execute('''
+                INSERT INTO zones (name, parent_id, kind, consolidated, position, country)
+                VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM zones WHERE parent_id = ?), ?)
+            ''', (name, parent_row[0], kind, int(consolidated), parent_row[0], country))
+    except sqlite3.IntegrityError:
+        return False
+    # Nouvelle zone : pays et bitmaps des calendriers à recharger
+    get_holiday_cache().invalidate()
+    return True
+
+def set_zone_country(zone, country):
+    """Change le pays dont une zone suit les jours fériés ; False si la zone n'existe pas"""
+    if country not in COUNTRIES:
+        raise ValueError(f"Pays inconnu : {country} (choix : {', '.join(COUNTRIES)})")
+    with get_db_writer() as conn:
+        updated = conn.execute("UPDATE zones SET country = ? WHERE name = ? AND kind = 'zone'",
+                               (country, zone)).rowcount
+    if not updated:
+        return False
+    # Calendrier de la zone changé : jours ouvrés, run-rate et alertes du mois à revoir
+    get_holiday_cache().invalidate()
+    now = datetime.now()
+    notify_changes([(zone, now.year, now.month)])
+    return True
+
+def save_sale(zone, date, volume):
+    """Enregistre ou met à jour une vente quotidienne (lève sqlite3.Error en cas d'échec)"""
+    get_repository().save_sales([(zone, date.strftime('%Y-%m-%d'), volume)])
+    notify_changes([(zone, date.year, date.month)])
+    return True
+
+def save_monthly_target(zone, year, month, target):
+    """Enregistre l'objectif mensuel pour une zone (lève sqlite3.Error en cas d'échec)"""
+    get_repository().save_monthly_target(zone, year, month, target)
+    notify_changes([(zone, year, month)])
+    return True
+
+def save_ytd_init(zone, year, january_volume):
+    """Enregistre le volume de janvier initial (lève sqlite3.Error en cas d'échec)"""
+    get_repository().save_ytd_init(zone, year, january_volume)
+    return True
+
+@cached_query
+def get_sales_grid(zones, start_date, end_date):
+    """Grille jours x zones des ventes saisies entre deux dates incluses (vide si aucune vente).
+
+    Lignes : jours ouvrés dans au moins une des zones, plus les autres jours ayant déjà une vente.
+    """
+    days = np.arange(np.datetime64(start_date.date(), 'D'), np.datetime64(end_date.date(), 'D') + 1)
+    sales = get_repository().get_sales(zones, str(days[0]), str(days[-1] + 1))
+
+    keep = is_working_in_zones(zones, days).any(axis=0) | np.isin(days, sales['date'].to_numpy().astype('datetime64[D]'))
+    grid = sales.pivot(index='date', columns='zone', values='volume') \
+        .reindex(index=pd.DatetimeIndex(days[keep]), columns=list(zones)).astype('Int64')
+    grid.index = grid.index.date
+    grid.index.name = 'date'
+    grid.columns.name = None
+    return grid
+
+def diff_sales_grid(original, edited):
+    """Cellules modifiées d'une grille de ventes : (lignes à upserter, lignes à supprimer)"""
+    before = original.to_numpy(dtype='float64', na_value=np.nan)
+    after = edited.reindex_like(original).to_numpy(dtype='float64', na_value=np.nan)
+    rows, columns = np.nonzero((before != after) & ~(np.isnan(before) & np.isnan(after)))
+    volumes = after[rows, columns]
+    if (volumes < 0).any():
+        raise ValueError("Le volume doit être positif")
+    days = pd.DatetimeIndex(original.index[rows]).strftime('%Y-%m-%d')
+    zones = original.columns[columns]
+    cleared = np.isnan(volumes)
+    upserts = [(zone, day, int(volume)) for zone, day, volume in zip(zones[~cleared], days[~cleared], volumes[~cleared])]
+    deletions = list(zip(zones[cleared], days[cleared]))
+    return upserts, deletions
+
+@traced
+def save_sales_grid(original, edited):
+    """Enregistre en une transaction les seules cellules modifiées (cellule vidée = vente supprimée)"""
+    upserts, deletions = diff_sales_grid(original, edited)
+    if upserts or deletions:
+        get_repository().save_sales(upserts, deletions)
+        notify_changes((zone, int(day[:4]), int(day[5:7])) for zone, day, *_ in upserts + deletions)
+    return {'saved': len(upserts), 'deleted': len(deletions)}
+
+@cached_query
+def get_sales_data(zone, year, month):
+    """Récupère les ventes pour une zone et un mois donné"""
+    month_start, month_end = get_month_bounds(year, month)
+    return get_repository().get_sales([zone], month_start, month_end)[['date', 'volume']]
+
+def get_all_sales_ytd(zone, year, end_date):
+    """Récupère TOUTES les ventes YTD (janvier à date actuelle)"""
+    year_start, year_end = get_year_bounds(year)
+    end = min(year_end, (end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    return int(get_repository().get_sales([zone], year_start, end)['volume'].sum())
+
+@cached_query
+def get_monthly_target(zone, year, month):
+    """Récupère l'objectif mensuel"""
+    return get_repository().get_monthly_target(zone, year, month)
+
+@cached_query
+def get_ytd_init(zone, year):
+    """Récupère le volume de janvier initial (manuel)"""
+    return get_repository().get_ytd_init(zone, year)
+
+@cached_query
+def get_recent_sales(limit=20):
+    """Dernières ventes saisies, toutes zones confondues"""
+    return get_repository().get_recent_sales(limit)
+
+@cached_query
+def get_all_targets():
+    """Tous les objectifs mensuels configurés (années archivées comprises), du plus récent au plus ancien"""
+    from .archive import get_archived_targets
+
+    targets = get_repository().get_targets()
+    archived = get_archived_targets()
+    if archived.empty:
+        return targets
+    return pd.concat([targets, archived], ignore_index=True).sort_values(
+        ['year', 'month', 'zone'], ascending=[False, False, True], ignore_index=True)
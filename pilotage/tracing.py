@@ -0,0 +1,165 @@
+"""Instrumentation : requêtes SQL et calculs chronométrés par exécution (rerun)"""
+import contextvars
+import csv
+import functools
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Trace active pour le thread / la session en cours (None : instrumentation inactive)
+_current_trace = contextvars.ContextVar('pilotage_trace', default=None)
+
+class Trace:
+    """Événements (SQL et appels de fonctions) enregistrés pendant une exécution"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now()
+        self.events = []
+        self.total_ms = 0.0
+        self._depth = 0
+
+    def record(self, kind, name, ms=0.0, rows=None):
+        event = {'kind': kind, 'name': name, 'rows': rows, 'ms': ms, 'depth': self._depth}
+        self.events.append(event)
+        return event
+
+    def summary(self):
+        """Agrégats : nombre de requêtes, temps SQL, lignes lues"""
+        sql = [e for e in self.events if e['kind'] == 'sql']
+        return {
+            'label': self.label,
+            'total_ms': self.total_ms,
+            'queries': len(sql),
+            'sql_ms': sum(e['ms'] for e in sql),
+            'rows': sum(e['rows'] or 0 for e in sql),
+            'calls': sum(1 for e in self.events if e['kind'] == 'call'),
+        }
+
+    def to_dict(self):
+        return {'started_at': self.started_at.isoformat(timespec='milliseconds'),
+                **self.summary(), 'events': self.events}
+
+def current_trace():
+    """Trace active, ou None"""
+    return _current_trace.get()
+
+@contextmanager
+def start_trace(label, output_path=None):
+    """Active l'instrumentation le temps du bloc ; ajoute la trace à `output_path` (.jsonl ou .csv)"""
+    trace = Trace(label)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.total_ms = (time.perf_counter() - start) * 1000
+        _current_trace.reset(token)
+        if output_path:
+            append_trace(trace, output_path)
+
+def append_trace(trace, path):
+    """Ajoute une trace à un fichier JSONL (une ligne par exécution) ou CSV (une ligne par événement)"""
+    if str(path).lower().endswith('.csv'):
+        is_new = not os.path.exists(path)
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['started_at', 'label', 'kind', 'name', 'rows', 'ms', 'depth'])
+            if is_new:
+                writer.writeheader()
+            started_at = trace.started_at.isoformat(timespec='milliseconds')
+            for event in trace.events:
+                writer.writerow({'started_at': started_at, 'label': trace.label, **event})
+    else:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+def traced(func):
+    """Chronomètre une fonction de calcul lorsqu'une trace est active"""
+    name = f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return func(*args, **kwargs)
+        event = trace.record('call', name)
+        trace._depth += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            event['ms'] = (time.perf_counter() - start) * 1000
+            trace._depth -= 1
+    return wrapper
+
+def _normalize_sql(sql):
+    return ' '.join(sql.split())
+
+class TracedCursor(sqlite3.Cursor):
+    """Curseur qui enregistre requête, durée (exécution + lecture) et nombre de lignes"""
+
+    _event = None
+
+    def execute(self, sql, parameters=()):
+        trace = _current_trace.get()
+        if trace is None:
+            return super().execute(sql, parameters)
+        self._event = trace.record('sql', _normalize_sql(sql))
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._event['ms'] += (time.perf_counter() - start) * 1000
+            if self.rowcount >= 0:
+                self._event['rows'] = self.rowcount
+
+    def executemany(self, sql, seq_of_parameters):
+        trace = _current_trace.get()
+        if trace is None:
+            return super().executemany(sql, seq_of_parameters)
+        self._event = trace.record('sql', _normalize_sql(sql))
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._event['ms'] += (time.perf_counter() - start) * 1000
+            self._event['rows'] = self.rowcount
+
+    def _fetched(self, start, rows):
+        if self._event is not None:
+            self._event['ms'] += (time.perf_counter() - start) * 1000
+            self._event['rows'] = (self._event['rows'] or 0) + rows
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, int(row is not None))
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+class TracedConnection(sqlite3.Connection):
+    """Connexion dont tous les curseurs (y compris ceux de pandas) sont instrumentés"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,43 @@
+"""Tendances calculées par le moteur de requêtes : moyennes glissantes en jours ouvrés, évolutions mensuelles et annuelles"""
+from datetime import timedelta
+
+import pandas as pd
+
+from .archive import get_archived_daily, get_archived_monthly_totals
+from .cache import cached_query
+from .holidays import get_holiday_cache
+from .repository import get_repository
+from .tracing import traced
+
+# Jours calendaires lus avant le début pour amorcer la moyenne sur 20 jours ouvrés
+ROLLING_WARMUP_DAYS = 60
+
+@traced
+@cached_query
+def get_daily_trend(zones, start_date, end_date):
+    """Volume par jour ouvré et moyennes glissantes sur 7 et 20 jours ouvrés (zones additionnées)"""
+    warmup_start = start_date - timedelta(days=ROLLING_WARMUP_DAYS)
+    archived = get_archived_daily(zones, warmup_start, end_date + timedelta(days=1))
+    # Jours retenus : ouvrés dans toutes les zones additionnées
+    holiday_cache = get_holiday_cache()
+    holidays = sorted({
+        day.strftime('%Y-%m-%d')
+        for year in range(warmup_start.year, end_date.year + 1)
+        for zone in zones
+        for day in holiday_cache.holidays(year, zone)
+    })
+
+    trend = get_repository().daily_trend(
+        zones, warmup_start.strftime('%Y-%m-%d'), start_date.strftime('%Y-%m-%d'),
+        end_date.strftime('%Y-%m-%d'), holidays, archived)
+
+    trend['date'] = pd.to_datetime(trend['date'])
+    return trend
+
+@traced
+@cached_query
+def get_monthly_trend(zones, start_year, end_year):
+    """Volume mensuel par zone avec évolution vs mois précédent (MoM) et même mois N-1 (YoY)"""
+    # Années closes : agrégats des pieds de fichiers Parquet, sans lire les lignes
+    archived = get_archived_monthly_totals(zones, start_year - 1, end_year)
+    return get_repository().monthly_trend(zones, start_year, end_year, archived)
@@ -1,9 +1,48 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
+import os
+import functools
 from datetime import datetime, timedelta
 import calendar
 
+from pilotage.alerts import pace_level, pace_message, start_alert_engine
+from pilotage.cache import get_query_cache
+from pilotage.forecast import forecast_group_month_end, forecast_month_end
+from pilotage.holidays import (
+    COUNTRIES,
+    add_custom_holiday,
+    get_custom_holidays_table,
+    get_holiday_cache,
+    get_working_day_calendar,
+    get_working_days_in_month,
+    list_public_holidays,
+)
+from pilotage.importer import import_sales_file
+from pilotage.migrations import ensure_schema
+from pilotage.simulation import DEFAULT_TRIALS, simulate_attainment
+from pilotage.snapshots import get_dashboard_snapshot, get_latest_snapshot, start_snapshot_worker
+from pilotage.storage import (
+    add_zone,
+    get_all_targets,
+    get_consolidated_zones,
+    get_recent_sales,
+    get_sales_grid,
+    get_zone_tree,
+    get_zones,
+    save_monthly_target,
+    save_sale,
+    save_sales_grid,
+    save_ytd_init,
+    set_zone_country,
+)
+from pilotage.tracing import start_trace
+from pilotage.trends import get_daily_trend, get_monthly_trend
+
+# Fichier des traces de diagnostic (.jsonl : une ligne par exécution, .csv : une ligne par événement)
+TRACE_FILE = os.environ.get('PILOTAGE_TRACE_FILE', 'pilotage_traces.jsonl')
+
 # Configuration de la page
 st.set_page_config(
     page_title="Pilotage Commercial",
@@ -44,766 +83,658 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ==================== JOURS FÉRIÉS ====================
+# ==================== DIAGNOSTIC ====================
 
-def get_public_holidays(year):
-    """Retourne les jours fériés belges/français/espagnols pour une année"""
-    holidays = [
-        datetime(year, 1, 1),   # Nouvel An
-        datetime(year, 5, 1),   # Fête du Travail
-        datetime(year, 12, 25), # Noël
-        datetime(year, 12, 26), # Lendemain de Noël (BE)
-        datetime(year, 11, 1),  # Toussaint
-        datetime(year, 11, 11), # Armistice
-        datetime(year, 7, 14),  # Fête Nationale FR
-        datetime(year, 7, 21),  # Fête Nationale BE
-        datetime(year, 8, 15),  # Assomption
-    ]
-    
-    easter_dates = {
-        2024: datetime(2024, 3, 31),
-        2025: datetime(2025, 4, 20),
-        2026: datetime(2026, 4, 5),
-        2027: datetime(2027, 3, 28),
-    }
+def render_trace_panel(trace, container=None):
+    """Détail des requêtes SQL et des calculs de la dernière exécution (rerun ou fragment)"""
+    summary = trace.summary()
+    with (container or st).expander(f"🐞 Dernière exécution · {trace.label}", expanded=True):
+        col_t1, col_t2 = st.columns(2)
+        col_t1.metric("Durée totale", f"{summary['total_ms']:.0f} ms")
+        col_t2.metric("Requêtes SQL", summary['queries'])
+        st.caption(f"{summary['sql_ms']:.1f} ms en SQL · {summary['rows']:,} lignes · "
+                   f"{summary['calls']} calculs instrumentés")
+        
+        if not trace.events:
+            return
+        events_df = pd.DataFrame(trace.events)
+        events_df['name'] = ['· ' * depth + name for depth, name in zip(events_df['depth'], events_df['name'])]
+        events_df['kind'] = events_df['kind'].map({'sql': 'SQL', 'call': 'Calcul'})
+        st.dataframe(
+            events_df[['kind', 'name', 'rows', 'ms']].rename(columns={
+                'kind': 'Type', 'name': 'Événement', 'rows': 'Lignes', 'ms': 'Durée (ms)'
+            }).round({'Durée (ms)': 2}),
+            use_container_width=True, hide_index=True
+        )
+
+def traced_fragment(func):
+    """st.fragment tracé en mode diagnostic, y compris quand il se relance seul.
+
+    Un fragment relancé par l'un de ses widgets n'exécute ni main() ni sa trace : chaque
+    exécution du fragment ouvre donc sa propre trace et affiche son panneau sous la section.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        if not st.session_state.get("debug_mode"):
+            return func(*args, **kwargs)
+        output_path = TRACE_FILE if st.session_state.get("save_traces") else None
+        with start_trace(func.__name__, output_path=output_path) as trace:
+            func(*args, **kwargs)
+        render_trace_panel(trace)
+    return st.fragment(run)
+
+# ==================== DASHBOARD ====================
+
+@traced_fragment
+def render_dashboard(today):
+    """Vue Dashboard : consolidation groupe, détail par zone, prévisions"""
+    current_year, current_month = today.year, today.month
+    
+    st.subheader("Tableau de Bord")
+    
+    # CONSOLIDATION GROUPE EN HAUT
+    group_zones = " + ".join(get_consolidated_zones())
+    st.markdown(f'<div class="group-header">🌍 CONSOLIDATION GROUPE ({group_zones})</div>', unsafe_allow_html=True)
+    
+    # Instantané précalculé ; recalculé ici seulement s'il est obsolète
+    snapshot = get_dashboard_snapshot(today)
+    group_data = snapshot['group']
+    
+    col_g1, col_g2, col_g3, col_g4 = st.columns(4)
+    with col_g1:
+        st.metric("🎯 Target Groupe", f"{group_data['target']:,}")
+    with col_g2:
+        delta_color = "normal" if group_data['delta'] >= 0 else "inverse"
+        st.metric("✅ Réalisé Groupe", f"{group_data['realized']:,}", 
+                 delta=f"{group_data['delta']:+,}", delta_color=delta_color)
+    with col_g3:
+        st.metric("📅 YTD Groupe", f"{group_data['ytd']:,}")
+    with col_g4:
+        if group_data['target'] > 0:
+            completion = (group_data['realized'] / group_data['target']) * 100
+            st.metric("📊 Taux Réalisation", f"{completion:.1f}%")
+        else:
+            st.metric("📊 Taux Réalisation", "N/A")
     
-    if year in easter_dates:
-        easter = easter_dates[year]
-        holidays.extend([
-            easter + timedelta(days=1),   # Lundi de Pâques
-            easter + timedelta(days=39),  # Ascension
-            easter + timedelta(days=50),  # Lundi de Pentecôte
-        ])
+    group_forecast = forecast_group_month_end(current_year, current_month, today)
+    forecast_caption = f"🔮 Prévision fin de mois groupe : {group_forecast['forecast']:,.0f}"
+    if group_forecast['p10'] == group_forecast['p10']:  # bandes disponibles (non NaN)
+        forecast_caption += f" (P10-P90 : {group_forecast['p10']:,.0f} - {group_forecast['p90']:,.0f})"
+    if group_forecast['attainment_probability'] == group_forecast['attainment_probability']:
+        forecast_caption += f" · probabilité d'atteinte {group_forecast['attainment_probability']:.0%}"
+    st.caption(forecast_caption)
     
-    return set(holidays)
-
-def is_working_day(date, holidays=None):
-    """Vérifie si un jour est ouvrable (pas weekend, pas férié)"""
-    if holidays is None:
-        holidays = get_public_holidays(date.year)
+    st.markdown("---")
     
-    if date.weekday() >= 5:
-        return False
+    # DÉTAIL PAR ZONE
+    st.subheader("📋 Détail par Zone")
+    selected_zone = st.selectbox("Sélectionner une zone", get_zones(), key="dashboard_zone")
     
-    if date in holidays:
-        return False
+    zone_data = snapshot['zones'][selected_zone]
+    monthly_target = zone_data['monthly_target']
+    monthly_realized = zone_data['monthly_realized']
+    monthly_delta = zone_data['monthly_delta']
     
-    return True
-
-def count_working_days(start_date, end_date, holidays=None):
-    """Compte le nombre de jours ouvrables entre deux dates (inclus)"""
-    if holidays is None:
-        holidays = get_public_holidays(start_date.year)
-    
-    count = 0
-    current = start_date
-    while current <= end_date:
-        if is_working_day(current, holidays):
-            count += 1
-        current += timedelta(days=1)
-    return count
-
-def get_working_days_in_month(year, month):
-    """Retourne la liste des jours ouvrables dans un mois"""
-    holidays = get_public_holidays(year)
-    first_day = datetime(year, month, 1)
-    last_day_num = calendar.monthrange(year, month)[1]
-    last_day = datetime(year, month, last_day_num)
-    
-    working_days = []
-    current = first_day
-    while current <= last_day:
-        if is_working_day(current, holidays):
-            working_days.append(current)
-        current += timedelta(days=1)
-    
-    return working_days
-
-# ==================== BASE DE DONNÉES ====================
-
-def init_database():
-    """Initialise la base de données SQLite avec les tables nécessaires"""
-    conn = sqlite3.connect('commercial_tracking.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            zone TEXT NOT NULL,
-            date TEXT NOT NULL,
-            volume INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(zone, date)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS monthly_targets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            zone TEXT NOT NULL,
-            year INTEGER NOT NULL,
-            month INTEGER NOT NULL,
-            target INTEGER NOT NULL,
-            UNIQUE(zone, year, month)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ytd_init (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            zone TEXT NOT NULL,
-            year INTEGER NOT NULL,
-            january_volume INTEGER NOT NULL,
-            UNIQUE(zone, year)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS custom_holidays (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            description TEXT,
-            UNIQUE(date)
-        )
-    ''')
+    if zone_data['is_working_day']:
+        st.success("✅ Aujourd'hui est un jour ouvrable")
+    else:
+        st.warning("⚠️ Aujourd'hui est un weekend ou jour férié")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("🎯 Target Mensuel", f"{monthly_target:,}")
+    with col2:
+        delta_color = "normal" if monthly_delta >= 0 else "inverse"
+        st.metric("✅ Réalisé", f"{monthly_realized:,}", delta=f"{monthly_delta:+,}", delta_color=delta_color)
+    with col3:
+        ytd = zone_data['ytd']
+        st.metric("📅 YTD", f"{ytd:,}")
+    
+    # Afficher le détail du calcul YTD
+    january_manual = zone_data['january_manual']
+    feb_onwards = ytd - january_manual
+    st.caption(f"ℹ️ YTD = Janvier manuel ({january_manual:,}) + Février à aujourd'hui ({feb_onwards:,})")
+    
+    st.markdown("---")
+    run_rate = zone_data['run_rate']
+    working_days_total = zone_data['working_days_total']
+    working_days_left = zone_data['working_days_left']
+    working_days_passed = zone_data['working_days_passed']
+    
+    col_rr1, col_rr2, col_rr3 = st.columns(3)
+    with col_rr1:
+        st.metric("🔥 Run-Rate Quotidien", f"{run_rate:.1f} ventes/jour")
+    with col_rr2:
+        st.metric("⏱️ Jours Ouvrables Restants", working_days_left)
+    with col_rr3:
+        st.metric("📆 Jours Ouvrables Total", f"{working_days_passed}/{working_days_total}")
+    
+    if run_rate > 0 and working_days_passed > 0:
+        avg_daily = monthly_realized / working_days_passed
+        # Mêmes seuils que les alertes envoyées à l'enregistrement
+        level = pace_level(run_rate, avg_daily)
+        {'critical': st.error, 'warning': st.warning, 'ok': st.success}[level](pace_message(level, run_rate, avg_daily))
+    
+    st.markdown("---")
+    st.subheader("📊 Performance Hebdomadaire")
+    
+    weekly_df = zone_data['weekly']
+    
+    if not weekly_df.empty:
+        def color_delta(val):
+            color = '#28a745' if val >= 0 else '#dc3545'
+            return f'color: {color}; font-weight: bold'
+        
+        styled_weekly = weekly_df.style.applymap(color_delta, subset=['Delta'])
+        st.dataframe(styled_weekly, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucune donnée hebdomadaire disponible")
     
-    conn.commit()
-    conn.close()
-
-def get_db_connection():
-    """Retourne une connexion à la base de données"""
-    return sqlite3.connect('commercial_tracking.db')
-
-def get_custom_holidays():
-    """Récupère les jours fériés personnalisés de la base"""
-    conn = get_db_connection()
-    df = pd.read_sql_query('SELECT date FROM custom_holidays', conn)
-    conn.close()
-    if not df.empty:
-        return set(pd.to_datetime(df['date']))
-    return set()
-
-def add_custom_holiday(date, description):
-    """Ajoute un jour férié personnalisé"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO custom_holidays (date, description)
-            VALUES (?, ?)
-        ''', (date.strftime('%Y-%m-%d'), description))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
+    st.markdown("---")
+    st.subheader("📅 Résumé Mensuel")
+    
+    monthly_summary = pd.DataFrame({
+        'Indicateur': ['Target', 'Réalisé', 'Delta', 'Taux de Réalisation', 'Jours Ouvrables'],
+        'Valeur': [
+            f"{monthly_target:,}",
+            f"{monthly_realized:,}",
+            f"{monthly_delta:+,}",
+            f"{(monthly_realized/monthly_target*100):.1f}%" if monthly_target > 0 else "N/A",
+            f"{working_days_passed}/{working_days_total}"
+        ]
+    })
+    
+    st.dataframe(monthly_summary, use_container_width=True, hide_index=True)
+    
+    # TABLE RÉCAPITULATIVE TOUTES ZONES
+    st.markdown("---")
+    st.subheader("📊 Vue d'Ensemble - Toutes les Zones")
+    
+    overview = snapshot['overview']
 
-# ==================== FONCTIONS MÉTIER ====================
+    all_zones_data = []
+    for zone, row in overview.iterrows():
+        completion = (row['realized'] / row['target'] * 100) if row['target'] > 0 else 0
 
-def get_zones():
-    """Retourne la liste complète des zones"""
-    filiales = ["BEFR", "BENL", "France", "Espagne"]
-    concessions = ["Sud-Rhône", "Hauts-de-France", "Luxembourg"]
-    return filiales + concessions
+        all_zones_data.append({
+            'Zone': zone,
+            'Target': row['target'],
+            'Réalisé': row['realized'],
+            'Delta': row['delta'],
+            'YTD': row['ytd'],
+            'Taux %': f"{completion:.1f}%"
+        })
 
-def get_filiales():
-    """Retourne uniquement les filiales"""
-    return ["BEFR", "BENL", "France", "Espagne"]
+    zones_df = pd.DataFrame(all_zones_data)
+    
+    def color_row(row):
+        if row['Delta'] >= 0:
+            return ['background-color: #d4edda'] * len(row)
+        else:
+            return ['background-color: #f8d7da'] * len(row)
+    
+    styled_zones = zones_df.style.apply(color_row, axis=1)
+    st.dataframe(styled_zones, use_container_width=True, hide_index=True)
+    
+    # PRÉVISION FIN DE MOIS (toutes les zones en un calcul)
+    st.markdown("---")
+    st.subheader("🔮 Prévision Fin de Mois")
+    
+    forecast = forecast_month_end(current_year, current_month, today)
+    forecast_df = pd.DataFrame({
+        'Zone': forecast.index,
+        'Réalisé': forecast['realized'].astype(int),
+        'Target': forecast['target'].astype(int),
+        'Rythme actuel': forecast['pace_forecast'].round(),
+        'Prévision': forecast['forecast'].round(),
+        'P10': forecast['p10'].round(),
+        'P90': forecast['p90'].round(),
+        'Proba. atteinte': forecast['attainment_probability'].map(lambda p: f"{p:.0%}" if p == p else "N/A"),
+    })
+    st.dataframe(forecast_df, use_container_width=True, hide_index=True)
+    st.caption("ℹ️ Prévision : médiane des projections obtenues avec le profil intra-mois de chaque mois "
+               "des 3 dernières années (à défaut : rythme par jour ouvré)")
+    
+    # CONSOLIDATION PAR NIVEAU DE L'ARBORESCENCE
+    st.markdown("---")
+    st.subheader("🌳 Consolidation par Niveau")
+    
+    rollups = snapshot['rollups']
+    rollups_df = pd.DataFrame({
+        'Niveau': ['    ' * depth + name for depth, name in zip(rollups['depth'], rollups['name'])],
+        'Target': rollups['target'],
+        'Réalisé': rollups['realized'],
+        'Delta': rollups['delta'],
+        'YTD': rollups['ytd'],
+        'Consolidé': np.where(rollups['consolidated'] == 1, "✅", "—"),
+    })
+    st.dataframe(rollups_df, use_container_width=True, hide_index=True)
+    st.caption("ℹ️ Un niveau non consolidé n'est pas additionné à son parent")
+    
+    render_what_if(today)
+    render_trends(today, selected_zone)
 
-def get_concessions():
-    """Retourne uniquement les concessions"""
-    return ["Sud-Rhône", "Hauts-de-France", "Luxembourg"]
+# SIMULATION WHAT-IF (Monte Carlo)
+@traced_fragment
+def render_what_if(today):
+    """Simulation Monte Carlo : seuls les curseurs de cette section relancent le calcul"""
+    st.markdown("---")
+    st.subheader("🎲 Simulation What-If")
+    st.caption("Rééchantillonnage des ventes quotidiennes des 12 derniers mois sur les jours ouvrables restants")
+    
+    with st.form("what_if_form"):
+        shock_cols = st.columns(4)
+        shocks = {}
+        for i, zone in enumerate(get_zones()):
+            with shock_cols[i % 4]:
+                shocks[zone] = 1 + st.slider(f"{zone} (%)", min_value=-50, max_value=50, value=0, step=5,
+                                             key=f"shock_{zone}") / 100
+        n_trials = st.select_slider("Nombre de tirages", options=[5000, 10000, 20000, 50000],
+                                    value=DEFAULT_TRIALS, key="what_if_trials")
+        submitted = st.form_submit_button("🎲 Simuler")
+    
+    if submitted or st.session_state.get("what_if_ran"):
+        st.session_state["what_if_ran"] = True
+        simulation = simulate_attainment(today, shocks=shocks, n_trials=n_trials, seed=0)
+        group_sim = simulation.iloc[-1]
+        
+        def format_probability(p):
+            return f"{p:.0%}" if p == p else "N/A"
+        
+        col_s1, col_s2, col_s3 = st.columns(3)
+        with col_s1:
+            st.metric("🎯 Proba. Target Mois Groupe", format_probability(group_sim['month_probability']))
+        with col_s2:
+            st.metric("📅 Proba. Target Année Groupe", format_probability(group_sim['year_probability']))
+        with col_s3:
+            st.metric("📈 Année Groupe (P50)", f"{group_sim['year_p50']:,.0f}")
+        
+        simulation_df = pd.DataFrame({
+            'Zone': simulation.index,
+            'Fin de mois P10-P90': [f"{low:,.0f} - {high:,.0f}" for low, high in zip(simulation['month_p10'], simulation['month_p90'])],
+            'Proba. mois': simulation['month_probability'].map(format_probability),
+            'Fin d\'année P50': simulation['year_p50'].round(),
+            'Proba. année': simulation['year_probability'].map(format_probability),
+            'Reste à faire': simulation['remaining_target'].round(),
+            'Reste à faire suggéré': simulation['suggested_remaining_target'].round(),
+        })
+        st.dataframe(simulation_df, use_container_width=True, hide_index=True)
+        st.caption("ℹ️ Reste à faire suggéré : objectif restant de l'année réparti au prorata des volumes simulés")
 
-def save_sale(zone, date, volume):
-    """Enregistre ou met à jour une vente quotidienne"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO sales (zone, date, volume)
-            VALUES (?, ?, ?)
-            ON CONFLICT(zone, date) DO UPDATE SET volume=excluded.volume
-        ''', (zone, date.strftime('%Y-%m-%d'), volume))
-        conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erreur lors de l'enregistrement : {e}")
-        return False
-    finally:
-        conn.close()
+# TENDANCES (calculées par le moteur de requêtes configuré)
+@traced_fragment
+def render_trends(today, selected_zone):
+    """Tendances de la zone : le choix de période ne relance que cette section"""
+    current_year = today.year
+    
+    st.markdown("---")
+    st.subheader(f"📈 Tendances - {selected_zone}")
+    
+    trend_periods = {"3 mois": 91, "12 mois": 365, "3 ans": 3 * 365}
+    trend_period = st.radio("Période", list(trend_periods), horizontal=True, key="trend_period")
+    daily_trend = get_daily_trend([selected_zone], today - timedelta(days=trend_periods[trend_period]), today)
+    
+    if daily_trend['volume'].sum() > 0:
+        st.line_chart(daily_trend.set_index('date').rename(columns={
+            'volume': 'Ventes', 'avg_7': 'Moyenne 7 j. ouvrés', 'avg_20': 'Moyenne 20 j. ouvrés'
+        }))
+        
+        monthly_trend = get_monthly_trend([selected_zone], current_year - 1, current_year).tail(13)
+        monthly_trend['Mois'] = [f"{month:02d}/{year}" for year, month in zip(monthly_trend['year'], monthly_trend['month'])]
+        st.dataframe(
+            monthly_trend[['Mois', 'volume', 'mom_pct', 'previous_year', 'yoy_pct']].rename(columns={
+                'volume': 'Réalisé', 'mom_pct': 'vs M-1 %', 'previous_year': 'N-1', 'yoy_pct': 'vs N-1 %'
+            }),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("Aucune vente sur la période")
 
-def save_monthly_target(zone, year, month, target):
-    """Enregistre l'objectif mensuel pour une zone"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO monthly_targets (zone, year, month, target)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(zone, year, month) DO UPDATE SET target=excluded.target
-        ''', (zone, year, month, target))
-        conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erreur : {e}")
-        return False
-    finally:
-        conn.close()
+# ==================== SAISIE VENTES ====================
 
-def save_ytd_init(zone, year, january_volume):
-    """Enregistre le volume de janvier initial"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO ytd_init (zone, year, january_volume)
-            VALUES (?, ?, ?)
-            ON CONFLICT(zone, year) DO UPDATE SET january_volume=excluded.january_volume
-        ''', (zone, year, january_volume))
-        conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Erreur : {e}")
-        return False
-    finally:
-        conn.close()
+@traced_fragment
+def render_sales_entry(today):
+    """Vue Saisie Ventes : saisie unitaire, grille groupée, import en masse"""
+    st.subheader("✍️ Saisie des Ventes Quotidiennes")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        sale_zone = st.selectbox("Zone", get_zones(), key="sale_zone")
+        sale_date = st.date_input("Date", value=today, max_value=today)
+    
+    with col2:
+        sale_volume = st.number_input("Volume de ventes", min_value=0, step=1)
+        
+        if not get_working_day_calendar(sale_date.year, sale_zone).is_working(sale_date):
+            st.warning("⚠️ Ce jour est un weekend ou un jour férié")
+    
+    if st.button("💾 Enregistrer", type="primary", use_container_width=True):
+        if sale_volume >= 0:
+            sale_datetime = datetime.combine(sale_date, datetime.min.time())
+            try:
+                save_sale(sale_zone, sale_datetime, sale_volume)
+            except sqlite3.Error as e:
+                st.error(f"Erreur lors de l'enregistrement : {e}")
+            else:
+                st.success(f"✅ {sale_volume} ventes enregistrées pour {sale_zone} le {sale_date.strftime('%d/%m/%Y')}")
+                st.rerun()
+        else:
+            st.error("Le volume doit être positif")
 
-def get_sales_data(zone, year, month):
-    """Récupère les ventes pour une zone et un mois donné"""
-    conn = get_db_connection()
-    query = '''
-        SELECT date, volume 
-        FROM sales 
-        WHERE zone = ? 
-        AND strftime('%Y', date) = ? 
-        AND strftime('%m', date) = ?
-        ORDER BY date
-    '''
-    df = pd.read_sql_query(query, conn, params=(zone, str(year), f'{month:02d}'))
-    conn.close()
-    if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
-    return df
+    st.markdown("---")
+    st.subheader("🗓️ Saisie Groupée")
+    st.caption("Une cellule vidée supprime la vente. Seules les cellules modifiées sont enregistrées, "
+               "en une seule transaction.")
 
-def get_all_sales_ytd(zone, year, end_date):
-    """Récupère TOUTES les ventes YTD (janvier à date actuelle)"""
-    conn = get_db_connection()
-    query = '''
-        SELECT COALESCE(SUM(volume), 0) as total
-        FROM sales
-        WHERE zone = ? 
-        AND strftime('%Y', date) = ?
-        AND date <= ?
-    '''
-    df = pd.read_sql_query(query, conn, params=(zone, str(year), end_date.strftime('%Y-%m-%d')))
-    conn.close()
-    
-    return df['total'].iloc[0] if not df.empty else 0
+    col1, col2 = st.columns(2)
+    with col1:
+        grid_period = st.radio("Période", ["Semaine", "Mois"], horizontal=True, key="grid_period")
+    with col2:
+        grid_date = datetime.combine(st.date_input("Jour de la période", value=today, max_value=today,
+                                                   key="grid_date"), datetime.min.time())
 
-def get_monthly_target(zone, year, month):
-    """Récupère l'objectif mensuel"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT target FROM monthly_targets
-        WHERE zone = ? AND year = ? AND month = ?
-    ''', (zone, year, month))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else 0
+    if grid_period == "Semaine":
+        grid_start = grid_date - timedelta(days=grid_date.weekday())
+        grid_end = grid_start + timedelta(days=6)
+    else:
+        grid_start = grid_date.replace(day=1)
+        grid_end = grid_date.replace(day=calendar.monthrange(grid_date.year, grid_date.month)[1])
+    grid_end = min(grid_end, today)
 
-def get_ytd_init(zone, year):
-    """Récupère le volume de janvier initial (manuel)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT january_volume FROM ytd_init
-        WHERE zone = ? AND year = ?
-    ''', (zone, year))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else 0
+    sales_grid = get_sales_grid(get_zones(), grid_start, grid_end)
+    # Formulaire : l'édition des cellules ne relance pas le script, un seul rerun à l'enregistrement
+    with st.form(f"sales_grid_{grid_start:%Y%m%d}_{grid_end:%Y%m%d}"):
+        edited_grid = st.data_editor(
+            sales_grid,
+            use_container_width=True,
+            num_rows="fixed",
+            column_config={
+                'date': st.column_config.DateColumn("Date", format="ddd DD/MM/YYYY", disabled=True),
+                **{zone: st.column_config.NumberColumn(zone, min_value=0, step=1, format="%d")
+                   for zone in sales_grid.columns},
+            },
+        )
+        if st.form_submit_button("💾 Enregistrer la grille", type="primary", use_container_width=True):
+            try:
+                report = save_sales_grid(sales_grid, edited_grid)
+            except (ValueError, sqlite3.Error) as e:
+                st.error(f"Erreur lors de l'enregistrement : {e}")
+            else:
+                if report['saved'] or report['deleted']:
+                    st.rerun()
+                st.info("Aucune modification")
 
-def calculate_ytd(zone, current_date):
-    """Calcule le YTD CORRECT : Janvier manuel + toutes les ventes depuis février"""
-    year = current_date.year
-    
-    # Récupérer le janvier manuel
-    january_manual = get_ytd_init(zone, year)
-    
-    # Récupérer TOUTES les ventes saisies depuis février jusqu'à aujourd'hui
-    conn = get_db_connection()
-    query = '''
-        SELECT COALESCE(SUM(volume), 0) as total
-        FROM sales
-        WHERE zone = ? 
-        AND strftime('%Y', date) = ?
-        AND strftime('%m', date) >= '02'
-        AND date <= ?
-    '''
-    df = pd.read_sql_query(query, conn, params=(zone, str(year), current_date.strftime('%Y-%m-%d')))
-    conn.close()
-    
-    cumul_from_feb = df['total'].iloc[0] if not df.empty else 0
-    
-    # YTD = Janvier manuel + Cumul depuis février
-    total_ytd = january_manual + cumul_from_feb
-    
-    return total_ytd
+    with st.expander("📥 Import en masse (CSV / Excel)"):
+        st.caption("Colonnes attendues : zone, date (AAAA-MM-JJ ou JJ/MM/AAAA), volume. "
+                   "Les ventes existantes pour une même zone et date sont remplacées.")
+        sales_file = st.file_uploader("Fichier de ventes", type=['csv', 'xlsx'], key="sales_import")
+        
+        if sales_file is not None and st.button("📥 Importer", type="primary"):
+            try:
+                report = import_sales_file(sales_file, sales_file.name)
+            except (ValueError, ImportError, sqlite3.Error) as e:
+                st.error(f"Import annulé : {e}")
+            else:
+                st.success(f"✅ {report['imported']:,} lignes importées en {report['seconds']:.2f} s "
+                           f"({report['rows_per_second']:,.0f} lignes/s)")
+                if not report['rejected'].empty:
+                    st.warning(f"⚠️ {len(report['rejected']):,} lignes rejetées")
+                    st.dataframe(report['rejected'], use_container_width=True)
+    
+    st.markdown("---")
+    st.subheader("📜 Historique Récent")
+    
+    recent_sales = get_recent_sales(20).rename(columns={'zone': 'Zone', 'date': 'Date', 'volume': 'Volume'})
+    
+    if not recent_sales.empty:
+        recent_sales['Date'] = pd.to_datetime(recent_sales['Date']).dt.strftime('%d/%m/%Y')
+        st.dataframe(recent_sales, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucune vente enregistrée")
 
-def get_week_number(date):
-    """Retourne le numéro de semaine dans le mois (W-1, W-2, etc.)"""
-    first_day = date.replace(day=1)
-    days_from_start = (date - first_day).days
-    return (days_from_start // 7) + 1
+# ==================== CONFIGURATION ====================
 
-def calculate_weekly_data(zone, year, month):
-    """Calcule les données par semaine EN JOURS OUVRABLES"""
-    sales_df = get_sales_data(zone, year, month)
+@traced_fragment
+def render_configuration(today):
+    """Vue Configuration : objectifs, janvier manuel, arborescence des zones"""
+    current_year, current_month = today.year, today.month
     
-    if sales_df.empty:
-        return pd.DataFrame()
+    st.subheader("⚙️ Configuration des Objectifs")
     
-    sales_df['week'] = sales_df['date'].apply(get_week_number)
-    weekly = sales_df.groupby('week')['volume'].sum().reset_index()
-    weekly.columns = ['Semaine', 'Réalisé']
+    st.markdown("### 🎯 Objectifs Mensuels")
     
-    monthly_target = get_monthly_target(zone, year, month)
-    working_days_month = get_working_days_in_month(year, month)
-    total_working_days = len(working_days_month)
+    config_zone = st.selectbox("Zone", get_zones(), key="config_zone")
     
-    if total_working_days == 0:
-        weekly['Target'] = 0
-    else:
-        weekly_targets = []
-        holidays = get_public_holidays(year)
-        custom_holidays = get_custom_holidays()
-        all_holidays = holidays.union(custom_holidays)
-        
-        for week_num in weekly['Semaine']:
-            week_dates = sales_df[sales_df['week'] == week_num]['date'].unique()
-            week_working_days = sum(1 for d in week_dates if is_working_day(pd.Timestamp(d).to_pydatetime(), all_holidays))
-            week_target = (monthly_target / total_working_days) * week_working_days
-            weekly_targets.append(int(week_target))
-        
-        weekly['Target'] = weekly_targets
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        target_year = st.number_input("Année", min_value=2024, max_value=2030, value=current_year)
+    with col2:
+        target_month = st.number_input("Mois", min_value=1, max_value=12, value=current_month)
+    with col3:
+        target_value = st.number_input("Objectif", min_value=0, step=10)
     
-    weekly['Delta'] = weekly['Réalisé'] - weekly['Target']
-    weekly['Semaine'] = weekly['Semaine'].apply(lambda x: f'W-{x}')
+    selected_working_days = len(get_working_days_in_month(target_year, target_month, config_zone))
+    st.info(f"ℹ️ Ce mois compte {selected_working_days} jours ouvrables")
     
-    return weekly
+    if st.button("💾 Enregistrer Target", type="primary"):
+        try:
+            save_monthly_target(config_zone, target_year, target_month, target_value)
+        except sqlite3.Error as e:
+            st.error(f"Erreur : {e}")
+        else:
+            st.success(f"✅ Objectif de {target_value:,} enregistré pour {config_zone}")
+            st.rerun()
+    
+    st.markdown("---")
+    st.markdown("### 📅 Initialisation YTD (Janvier Manuel)")
+    st.caption("⚠️ Saisissez ici le volume de janvier UNIQUEMENT si vous n'avez pas saisi les ventes jour par jour en janvier")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        ytd_zone = st.selectbox("Zone", get_zones(), key="ytd_zone")
+        ytd_year = st.number_input("Année", min_value=2024, max_value=2030, value=current_year, key="ytd_year")
+    with col2:
+        ytd_volume = st.number_input("Volume Janvier", min_value=0, step=10)
+    
+    if st.button("💾 Enregistrer YTD Initial", type="primary"):
+        try:
+            save_ytd_init(ytd_zone, ytd_year, ytd_volume)
+        except sqlite3.Error as e:
+            st.error(f"Erreur : {e}")
+        else:
+            st.success(f"✅ Volume de janvier ({ytd_volume:,}) enregistré pour {ytd_zone}")
+            st.rerun()
+    
+    st.markdown("---")
+    st.markdown("### 📊 Vue d'Ensemble des Targets")
+    
+    all_targets = get_all_targets().rename(
+        columns={'zone': 'Zone', 'year': 'Année', 'month': 'Mois', 'target': 'Objectif'})
+    
+    if not all_targets.empty:
+        all_targets['Mois'] = all_targets['Mois'].apply(lambda x: f"{x:02d}")
+        st.dataframe(all_targets, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun objectif configuré")
+    
+    st.markdown("---")
+    st.markdown("### 🌳 Zones et Regroupements")
+    
+    zone_tree = get_zone_tree()
+    groups = zone_tree.loc[zone_tree['kind'] != 'zone', 'name'].tolist()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        new_zone_name = st.text_input("Nom", key="new_zone_name")
+    with col2:
+        new_zone_parent = st.selectbox("Rattachée à", groups, key="new_zone_parent")
+    with col3:
+        new_zone_country = st.selectbox("Jours fériés", list(COUNTRIES), format_func=COUNTRIES.get,
+                                        key="new_zone_country")
+    with col4:
+        new_zone_consolidated = st.checkbox("Consolidée dans le parent", value=True, key="new_zone_consolidated")
+    
+    if st.button("➕ Ajouter la zone"):
+        if not new_zone_name.strip():
+            st.error("Le nom de la zone est obligatoire")
+        elif add_zone(new_zone_name.strip(), new_zone_parent, consolidated=new_zone_consolidated,
+                      country=new_zone_country):
+            st.success(f"✅ Zone {new_zone_name.strip()} ajoutée sous {new_zone_parent}")
+            st.rerun()
+        else:
+            st.warning("⚠️ Cette zone existe déjà")
+    
+    leaf_zones = zone_tree.loc[zone_tree['kind'] == 'zone', 'name'].tolist()
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        country_zone = st.selectbox("Zone", leaf_zones, key="country_zone")
+    with col2:
+        zone_country = zone_tree.loc[zone_tree['name'] == country_zone, 'country'].iloc[0]
+        new_country = st.selectbox("Jours fériés suivis", list(COUNTRIES), format_func=COUNTRIES.get,
+                                   index=list(COUNTRIES).index(zone_country) if zone_country in COUNTRIES else 0,
+                                   key=f"country_of_{country_zone}")
+    with col3:
+        st.write("")
+        if st.button("💾 Changer le pays", key="save_zone_country"):
+            set_zone_country(country_zone, new_country)
+            st.success(f"✅ {country_zone} suit désormais les jours fériés : {COUNTRIES[new_country]}")
+            st.rerun()
+    
+    st.dataframe(pd.DataFrame({
+        'Zone': ['    ' * depth + name for depth, name in zip(zone_tree['depth'], zone_tree['name'])],
+        'Type': zone_tree['kind'],
+        'Consolidée': np.where(zone_tree['consolidated'] == 1, "✅", "—"),
+        'Jours fériés': zone_tree['country'].map(COUNTRIES).where(zone_tree['kind'] == 'zone', "—"),
+    }), use_container_width=True, hide_index=True)
+
+# ==================== JOURS FÉRIÉS ====================
 
-def calculate_run_rate(zone, year, month, current_date):
-    """Calcule le run-rate dynamique EN JOURS OUVRABLES"""
-    monthly_target = get_monthly_target(zone, year, month)
-    if monthly_target == 0:
-        return 0
+@traced_fragment
+def render_holidays(today):
+    """Vue Jours Fériés : jours fériés de chaque zone, jours personnalisés et calendrier du mois"""
+    current_year, current_month = today.year, today.month
+    
+    st.subheader("📅 Gestion des Jours Fériés")
+    
+    holiday_zone = st.selectbox("Zone", get_zones(), key="holiday_zone")
+    working_calendar = get_working_day_calendar(current_year, holiday_zone)
+    country = get_holiday_cache().country(holiday_zone)
+    
+    st.markdown(f"### 🎉 Jours Fériés Standards ({COUNTRIES[country]})")
+    public_holidays = "\n".join(f"- {day.strftime('%d/%m')} ({name})"
+                                for day, name in list_public_holidays(current_year, country))
+    st.info(f"Jours fériés inclus automatiquement en {current_year} :\n{public_holidays}")
+    
+    st.markdown("---")
+    st.markdown("### ➕ Ajouter un Jour Férié Personnalisé")
+    st.caption("Par exemple : fermeture annuelle, pont, événement exceptionnel...")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        custom_holiday_date = st.date_input("Date du jour férié", value=today)
+    with col2:
+        custom_holiday_desc = st.text_input("Description", placeholder="Ex: Fermeture annuelle")
+    with col3:
+        custom_holiday_zone = st.selectbox("Zone concernée", [None] + get_zones(),
+                                           format_func=lambda zone: zone or "Toutes les zones")
+    
+    if st.button("➕ Ajouter", type="primary"):
+        custom_datetime = datetime.combine(custom_holiday_date, datetime.min.time())
+        if add_custom_holiday(custom_datetime, custom_holiday_desc, custom_holiday_zone):
+            st.success(f"✅ Jour férié ajouté : {custom_holiday_date.strftime('%d/%m/%Y')}")
+            st.rerun()
+        else:
+            st.error("Ce jour férié existe déjà")
     
-    sales_df = get_sales_data(zone, year, month)
-    realized = sales_df['volume'].sum() if not sales_df.empty else 0
+    st.markdown("---")
+    st.markdown("### 📋 Jours Fériés Personnalisés")
     
-    last_day_num = calendar.monthrange(year, month)[1]
-    last_date = datetime(year, month, last_day_num)
+    custom_holidays_df = get_custom_holidays_table().rename(
+        columns={'date': 'Date', 'description': 'Description', 'zone': 'Zone'})
     
-    holidays = get_public_holidays(year)
-    custom_holidays = get_custom_holidays()
-    all_holidays = holidays.union(custom_holidays)
+    if not custom_holidays_df.empty:
+        custom_holidays_df['Date'] = pd.to_datetime(custom_holidays_df['Date']).dt.strftime('%d/%m/%Y')
+        custom_holidays_df['Zone'] = custom_holidays_df['Zone'].fillna("Toutes les zones")
+        st.dataframe(custom_holidays_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun jour férié personnalisé")
     
-    working_days_remaining = count_working_days(current_date, last_date, all_holidays)
+    st.markdown("---")
+    st.markdown("### 📆 Calendrier du Mois en Cours")
     
-    if working_days_remaining <= 0:
-        return 0
+    working_days_list = working_calendar.working_days_in_month(current_year, current_month)
     
-    remaining_volume = monthly_target - realized
-    run_rate = remaining_volume / working_days_remaining
+    cal_col1, cal_col2 = st.columns(2)
+    with cal_col1:
+        st.metric("Jours Ouvrables", len(working_days_list))
+    with cal_col2:
+        total_days = calendar.monthrange(current_year, current_month)[1]
+        st.metric("Jours Non-Ouvrables", total_days - len(working_days_list))
     
-    return max(0, run_rate)
-
-def get_group_consolidation(year, month, current_date):
-    """Calcule la consolidation groupe (toutes filiales SAUF Espagne)"""
-    filiales = ["BEFR", "BENL", "France"]  # Espagne exclue
-    
-    total_target = 0
-    total_realized = 0
-    total_ytd = 0
-    
-    for filiale in filiales:
-        target = get_monthly_target(filiale, year, month)
-        sales_df = get_sales_data(filiale, year, month)
-        realized = sales_df['volume'].sum() if not sales_df.empty else 0
-        ytd = calculate_ytd(filiale, current_date)
-        
-        total_target += target
-        total_realized += realized
-        total_ytd += ytd
-    
-    return {
-        'target': total_target,
-        'realized': total_realized,
-        'ytd': total_ytd,
-        'delta': total_realized - total_target
-    }
+    month_days = pd.date_range(datetime(current_year, current_month, 1), periods=total_days, freq='D')
+    is_working = working_calendar.is_working(month_days)
+    
+    cal_df = pd.DataFrame({
+        'Date': month_days.strftime('%d/%m/%Y'),
+        'Jour': month_days.strftime('%A'),
+        'Type': np.where(is_working, "✅ Ouvrable", "❌ Non-ouvrable")
+    })
+    st.dataframe(cal_df, use_container_width=True, hide_index=True)
 
 # ==================== INTERFACE STREAMLIT ====================
 
-def main():
-    init_database()
+VIEWS = {
+    "📈 Dashboard": render_dashboard,
+    "✍️ Saisie Ventes": render_sales_entry,
+    "⚙️ Configuration": render_configuration,
+    "📅 Jours Fériés": render_holidays,
+}
+
+def render_app():
+    # Schéma migré au premier rerun du processus seulement
+    ensure_schema()
+    # Précalcul du dashboard en arrière-plan (un seul thread par processus)
+    start_snapshot_worker()
+    # Alertes de run-rate réévaluées à chaque écriture (un seul moteur par processus)
+    start_alert_engine()
     
     st.title("📊 Pilotage Commercial Intransigeant")
     st.caption("🔵 Calculs basés sur jours ouvrables (hors weekends et jours fériés)")
     
-    today = datetime.now()
-    current_year = today.year
-    current_month = today.month
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Dashboard", "✍️ Saisie Ventes", "⚙️ Configuration", "📅 Jours Fériés"])
-    
-    # ==================== DASHBOARD ====================
-    with tab1:
-        st.subheader("Tableau de Bord")
-        
-        # CONSOLIDATION GROUPE EN HAUT
-        st.markdown('<div class="group-header">🌍 CONSOLIDATION GROUPE (BEFR + BENL + France)</div>', unsafe_allow_html=True)
-        
-        group_data = get_group_consolidation(current_year, current_month, today)
-        
-        col_g1, col_g2, col_g3, col_g4 = st.columns(4)
-        with col_g1:
-            st.metric("🎯 Target Groupe", f"{group_data['target']:,}")
-        with col_g2:
-            delta_color = "normal" if group_data['delta'] >= 0 else "inverse"
-            st.metric("✅ Réalisé Groupe", f"{group_data['realized']:,}", 
-                     delta=f"{group_data['delta']:+,}", delta_color=delta_color)
-        with col_g3:
-            st.metric("📅 YTD Groupe", f"{group_data['ytd']:,}")
-        with col_g4:
-            if group_data['target'] > 0:
-                completion = (group_data['realized'] / group_data['target']) * 100
-                st.metric("📊 Taux Réalisation", f"{completion:.1f}%")
-            else:
-                st.metric("📊 Taux Réalisation", "N/A")
-        
-        st.markdown("---")
-        
-        # DÉTAIL PAR ZONE
-        st.subheader("📋 Détail par Zone")
-        selected_zone = st.selectbox("Sélectionner une zone", get_zones(), key="dashboard_zone")
-        
-        holidays = get_public_holidays(current_year)
-        custom_holidays = get_custom_holidays()
-        all_holidays = holidays.union(custom_holidays)
-        
-        if is_working_day(today, all_holidays):
-            st.success("✅ Aujourd'hui est un jour ouvrable")
-        else:
-            st.warning("⚠️ Aujourd'hui est un weekend ou jour férié")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        monthly_target = get_monthly_target(selected_zone, current_year, current_month)
-        sales_df = get_sales_data(selected_zone, current_year, current_month)
-        monthly_realized = sales_df['volume'].sum() if not sales_df.empty else 0
-        monthly_delta = monthly_realized - monthly_target
-        
-        with col1:
-            st.metric("🎯 Target Mensuel", f"{monthly_target:,}")
-        with col2:
-            delta_color = "normal" if monthly_delta >= 0 else "inverse"
-            st.metric("✅ Réalisé", f"{monthly_realized:,}", delta=f"{monthly_delta:+,}", delta_color=delta_color)
-        with col3:
-            ytd = calculate_ytd(selected_zone, today)
-            st.metric("📅 YTD", f"{ytd:,}")
-        
-        # Afficher le détail du calcul YTD
-        january_manual = get_ytd_init(selected_zone, current_year)
-        feb_onwards = ytd - january_manual
-        st.caption(f"ℹ️ YTD = Janvier manuel ({january_manual:,}) + Février à aujourd'hui ({feb_onwards:,})")
-        
-        st.markdown("---")
-        run_rate = calculate_run_rate(selected_zone, current_year, current_month, today)
-        
-        working_days_total = len(get_working_days_in_month(current_year, current_month))
-        last_day_num = calendar.monthrange(current_year, current_month)[1]
-        last_date = datetime(current_year, current_month, last_day_num)
-        working_days_left = count_working_days(today, last_date, all_holidays)
-        working_days_passed = working_days_total - working_days_left
-        
-        col_rr1, col_rr2, col_rr3 = st.columns(3)
-        with col_rr1:
-            st.metric("🔥 Run-Rate Quotidien", f"{run_rate:.1f} ventes/jour")
-        with col_rr2:
-            st.metric("⏱️ Jours Ouvrables Restants", working_days_left)
-        with col_rr3:
-            st.metric("📆 Jours Ouvrables Total", f"{working_days_passed}/{working_days_total}")
-        
-        if run_rate > 0 and working_days_passed > 0:
-            avg_daily = monthly_realized / working_days_passed
-            if run_rate > avg_daily * 1.2:
-                st.error(f"🚨 ATTENTION : Le run-rate nécessaire ({run_rate:.1f}) est {((run_rate/avg_daily-1)*100):.0f}% supérieur à votre moyenne actuelle ({avg_daily:.1f})")
-            elif run_rate > avg_daily:
-                st.warning(f"⚠️ Le run-rate nécessaire ({run_rate:.1f}) est supérieur à votre moyenne ({avg_daily:.1f})")
-            else:
-                st.success(f"✅ Objectif atteignable : continuez au rythme actuel de {avg_daily:.1f} ventes/jour")
-        
-        st.markdown("---")
-        st.subheader("📊 Performance Hebdomadaire")
-        
-        weekly_df = calculate_weekly_data(selected_zone, current_year, current_month)
-        
-        if not weekly_df.empty:
-            def color_delta(val):
-                color = '#28a745' if val >= 0 else '#dc3545'
-                return f'color: {color}; font-weight: bold'
-            
-            styled_weekly = weekly_df.style.applymap(color_delta, subset=['Delta'])
-            st.dataframe(styled_weekly, use_container_width=True, hide_index=True)
-        else:
-            st.info("Aucune donnée hebdomadaire disponible")
-        
-        st.markdown("---")
-        st.subheader("📅 Résumé Mensuel")
-        
-        monthly_summary = pd.DataFrame({
-            'Indicateur': ['Target', 'Réalisé', 'Delta', 'Taux de Réalisation', 'Jours Ouvrables'],
-            'Valeur': [
-                f"{monthly_target:,}",
-                f"{monthly_realized:,}",
-                f"{monthly_delta:+,}",
-                f"{(monthly_realized/monthly_target*100):.1f}%" if monthly_target > 0 else "N/A",
-                f"{working_days_passed}/{working_days_total}"
-            ]
-        })
-        
-        st.dataframe(monthly_summary, use_container_width=True, hide_index=True)
-        
-        # TABLE RÉCAPITULATIVE TOUTES ZONES
-        st.markdown("---")
-        st.subheader("📊 Vue d'Ensemble - Toutes les Zones")
-        
-        all_zones_data = []
-        for zone in get_zones():
-            target = get_monthly_target(zone, current_year, current_month)
-            sales = get_sales_data(zone, current_year, current_month)
-            realized = sales['volume'].sum() if not sales.empty else 0
-            delta = realized - target
-            ytd_zone = calculate_ytd(zone, today)
-            completion = (realized / target * 100) if target > 0 else 0
-            
-            all_zones_data.append({
-                'Zone': zone,
-                'Target': target,
-                'Réalisé': realized,
-                'Delta': delta,
-                'YTD': ytd_zone,
-                'Taux %': f"{completion:.1f}%"
-            })
-        
-        zones_df = pd.DataFrame(all_zones_data)
-        
-        def color_row(row):
-            if row['Delta'] >= 0:
-                return ['background-color: #d4edda'] * len(row)
-            else:
-                return ['background-color: #f8d7da'] * len(row)
-        
-        styled_zones = zones_df.style.apply(color_row, axis=1)
-        st.dataframe(styled_zones, use_container_width=True, hide_index=True)
-    
-    # ==================== SAISIE VENTES ====================
-    with tab2:
-        st.subheader("✍️ Saisie des Ventes Quotidiennes")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            sale_zone = st.selectbox("Zone", get_zones(), key="sale_zone")
-            sale_date = st.date_input("Date", value=today, max_value=today)
-        
-        with col2:
-            sale_volume = st.number_input("Volume de ventes", min_value=0, step=1)
-            
-            sale_datetime = datetime.combine(sale_date, datetime.min.time())
-            holidays = get_public_holidays(current_year)
-            custom_holidays = get_custom_holidays()
-            all_holidays = holidays.union(custom_holidays)
-            
-            if not is_working_day(sale_datetime, all_holidays):
-                st.warning("⚠️ Ce jour est un weekend ou un jour férié")
-        
-        if st.button("💾 Enregistrer", type="primary", use_container_width=True):
-            if sale_volume >= 0:
-                sale_datetime = datetime.combine(sale_date, datetime.min.time())
-                if save_sale(sale_zone, sale_datetime, sale_volume):
-                    st.success(f"✅ {sale_volume} ventes enregistrées pour {sale_zone} le {sale_date.strftime('%d/%m/%Y')}")
-                    st.rerun()
-            else:
-                st.error("Le volume doit être positif")
-        
-        st.markdown("---")
-        st.subheader("📜 Historique Récent")
-        
-        conn = get_db_connection()
-        recent_sales = pd.read_sql_query('''
-            SELECT zone as Zone, date as Date, volume as Volume
-            FROM sales
-            ORDER BY date DESC, zone
-            LIMIT 20
-        ''', conn)
-        conn.close()
-        
-        if not recent_sales.empty:
-            recent_sales['Date'] = pd.to_datetime(recent_sales['Date']).dt.strftime('%d/%m/%Y')
-            st.dataframe(recent_sales, use_container_width=True, hide_index=True)
-        else:
-            st.info("Aucune vente enregistrée")
-    
-    # ==================== CONFIGURATION ====================
-    with tab3:
-        st.subheader("⚙️ Configuration des Objectifs")
-        
-        st.markdown("### 🎯 Objectifs Mensuels")
-        
-        config_zone = st.selectbox("Zone", get_zones(), key="config_zone")
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            target_year = st.number_input("Année", min_value=2024, max_value=2030, value=current_year)
-        with col2:
-            target_month = st.number_input("Mois", min_value=1, max_value=12, value=current_month)
-        with col3:
-            target_value = st.number_input("Objectif", min_value=0, step=10)
-        
-        selected_working_days = len(get_working_days_in_month(target_year, target_month))
-        st.info(f"ℹ️ Ce mois compte {selected_working_days} jours ouvrables")
-        
-        if st.button("💾 Enregistrer Target", type="primary"):
-            if save_monthly_target(config_zone, target_year, target_month, target_value):
-                st.success(f"✅ Objectif de {target_value:,} enregistré pour {config_zone}")
-                st.rerun()
-        
-        st.markdown("---")
-        st.markdown("### 📅 Initialisation YTD (Janvier Manuel)")
-        st.caption("⚠️ Saisissez ici le volume de janvier UNIQUEMENT si vous n'avez pas saisi les ventes jour par jour en janvier")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            ytd_zone = st.selectbox("Zone", get_zones(), key="ytd_zone")
-            ytd_year = st.number_input("Année", min_value=2024, max_value=2030, value=current_year, key="ytd_year")
-        with col2:
-            ytd_volume = st.number_input("Volume Janvier", min_value=0, step=10)
-        
-        if st.button("💾 Enregistrer YTD Initial", type="primary"):
-            if save_ytd_init(ytd_zone, ytd_year, ytd_volume):
-                st.success(f"✅ Volume de janvier ({ytd_volume:,}) enregistré pour {ytd_zone}")
-                st.rerun()
-        
-        st.markdown("---")
-        st.markdown("### 📊 Vue d'Ensemble des Targets")
-        
-        conn = get_db_connection()
-        all_targets = pd.read_sql_query('''
-            SELECT zone as Zone, year as Année, month as Mois, target as Objectif
-            FROM monthly_targets
-            ORDER BY year DESC, month DESC, zone
-        ''', conn)
-        conn.close()
-        
-        if not all_targets.empty:
-            all_targets['Mois'] = all_targets['Mois'].apply(lambda x: f"{x:02d}")
-            st.dataframe(all_targets, use_container_width=True, hide_index=True)
-        else:
-            st.info("Aucun objectif configuré")
-    
-    # ==================== JOURS FÉRIÉS ====================
-    with tab4:
-        st.subheader("📅 Gestion des Jours Fériés")
-        
-        st.markdown("### 🎉 Jours Fériés Standards")
-        st.info("""
-        Jours fériés inclus automatiquement :
-        - 1er janvier (Nouvel An)
-        - Lundi de Pâques
-        - 1er mai (Fête du Travail)
-        - Ascension
-        - Lundi de Pentecôte
-        - 14 juillet (Fête Nationale FR)
-        - 21 juillet (Fête Nationale BE)
-        - 15 août (Assomption)
-        - 1er novembre (Toussaint)
-        - 11 novembre (Armistice)
-        - 25 décembre (Noël)
-        - 26 décembre (Lendemain Noël - BE)
-        """)
-        
-        st.markdown("---")
-        st.markdown("### ➕ Ajouter un Jour Férié Personnalisé")
-        st.caption("Par exemple : fermeture annuelle, pont, événement exceptionnel...")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            custom_holiday_date = st.date_input("Date du jour férié", value=today)
-        with col2:
-            custom_holiday_desc = st.text_input("Description", placeholder="Ex: Fermeture annuelle")
-        
-        if st.button("➕ Ajouter", type="primary"):
-            custom_datetime = datetime.combine(custom_holiday_date, datetime.min.time())
-            if add_custom_holiday(custom_datetime, custom_holiday_desc):
-                st.success(f"✅ Jour férié ajouté : {custom_holiday_date.strftime('%d/%m/%Y')}")
-                st.rerun()
-            else:
-                st.error("Ce jour férié existe déjà")
-        
-        st.markdown("---")
-        st.markdown("### 📋 Jours Fériés Personnalisés")
-        
-        conn = get_db_connection()
-        custom_holidays_df = pd.read_sql_query('''
-            SELECT date as Date, description as Description
-            FROM custom_holidays
-            ORDER BY date DESC
-        ''', conn)
-        conn.close()
-        
-        if not custom_holidays_df.empty:
-            custom_holidays_df['Date'] = pd.to_datetime(custom_holidays_df['Date']).dt.strftime('%d/%m/%Y')
-            st.dataframe(custom_holidays_df, use_container_width=True, hide_index=True)
-        else:
-            st.info("Aucun jour férié personnalisé")
-        
-        st.markdown("---")
-        st.markdown("### 📆 Calendrier du Mois en Cours")
-        
-        working_days_list = get_working_days_in_month(current_year, current_month)
-        
-        cal_col1, cal_col2 = st.columns(2)
-        with cal_col1:
-            st.metric("Jours Ouvrables", len(working_days_list))
-        with cal_col2:
-            total_days = calendar.monthrange(current_year, current_month)[1]
-            st.metric("Jours Non-Ouvrables", total_days - len(working_days_list))
-        
-        first_day = datetime(current_year, current_month, 1)
-        last_day = datetime(current_year, current_month, calendar.monthrange(current_year, current_month)[1])
-        
-        cal_data = []
-        current = first_day
-        while current <= last_day:
-            holidays = get_public_holidays(current_year)
-            custom_holidays = get_custom_holidays()
-            all_holidays = holidays.union(custom_holidays)
-            
-            is_working = is_working_day(current, all_holidays)
-            day_type = "✅ Ouvrable" if is_working else "❌ Non-ouvrable"
-            cal_data.append({
-                'Date': current.strftime('%d/%m/%Y'),
-                'Jour': current.strftime('%A'),
-                'Type': day_type
-            })
-            current += timedelta(days=1)
-        
-        cal_df = pd.DataFrame(cal_data)
-        st.dataframe(cal_df, use_container_width=True, hide_index=True)
+    # Date du jour sans l'heure : les lectures en cache restent valables toute la journée
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    
+    # Seule la vue choisie est calculée ; dans une vue, les widgets d'une section ne relancent que cette section
+    view = st.radio("Vue", list(VIEWS), horizontal=True, key="view", label_visibility="collapsed")
+    VIEWS[view](today)
+    
+    with st.sidebar:
+        with st.expander("🧰 Cache des requêtes"):
+            cache_stats = get_query_cache().stats()
+            st.metric("Taux de succès", f"{cache_stats['hit_rate']:.0%}")
+            st.caption(f"{cache_stats['hits']:,} succès · {cache_stats['misses']:,} échecs · "
+                       f"{cache_stats['entries']} entrées · version des données {cache_stats['version']}")
+            latest_snapshot = get_latest_snapshot()
+            if latest_snapshot is not None:
+                snapshot_age = (datetime.now() - latest_snapshot['computed_at']).total_seconds()
+                st.caption(f"📸 Instantané du dashboard : version {latest_snapshot['version']}, "
+                           f"calculé il y a {snapshot_age:.0f} s")
+
+def main():
+    with st.sidebar:
+        debug_mode = st.checkbox("🐞 Diagnostic des performances", key="debug_mode")
+        save_traces = debug_mode and st.checkbox(f"Enregistrer dans {TRACE_FILE}", key="save_traces")
+    
+    if not debug_mode:
+        render_app()
+        return
+    
+    # Les fragments ont leur propre trace : celle-ci ne couvre que le reste du rerun
+    with start_trace("rerun", output_path=TRACE_FILE if save_traces else None) as trace:
+        render_app()
+    render_trace_panel(trace, st.sidebar)
 
 if __name__ == "__main__":
     main()
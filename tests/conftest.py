@@ -0,0 +1,24 @@
+"""Fixtures communes : base SQLite neuve par test"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pilotage.db import DB_CONFIG, configure_database, init_database  # noqa: E402
+
+@pytest.fixture
+def empty_database(tmp_path):
+    """Chemin d'une base vide (archive dans le dossier du test), configuration restaurée ensuite"""
+    saved = {key: DB_CONFIG[key] for key in ('path', 'archive_path', 'backend')}
+    path = tmp_path / 'pilotage.db'
+    configure_database(path=str(path), archive_path=str(tmp_path / 'archive'))
+    yield path
+    configure_database(**saved)
+
+@pytest.fixture
+def database(empty_database):
+    """Chemin d'une base migrée au dernier schéma"""
+    init_database()
+    return empty_database
@@ -0,0 +1,37 @@
+"""Alertes de run-rate : franchissements de seuil notifiés une fois, hors du chemin d'écriture"""
+from datetime import datetime
+
+from pilotage import cache
+from pilotage.alerts import AlertEngine, MemorySink
+from pilotage.cache import add_change_listener, get_query_cache
+from pilotage.db import get_db_connection
+from pilotage.storage import save_monthly_target, save_sale
+
+def test_alert_transition(database, monkeypatch):
+    monkeypatch.setattr(cache, '_change_listeners', [])
+    sink = MemorySink()
+    # 15 octobre 2026 : 10 jours ouvrés passés, 12 restants (BEFR)
+    engine = AlertEngine([sink], clock=lambda: datetime(2026, 10, 15))
+    add_change_listener(engine.on_changes)
+    engine.start()
+    try:
+        # Objectif sans vente : run-rate nécessaire au-delà de la moyenne réalisée (0)
+        save_monthly_target('BEFR', 2026, 10, 200)
+        assert engine.wait_idle(10)
+        # 180 réalisés : 18/jour contre 20/12 nécessaires
+        save_sale('BEFR', datetime(2026, 10, 1), 180)
+        version = get_query_cache().current_version()
+        assert engine.wait_idle(10)
+        # Même niveau : rien de plus
+        save_sale('BEFR', datetime(2026, 10, 2), 5)
+        assert engine.wait_idle(10)
+    finally:
+        engine.stop(10)
+
+    assert engine.last_error is None
+    assert [(alert['zone'], alert['previous_level'], alert['level']) for alert in sink.alerts] == [
+        ('BEFR', 'ok', 'critical'), ('BEFR', 'critical', 'ok')]
+    with get_db_connection() as conn:
+        assert conn.execute('SELECT zone, year, month, level FROM alert_state').fetchall() == [('BEFR', 2026, 10, 'ok')]
+    # L'état des alertes n'invalide pas les lectures en cache
+    assert get_query_cache().current_version() == version + 1
@@ -0,0 +1,49 @@
+"""Archive Parquet des années closes : lectures fusionnées identiques avant et après archivage"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pilotage.archive import archive_year, get_archived_years, read_partition_summary
+from pilotage.db import get_db_connection
+from pilotage.repository import get_repository
+from pilotage.storage import get_all_targets, save_monthly_target, save_ytd_init
+from pilotage.trends import get_daily_trend, get_monthly_trend
+
+pytest.importorskip('pyarrow')
+
+ZONES = ['BEFR', 'France']
+
+def _reads():
+    return {
+        'monthly_trend': get_monthly_trend(ZONES, 2025, 2026),
+        'daily_trend': get_daily_trend(ZONES, datetime(2024, 12, 1), datetime(2025, 1, 31)),
+        'targets': get_all_targets().reset_index(drop=True),
+    }
+
+def test_round_trip(database):
+    rng = np.random.default_rng(0)
+    days = pd.bdate_range('2024-01-01', '2026-10-14')
+    get_repository().save_sales([(zone, day.strftime('%Y-%m-%d'), int(volume))
+                                 for zone in ZONES for day, volume in zip(days, rng.integers(0, 30, len(days)))])
+    for year in (2024, 2025, 2026):
+        save_monthly_target('BEFR', year, 3, 300 + year)
+    save_ytd_init('France', 2025, 123)
+    before = _reads()
+
+    archive_year(2024)
+    archive_year(2025)
+
+    assert get_archived_years() == [2024, 2025]
+    summary = read_partition_summary(2025, 'France')
+    assert summary['january_manual'] == 123
+    with get_db_connection() as conn:
+        assert conn.execute('SELECT MIN(date) FROM sales').fetchone() == ('2026-01-01',)
+    after = _reads()
+    for name, frame in before.items():
+        pd.testing.assert_frame_equal(after[name], frame, obj=name)
+
+def test_open_year_is_refused(database):
+    with pytest.raises(ValueError, match="n'est pas close"):
+        archive_year(datetime.now().year)
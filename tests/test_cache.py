@@ -0,0 +1,56 @@
+"""Cache des lectures : invalidation par version des données et sonde des écritures externes"""
+import threading
+
+from pilotage.cache import QueryCache
+
+def test_entries_live_until_bump():
+    cache = QueryCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute(('f',), compute) == 1
+    assert cache.get_or_compute(('f',), compute) == 1
+    cache.bump()
+    assert cache.get_or_compute(('f',), compute) == 2
+    assert cache.stats()['hits'] == 1
+
+def test_probe_counts_an_external_write_once():
+    token = [0]
+    cache = QueryCache(probe_interval=0)
+    cache.set_version_probe(lambda: token[0])
+    cache.current_version()
+    version = cache.current_version()
+
+    token[0] = 1  # validation d'un autre processus
+    barrier = threading.Barrier(8)
+
+    def check():
+        barrier.wait()
+        cache.current_version()
+
+    threads = [threading.Thread(target=check) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.current_version() == version + 1
+
+def test_local_write_is_not_counted_by_the_probe():
+    token = [0]
+    cache = QueryCache(probe_interval=0)
+    cache.set_version_probe(lambda: token[0])
+    version = cache.current_version()
+    token[0] = 1
+    cache.bump(local=True)
+    assert cache.current_version() == version + 1
+
+def test_probe_is_rate_limited():
+    probes = []
+    cache = QueryCache(probe_interval=60)
+    cache.set_version_probe(lambda: probes.append(1) or 0)
+    for _ in range(10):
+        cache.current_version()
+    assert len(probes) == 1
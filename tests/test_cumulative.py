@@ -0,0 +1,44 @@
+"""Cumuls YTD / MTD tenus par les triggers : identiques à une reconstruction complète"""
+import random
+from datetime import date, timedelta
+
+from pilotage.db import get_db_connection, get_db_writer, rebuild_sales_cumulative
+from pilotage.repository import get_repository
+
+def _cumulative():
+    with get_db_connection() as conn:
+        return conn.execute('SELECT zone, date, ytd, mtd FROM sales_cumulative ORDER BY zone, date').fetchall()
+
+def _assert_matches_rebuild():
+    maintained = _cumulative()
+    rebuild_sales_cumulative()
+    assert maintained == _cumulative()
+
+def test_triggers_match_rebuild(database):
+    repository = get_repository()
+    rng = random.Random(0)
+    days = [date(2025, 12, 1) + timedelta(days=offset) for offset in range(120)]
+
+    # Saisies en désordre, sur deux années (janvier exclu du YTD, repris par le janvier manuel)
+    rows = [(zone, day.isoformat(), rng.randint(0, 30)) for zone in ('BEFR', 'BENL') for day in days]
+    rng.shuffle(rows)
+    repository.save_sales(rows[:150])
+    repository.save_ytd_init('BEFR', 2026, 40)
+    repository.save_sales(rows[150:])
+    _assert_matches_rebuild()
+
+    # Corrections antidatées, suppressions (y compris de clés absentes) et janvier manuel modifié
+    repository.save_sales([('BEFR', '2026-02-03', 99), ('BENL', '2025-12-15', 0)],
+                          deletions=[('BEFR', '2026-02-10'), ('BENL', '2026-03-02'), ('BENL', '2030-01-01')])
+    repository.save_ytd_init('BEFR', 2026, 55)
+    repository.save_ytd_init('BENL', 2026, 12)
+    _assert_matches_rebuild()
+
+    # Écritures par la vue de compatibilité : changement de zone, de mois et d'année
+    with get_db_writer() as conn:
+        conn.execute("INSERT INTO sales (zone, date, volume) VALUES ('France', '2026-02-02', 7)")
+        conn.execute("UPDATE sales SET zone = 'France', date = '2026-03-16' WHERE zone = 'BEFR' AND date = '2026-02-03'")
+        conn.execute("UPDATE sales SET date = '2025-11-28' WHERE zone = 'BENL' AND date = '2026-02-04'")
+        conn.execute("DELETE FROM sales WHERE zone = 'BENL' AND date >= '2026-03-20'")
+        conn.execute("DELETE FROM ytd_init WHERE zone = 'BEFR' AND year = 2026")
+    _assert_matches_rebuild()
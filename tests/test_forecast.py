@@ -0,0 +1,47 @@
+"""Prévision de fin de mois : rythme par jour ouvré, profils historiques et bandes d'atteinte"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pilotage.forecast import forecast_month_end
+from pilotage.repository import get_repository
+from pilotage.storage import save_monthly_target
+
+TODAY = datetime(2026, 10, 15)
+
+def _sell_every_working_day(zone, start, end, volume):
+    days = pd.bdate_range(start, end)
+    get_repository().save_sales([(zone, day.strftime('%Y-%m-%d'), volume) for day in days])
+
+def test_forecast_from_pace_and_profiles(database):
+    # BEFR : un an d'historique régulier ; France : seulement le mois en cours
+    _sell_every_working_day('BEFR', '2025-10-01', '2026-10-14', 10)
+    _sell_every_working_day('France', '2026-10-01', '2026-10-14', 5)
+    save_monthly_target('BEFR', 2026, 10, 200)
+    save_monthly_target('France', 2026, 10, 200)
+
+    forecast = forecast_month_end(2026, 10, TODAY, zones=['BEFR', 'France'])
+
+    # 15 octobre : 10 jours ouvrés passés sur 22 (aucun férié en octobre en Belgique et en France)
+    assert forecast['working_days_passed'].tolist() == [10, 10]
+    assert forecast['working_days_total'].tolist() == [22, 22]
+    assert forecast['realized'].tolist() == [100, 50]
+    assert forecast['pace_forecast'].tolist() == [220, 110]
+
+    befr, france = forecast.loc['BEFR'], forecast.loc['France']
+    assert befr['history_months'] >= 12
+    assert befr['p10'] <= befr['p50'] <= befr['p90']
+    assert 200 <= befr['forecast'] <= 220
+    assert 0.8 < befr['attainment_probability'] <= 1
+    # Sans historique : le rythme seul, pas de bandes ni de probabilité
+    assert france['history_months'] == 0
+    assert france['forecast'] == 110
+    assert np.isnan(france['p50']) and np.isnan(france['attainment_probability'])
+
+def test_all_zones_at_once_match_zone_by_zone(database):
+    for position, zone in enumerate(['BEFR', 'France', 'Espagne']):
+        _sell_every_working_day(zone, '2026-01-01', '2026-10-14', position + 3)
+    together = forecast_month_end(2026, 10, TODAY, zones=['BEFR', 'France', 'Espagne'])
+    for zone in together.index:
+        pd.testing.assert_frame_equal(together.loc[[zone]], forecast_month_end(2026, 10, TODAY, zones=[zone]))
@@ -0,0 +1,52 @@
+"""Jours ouvrables par zone : fériés du pays de chaque zone, personnalisés et bitmaps annuels"""
+from datetime import datetime
+
+from pilotage.holidays import (
+    WorkingDayCalendar, add_custom_holiday, count_zone_working_days, get_easter_date, get_public_holidays,
+    get_working_day_calendar, get_working_days_in_month, is_working_in_zones,
+)
+from pilotage.tracing import start_trace
+
+ZONES = ['BEFR', 'France', 'Luxembourg', 'Espagne']
+
+def test_each_zone_follows_its_country(database):
+    working = is_working_in_zones(ZONES, ['2026-07-14', '2026-07-21', '2026-06-23', '2026-10-12'])
+    assert working.tolist() == [
+        [True, False, True, True],   # BEFR : Fête nationale belge
+        [False, True, True, True],   # France : 14 juillet
+        [True, True, False, True],   # Luxembourg : Fête nationale luxembourgeoise
+        [True, True, True, False],   # Espagne : Fiesta Nacional
+    ]
+
+def test_bitmaps_match_calendars(database):
+    add_custom_holiday(datetime(2026, 12, 24), 'Réveillon', zone='BEFR')
+    add_custom_holiday(datetime(2026, 12, 31), 'Fermeture')
+
+    counts = count_zone_working_days(ZONES + ['Zone inconnue'], '2025-12-15', '2027-01-15')
+    expected = [get_working_day_calendar(2026, zone).count('2025-12-15', '2027-01-15')
+                for zone in ZONES + [None]]
+    assert counts.tolist() == expected
+    # Réveillon chômé en BEFR seulement, fermeture du 31 décembre partout
+    assert is_working_in_zones(['BEFR', 'France'], ['2026-12-24', '2026-12-31']).tolist() == [
+        [False, False], [True, False]]
+
+def test_easter_dates():
+    assert [get_easter_date(year) for year in (2024, 2025, 2026, 2038)] == [
+        datetime(2024, 3, 31), datetime(2025, 4, 20), datetime(2026, 4, 5), datetime(2038, 4, 25)]
+    # Au-delà des années autrefois codées en dur : Lundi de Pâques, Ascension et Pentecôte calculés
+    assert {datetime(2030, 4, 22), datetime(2030, 5, 30), datetime(2030, 6, 10)} <= get_public_holidays(2030, 'BE')
+
+def test_holidays_loaded_once(database):
+    get_working_day_calendar(2026, 'BEFR')
+    with start_trace('calendrier') as trace:
+        for year in (2025, 2026, 2027, 2031):
+            get_working_days_in_month(year, 5, 'France')
+    assert trace.summary()['queries'] == 0
+
+def test_working_day_calendar():
+    working_calendar = WorkingDayCalendar(get_public_holidays(2026, 'BE'))
+    assert working_calendar.is_working(['2026-07-20', '2026-07-21', '2026-07-25']).tolist() == [True, False, False]
+    assert working_calendar.count('2026-07-01', '2026-07-31') == 22
+    assert working_calendar.count('2026-07-31', '2026-07-01') == 0
+    assert working_calendar.per_month(2026).sum() == 253
+    assert working_calendar.per_week_of_month(2026, 7).tolist() == [5, 5, 4, 5, 3]
@@ -0,0 +1,38 @@
+"""Import de fichiers de ventes : lignes rejetées avec leur motif, doublons compris"""
+import io
+
+import pytest
+
+from pilotage.importer import import_sales_file
+from pilotage.db import get_db_connection
+
+CSV = '''zone;date;volume
+BEFR;2026-10-01;4
+BEFR;01/10/2026;9
+BENL;2026-10-02;-1
+BENL;2026-10-02;3
+Atlantide;2026-10-02;1
+France;31/02/2026;2
+France;2026-10-05;
+France;2026-10-05;6
+'''
+
+def test_rejection_reasons(database):
+    # Une ligne par bloc : le doublon de la ligne 2 est repéré dans un autre bloc que l'original
+    report = import_sales_file(io.BytesIO(CSV.encode()), 'ventes.csv', chunksize=1)
+
+    assert report['imported'] == 3
+    assert report['rejected']['motif'].to_dict() == {
+        3: "doublon dans le fichier",
+        4: "volume invalide",
+        6: "zone inconnue",
+        7: "date invalide",
+        8: "volume manquant ou non numérique",
+    }
+    with get_db_connection() as conn:
+        assert conn.execute('SELECT zone, date, volume FROM sales ORDER BY zone, date').fetchall() == [
+            ('BEFR', '2026-10-01', 4), ('BENL', '2026-10-02', 3), ('France', '2026-10-05', 6)]
+
+def test_empty_file(database):
+    with pytest.raises(ValueError, match="Fichier vide"):
+        import_sales_file(io.BytesIO(b''), 'ventes.csv')
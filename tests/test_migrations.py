@@ -0,0 +1,91 @@
+"""Migration d'une base au schéma d'origine jusqu'au dernier schéma"""
+import sqlite3
+
+from pilotage import migrations
+from pilotage.db import get_db_connection, rebuild_sales_cumulative
+from pilotage.repository import get_repository
+
+# Schéma de la première version de l'application (init_database de sales.py)
+BASELINE_SCHEMA = '''
+    CREATE TABLE sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        date TEXT NOT NULL,
+        volume INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(zone, date)
+    );
+    CREATE TABLE monthly_targets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        target INTEGER NOT NULL,
+        UNIQUE(zone, year, month)
+    );
+    CREATE TABLE ytd_init (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        zone TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        january_volume INTEGER NOT NULL,
+        UNIQUE(zone, year)
+    );
+    CREATE TABLE custom_holidays (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        description TEXT,
+        UNIQUE(date)
+    );
+'''
+
+SALES = [
+    ('BEFR', '2025-12-30', 4), ('BEFR', '2026-01-05', 3), ('BEFR', '2026-02-02', 5), ('BEFR', '2026-02-03', 6),
+    ('France', '2026-02-02', 8), ('Luxembourg', '2026-03-02', 2),
+    ('Ancienne zone', '2026-02-02', 9),  # zone supprimée de l'application depuis
+]
+
+def _create_baseline(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany('INSERT INTO sales (zone, date, volume) VALUES (?, ?, ?)', SALES)
+    conn.execute("INSERT INTO monthly_targets (zone, year, month, target) VALUES ('BEFR', 2026, 2, 100)")
+    conn.execute("INSERT INTO ytd_init (zone, year, january_volume) VALUES ('BEFR', 2026, 30)")
+    conn.execute("INSERT INTO custom_holidays (date, description) VALUES ('2026-05-15', 'Pont')")
+    conn.commit()
+    conn.close()
+
+def test_migrate_baseline_schema(empty_database, monkeypatch):
+    _create_baseline(empty_database)
+    # Lots minuscules : l'index des ventes par jour passe par la copie fantôme en ligne
+    monkeypatch.setattr(migrations, 'ONLINE_INDEX_BATCH_ROWS', 3)
+
+    applied = migrations.migrate()
+    assert [version for version, _ in applied] == [version for version, _, _, _ in migrations.MIGRATIONS]
+    assert migrations.migrate() == []
+
+    with get_db_connection() as conn:
+        assert conn.execute('SELECT zone, date, volume FROM sales ORDER BY zone, date').fetchall() == sorted(SALES)
+        objects = {name for name, in conn.execute('SELECT name FROM sqlite_master')}
+        triggers = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        old_zone = conn.execute("SELECT kind, consolidated, parent_id FROM zones WHERE name = 'Ancienne zone'").fetchone()
+        holidays = conn.execute('SELECT date, description, zone FROM custom_holidays').fetchall()
+        target = conn.execute("SELECT target FROM monthly_targets WHERE zone = 'BEFR'").fetchone()
+        luxembourg = conn.execute("SELECT country FROM zones WHERE name = 'Luxembourg'").fetchone()
+        ytd = conn.execute("SELECT ytd FROM sales_cumulative WHERE zone = 'BEFR' AND date = '2026-02-03'").fetchone()
+
+    assert 'idx_sales_facts_day' in objects
+    assert not objects & {'sales_text', 'sales_facts_online', 'zone_ids', 'idx_sales_cumulative_date'}
+    assert {'trg_sales_cumulative_insert', 'trg_sales_view_insert'} <= triggers
+    assert old_zone == ('zone', 0, None)  # hors arborescence, exclue des consolidations
+    assert holidays == [('2026-05-15', 'Pont', None)]
+    assert target == (100,)
+    assert luxembourg == ('LU',)
+    assert ytd == (30 + 5 + 6,)
+
+    # Cumuls amorcés à la migration puis tenus par les triggers recréés après l'échange des tables
+    get_repository().save_sales([('BEFR', '2026-02-04', 10)], deletions=[('BEFR', '2026-02-02')])
+    with get_db_connection() as conn:
+        maintained = conn.execute('SELECT * FROM sales_cumulative ORDER BY zone, date').fetchall()
+    rebuild_sales_cumulative()
+    with get_db_connection() as conn:
+        assert conn.execute('SELECT * FROM sales_cumulative ORDER BY zone, date').fetchall() == maintained
@@ -0,0 +1,33 @@
+"""Découpage en périodes : targets tirés des jours ouvrés du calendrier, pas des jours saisis"""
+from datetime import datetime
+
+import numpy as np
+
+from pilotage.periods import bucket_labels, bucket_starts, get_period_performance
+from pilotage.storage import save_monthly_target, save_sale
+
+def test_bucket_starts_and_labels():
+    days = np.array(['2026-01-01', '2026-10-07', '2026-10-08', '2026-12-31'], dtype='datetime64[D]')
+    expected = {
+        'week_of_month': (['2026-01-01', '2026-10-01', '2026-10-08', '2026-12-29'], ['W-1', 'W-1', 'W-2', 'W-5']),
+        'iso_week': (['2025-12-29', '2026-10-05', '2026-10-05', '2026-12-28'],
+                     ['2026-W01', '2026-W41', '2026-W41', '2026-W53']),
+        'month': (['2026-01-01', '2026-10-01', '2026-10-01', '2026-12-01'], ['2026-01', '2026-10', '2026-10', '2026-12']),
+        'quarter': (['2026-01-01', '2026-10-01', '2026-10-01', '2026-10-01'], ['2026-T1', '2026-T4', '2026-T4', '2026-T4']),
+    }
+    for period, (starts, labels) in expected.items():
+        assert bucket_starts(days, period).astype(str).tolist() == starts
+        assert bucket_labels(bucket_starts(days, period), period) == labels
+
+def test_weeks_without_sales_get_a_target(database):
+    # Octobre 2026 en BEFR : 22 jours ouvrés, soit 10 par jour ouvré
+    save_monthly_target('BEFR', 2026, 10, 220)
+    save_sale('BEFR', datetime(2026, 10, 2), 30)
+    save_sale('BEFR', datetime(2026, 10, 10), 12)  # samedi : réalisé compté, pas de target
+
+    result = get_period_performance(['BEFR'], datetime(2026, 10, 1), datetime(2026, 10, 31), 'week_of_month')
+    assert result['period'].tolist() == ['W-1', 'W-2', 'W-3', 'W-4', 'W-5']
+    assert result['working_days'].tolist() == [5, 5, 5, 5, 2]
+    assert result['realized'].tolist() == [30, 12, 0, 0, 0]
+    assert result['target'].tolist() == [50, 50, 50, 50, 20]
+    assert result['delta'].tolist() == [-20, -38, -50, -50, -20]
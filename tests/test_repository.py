@@ -0,0 +1,139 @@
+"""Suite de conformité commune à tous les moteurs de données (SalesRepository).
+
+Chaque test tourne sur chaque moteur de BACKENDS, branché sur une base neuve,
+et compare le résultat au comportement de référence.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pilotage.repository import BACKENDS, create_repository
+from pilotage.storage import add_zone
+
+# Zones de saisie créées dans la base neuve avant chaque test
+TEST_ZONES = ['Z1', 'Z2', 'Z3', 'R1', 'R2', 'D1', 'D2', 'D3', 'M1', 'M2']
+
+@pytest.fixture(params=list(BACKENDS))
+def repository(request, database):
+    for zone in TEST_ZONES:
+        add_zone(zone, 'Concessions')
+    return create_repository(request.param)
+
+def _rows(frame):
+    return [tuple(row) for row in frame.itertuples(index=False, name=None)]
+
+def _day(iso):
+    return pd.Timestamp(iso)
+
+def _assert_frame(actual, expected):
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False)
+
+# ==================== VENTES ====================
+
+def test_sales_upsert_and_range(repository):
+    repository.save_sales([('Z1', '2024-01-31', 5), ('Z1', '2024-02-01', 7), ('Z2', '2024-02-01', 3)])
+    sales = repository.get_sales(['Z1'], '2024-02-01', '2024-03-01')
+    assert sales['date'].dtype.kind == 'M' and sales['volume'].dtype.kind == 'i'
+    assert _rows(sales) == [('Z1', _day('2024-02-01'), 7)]
+    assert _rows(repository.get_sales(['Z2', 'Z1'], '2024-01-01', '2024-03-01')) == [
+        ('Z1', _day('2024-01-31'), 5), ('Z1', _day('2024-02-01'), 7), ('Z2', _day('2024-02-01'), 3)]
+    assert _rows(repository.get_sales(['Z1'], '2024-01-01', '2024-01-31')) == []
+
+def test_sales_update_and_delete(repository):
+    repository.save_sales([('Z3', '2024-03-01', 1), ('Z3', '2024-03-04', 2)])
+    repository.save_sales([('Z3', '2024-03-01', 10)], deletions=[('Z3', '2024-03-04'), ('Z3', '2030-01-01')])
+    assert _rows(repository.get_sales(['Z3'], '2024-01-01', '2025-01-01')) == [('Z3', _day('2024-03-01'), 10)]
+
+def test_sales_unknown_zone(repository):
+    with pytest.raises(ValueError):
+        repository.save_sales([('Z1', '2024-05-02', 1), ('Inconnue', '2024-05-02', 1)])
+    assert _rows(repository.get_sales(['Z1'], '2024-05-01', '2024-06-01')) == []
+
+def test_recent_sales_order(repository):
+    repository.save_sales([('R2', '2099-01-02', 1), ('R1', '2099-01-02', 2), ('R1', '2099-01-01', 3)])
+    assert _rows(repository.get_recent_sales(2)) == [('R1', _day('2099-01-02'), 2), ('R2', _day('2099-01-02'), 1)]
+
+# ==================== OBJECTIFS ET JANVIER MANUEL ====================
+
+def test_monthly_targets(repository):
+    assert repository.get_monthly_target('T1', 2024, 5) == 0
+    repository.save_monthly_target('T1', 2024, 5, 100)
+    repository.save_monthly_target('T1', 2024, 5, 120)
+    repository.save_monthly_target('T1', 2024, 6, 90)
+    repository.save_monthly_target('T0', 2024, 6, 80)
+    assert repository.get_monthly_target('T1', 2024, 5) == 120
+    targets = repository.get_targets()
+    assert _rows(targets[targets['zone'].isin(['T0', 'T1'])]) == [
+        ('T0', 2024, 6, 80), ('T1', 2024, 6, 90), ('T1', 2024, 5, 120)]
+
+def test_ytd_init(repository):
+    assert repository.get_ytd_init('Y1', 2024) == 0
+    repository.save_ytd_init('Y1', 2024, 40)
+    repository.save_ytd_init('Y1', 2024, 45)
+    assert repository.get_ytd_init('Y1', 2024) == 45
+    assert repository.get_ytd_init('Y1', 2023) == 0
+
+# ==================== JOURS FÉRIÉS PERSONNALISÉS ====================
+
+def test_custom_holidays(repository):
+    assert repository.add_custom_holiday('2024-06-03', 'Pont') is True
+    assert repository.add_custom_holiday('2024-06-10', 'Inventaire') is True
+    assert repository.add_custom_holiday('2024-06-03', 'Doublon') is False
+    assert repository.add_custom_holiday('2024-06-03', 'Fête locale', 'H1') is True
+    assert repository.add_custom_holiday('2024-06-03', 'Doublon', 'H1') is False
+    assert _rows(repository.get_custom_holidays()) == [('2024-06-10', 'Inventaire', None),
+                                                       ('2024-06-03', 'Pont', None),
+                                                       ('2024-06-03', 'Fête locale', 'H1')]
+
+# ==================== ANALYTIQUE ====================
+
+def _daily_reference(sales, archived, warmup_start, start, end, holidays):
+    days = pd.date_range(warmup_start, end)
+    days = days[(days.dayofweek < 5) & ~days.strftime('%Y-%m-%d').isin(holidays)].strftime('%Y-%m-%d')
+    volumes = pd.concat([sales, archived]).groupby('date')['volume'].sum().reindex(days, fill_value=0)
+    trend = pd.DataFrame({
+        'date': days,
+        'volume': volumes.to_numpy(),
+        'avg_7': volumes.rolling(7, min_periods=1).mean().to_numpy(),
+        'avg_20': volumes.rolling(20, min_periods=1).mean().to_numpy(),
+    })
+    return trend[trend['date'] >= start]
+
+def test_daily_trend(repository):
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2024-02-01', '2024-04-30').strftime('%Y-%m-%d')
+    sales = pd.DataFrame({'zone': np.where(np.arange(len(days)) % 3, 'D1', 'D2'), 'date': days,
+                          'volume': rng.integers(0, 50, len(days))})
+    sales = sales[sales['date'] != '2024-03-12']  # jour ouvré sans vente : compte pour 0
+    repository.save_sales(list(sales.itertuples(index=False, name=None)))
+    repository.save_sales([('D3', '2024-03-05', 1000), ('D1', '2024-05-02', 1000)])  # hors zones, hors période
+    archived = pd.DataFrame({'zone': 'D1', 'date': ['2024-01-15', '2024-01-16', '2024-02-01'], 'volume': [11, 12, 13]})
+    holidays = ['2024-01-01', '2024-04-01', '2024-04-15']
+
+    trend = repository.daily_trend(['D1', 'D2'], '2024-01-02', '2024-03-01', '2024-04-30', holidays, archived)
+    expected = _daily_reference(sales[['date', 'volume']], archived[['date', 'volume']],
+                                '2024-01-02', '2024-03-01', '2024-04-30', holidays)
+    _assert_frame(trend[['date', 'volume', 'avg_7', 'avg_20']], expected)
+
+def test_monthly_trend(repository):
+    repository.save_sales([
+        ('M1', '2024-01-10', 10), ('M1', '2024-01-11', 5), ('M1', '2024-02-10', 30),
+        ('M1', '2024-04-10', 20),  # mars sans vente : pas de MoM en avril
+        ('M2', '2024-01-10', 8),
+        ('M1', '2025-01-10', 99),  # après la période
+    ])
+    archived = pd.DataFrame({'zone': ['M1', 'M1', 'M2'], 'year': [2023, 2023, 2023], 'month': [1, 4, 12],
+                             'volume': [12, 40, 4]})
+    trend = repository.monthly_trend(['M1', 'M2'], 2024, 2024, archived)
+    expected = pd.DataFrame({
+        'zone': ['M1', 'M1', 'M1', 'M2'],
+        'year': [2024] * 4,
+        'month': [1, 2, 4, 1],
+        'volume': [15, 30, 20, 8],
+        'previous_month': [np.nan, 15, np.nan, 4],
+        'mom_pct': [np.nan, 100.0, np.nan, 100.0],
+        'previous_year': [12, np.nan, 40, np.nan],
+        'yoy_pct': [25.0, np.nan, -50.0, np.nan],
+    })
+    _assert_frame(trend.astype({'previous_month': 'float64', 'previous_year': 'float64'}), expected)
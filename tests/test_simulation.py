@@ -0,0 +1,43 @@
+"""Simulation Monte Carlo : tirages reproductibles et chocs appliqués aux seules ventes futures"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pilotage.repository import get_repository
+from pilotage.simulation import bootstrap_totals, simulate_attainment
+from pilotage.storage import save_monthly_target
+
+TODAY = datetime(2026, 10, 15)
+
+def _fill_history():
+    rng = np.random.default_rng(1)
+    days = pd.bdate_range('2025-10-01', '2026-10-14')
+    get_repository().save_sales([(zone, day.strftime('%Y-%m-%d'), int(volume))
+                                 for zone in ('BEFR', 'France') for day, volume in zip(days, rng.integers(0, 20, len(days)))])
+    for zone in ('BEFR', 'France'):
+        save_monthly_target(zone, 2026, 10, 200)
+
+def test_bootstrap_of_a_constant_history():
+    history = np.array([[10.0] * 30, [1.0] * 30])
+    totals = bootstrap_totals(history, [4, 0], 50, np.random.default_rng(0))
+    assert (totals == [40, 0]).all()
+
+def test_same_seed_same_distribution(database):
+    _fill_history()
+    first = simulate_attainment(TODAY, n_trials=2000, seed=0)
+    again = simulate_attainment(TODAY, n_trials=2000, seed=0)
+    pd.testing.assert_frame_equal(first, again)
+    assert first.index[-1] == 'Groupe'
+    assert 0 < first.loc['BEFR', 'month_probability'] < 1
+
+def test_shock_scales_future_sales_only(database):
+    _fill_history()
+    base = simulate_attainment(TODAY, n_trials=2000, seed=0)
+    shocked = simulate_attainment(TODAY, shocks={'BEFR': 0.9}, n_trials=2000, seed=0)
+
+    # Mêmes tirages : seul le futur de BEFR est réduit de 10 %, le réalisé et les autres zones sont inchangés
+    realized = get_repository().get_sales(['BEFR'], '2026-10-01', '2026-10-15')['volume'].sum()
+    assert np.isclose(shocked.loc['BEFR', 'month_p50'] - realized, 0.9 * (base.loc['BEFR', 'month_p50'] - realized))
+    assert shocked.loc['France', 'month_p50'] == base.loc['France', 'month_p50']
+    assert shocked.loc['Groupe', 'month_p50'] < base.loc['Groupe', 'month_p50']